@@ -10,6 +10,8 @@ import os
 import json
 from datetime import datetime
 
+from mock_store import MockStore
+
 app = Flask(__name__)
 
 # Configurar CORS para permitir peticiones desde el frontend
@@ -268,6 +270,11 @@ MOCK_DATA = {
     ]
 }
 
+# Almacén indexado construido a partir de los datos simulados
+STORE = MockStore(MOCK_DATA)
+
+ESTADOS_COMPRA = ['pendiente', 'en_proceso', 'completada', 'cancelada']
+
 # ================== RUTAS PRINCIPALES ==================
 
 @app.route('/')
@@ -448,13 +455,7 @@ def health():
         'environment': 'development',
         'version': '2.1.0',
         'timestamp': datetime.now().isoformat(),
-        'data_counts': {
-            'componentes': len(MOCK_DATA['componentes']),
-            'maquinas': len(MOCK_DATA['maquinas']),
-            'proveedores': len(MOCK_DATA['proveedores']),
-            'compras': len(MOCK_DATA['compras']),
-            'stock': len(MOCK_DATA['stock'])
-        }
+        'data_counts': STORE.conteos()
     })
 
 @app.route('/api/test')
@@ -484,11 +485,8 @@ def get_componentes():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
     
-    componentes = MOCK_DATA['componentes'].copy()
-    
-    # Aplicar filtros
-    if categoria:
-        componentes = [c for c in componentes if c['categoria'].lower() == categoria.lower()]
+    # Filtros indexados
+    componentes = STORE.componentes.filter(categoria=categoria or None)
     
     if stock_bajo:
         componentes = [c for c in componentes if c['stock_actual'] <= c['stock_minimo']]
@@ -524,7 +522,7 @@ def get_componentes():
 @app.route('/api/v1/componentes/<int:id>', methods=['GET'])
 def get_componente(id):
     """Obtener componente por ID"""
-    componente = next((c for c in MOCK_DATA['componentes'] if c['id'] == id), None)
+    componente = STORE.componentes.get(id)
     if not componente:
         return jsonify({'success': False, 'message': 'Componente no encontrado'}), 404
     
@@ -537,7 +535,7 @@ def get_componente(id):
 @app.route('/api/v1/componentes/categorias', methods=['GET'])
 def get_categorias():
     """Obtener categorías de componentes"""
-    categorias = list(set(c['categoria'] for c in MOCK_DATA['componentes']))
+    categorias = STORE.componentes.valores('categoria')
     return jsonify({
         'success': True,
         'data': sorted(categorias),
@@ -547,7 +545,7 @@ def get_categorias():
 @app.route('/api/v1/componentes/stock-bajo', methods=['GET'])
 def get_componentes_stock_bajo():
     """Obtener componentes con stock bajo"""
-    componentes_bajo = [c for c in MOCK_DATA['componentes'] if c['stock_actual'] <= c['stock_minimo']]
+    componentes_bajo = STORE.componentes_stock_bajo()
     return jsonify({
         'success': True,
         'data': componentes_bajo,
@@ -565,13 +563,7 @@ def get_maquinas():
     activo = request.args.get('activo', type=bool, default=True)
     search = request.args.get('search')
     
-    maquinas = MOCK_DATA['maquinas'].copy()
-    
-    if tipo:
-        maquinas = [m for m in maquinas if m['tipo'].lower() == tipo.lower()]
-    
-    if estado:
-        maquinas = [m for m in maquinas if m['estado'].lower() == estado.lower()]
+    maquinas = STORE.maquinas.filter(tipo=tipo or None, estado=estado or None)
     
     if activo is not None:
         maquinas = [m for m in maquinas if m['activo'] == activo]
@@ -593,7 +585,7 @@ def get_maquinas():
 @app.route('/api/v1/maquinas/<int:id>', methods=['GET'])
 def get_maquina(id):
     """Obtener máquina por ID"""
-    maquina = next((m for m in MOCK_DATA['maquinas'] if m['id'] == id), None)
+    maquina = STORE.maquinas.get(id)
     if not maquina:
         return jsonify({'success': False, 'message': 'Máquina no encontrada'}), 404
     
@@ -606,7 +598,7 @@ def get_maquina(id):
 @app.route('/api/v1/maquinas/tipos', methods=['GET'])
 def get_tipos_maquinas():
     """Obtener tipos de máquinas"""
-    tipos = list(set(m['tipo'] for m in MOCK_DATA['maquinas']))
+    tipos = STORE.maquinas.valores('tipo')
     return jsonify({
         'success': True,
         'data': sorted(tipos),
@@ -622,10 +614,7 @@ def get_proveedores():
     activo = request.args.get('activo', type=bool, default=True)
     search = request.args.get('search')
     
-    proveedores = MOCK_DATA['proveedores'].copy()
-    
-    if tipo:
-        proveedores = [p for p in proveedores if p['tipo'].lower() == tipo.lower()]
+    proveedores = STORE.proveedores.filter(tipo=tipo or None)
     
     if activo is not None:
         proveedores = [p for p in proveedores if p['activo'] == activo]
@@ -647,7 +636,7 @@ def get_proveedores():
 @app.route('/api/v1/proveedores/<int:id>', methods=['GET'])
 def get_proveedor(id):
     """Obtener proveedor por ID"""
-    proveedor = next((p for p in MOCK_DATA['proveedores'] if p['id'] == id), None)
+    proveedor = STORE.proveedores.get(id)
     if not proveedor:
         return jsonify({'success': False, 'message': 'Proveedor no encontrado'}), 404
     
@@ -660,7 +649,7 @@ def get_proveedor(id):
 @app.route('/api/v1/proveedores/tipos', methods=['GET'])
 def get_tipos_proveedores():
     """Obtener tipos de proveedores"""
-    tipos = list(set(p['tipo'] for p in MOCK_DATA['proveedores']))
+    tipos = STORE.proveedores.valores('tipo')
     return jsonify({
         'success': True,
         'data': sorted(tipos),
@@ -678,16 +667,11 @@ def get_compras():
     fecha_desde = request.args.get('fecha_desde')
     fecha_hasta = request.args.get('fecha_hasta')
     
-    compras = MOCK_DATA['compras'].copy()
-    
-    if estado:
-        compras = [c for c in compras if c['estado'].lower() == estado.lower()]
-    
-    if proveedor_id:
-        compras = [c for c in compras if c['proveedor_id'] == proveedor_id]
-    
-    if componente_id:
-        compras = [c for c in compras if c['componente_id'] == componente_id]
+    compras = STORE.compras.filter(
+        estado=estado or None,
+        proveedor_id=proveedor_id or None,
+        componente_id=componente_id or None
+    )
     
     # Aquí se podrían aplicar filtros de fecha si fuera necesario
     
@@ -701,7 +685,7 @@ def get_compras():
 @app.route('/api/v1/compras/<int:id>', methods=['GET'])
 def get_compra(id):
     """Obtener compra por ID"""
-    compra = next((c for c in MOCK_DATA['compras'] if c['id'] == id), None)
+    compra = STORE.compras.get(id)
     if not compra:
         return jsonify({'success': False, 'message': 'Compra no encontrada'}), 404
     
@@ -711,13 +695,81 @@ def get_compra(id):
         'message': 'Compra obtenida exitosamente'
     })
 
+@app.route('/api/v1/compras', methods=['POST'])
+def registrar_compra():
+    """Registrar una compra"""
+    data = request.get_json() or {}
+    
+    cantidad = data.get('cantidad', 0)
+    precio_unitario = data.get('precio_unitario', 0)
+    estado = data.get('estado', 'pendiente')
+    
+    if estado not in ESTADOS_COMPRA:
+        return jsonify({'success': False, 'message': 'Estado de compra inválido'}), 400
+    
+    if data.get('proveedor_id') is None or data.get('componente_id') is None:
+        return jsonify({'success': False, 'message': 'proveedor_id y componente_id son requeridos'}), 400
+    
+    ahora = datetime.now().isoformat()
+    id = STORE.compras.next_id()
+    nueva_compra = {
+        'id': id,
+        'numero_compra': data.get('numero_compra') or f'COMP-{id:03d}',
+        'numero_factura': data.get('numero_factura'),
+        'proveedor_id': data.get('proveedor_id'),
+        'componente_id': data.get('componente_id'),
+        'cantidad': cantidad,
+        'precio_unitario': precio_unitario,
+        'total': data.get('total', cantidad * precio_unitario),
+        'moneda': data.get('moneda', 'USD'),
+        'fecha_compra': data.get('fecha_compra', ahora),
+        'fecha_entrega_esperada': data.get('fecha_entrega_esperada'),
+        'fecha_entrega_real': None,
+        'estado': estado,
+        'observacion': data.get('observacion', ''),
+        'created_at': ahora,
+        'updated_at': ahora
+    }
+    
+    try:
+        STORE.registrar_compra(nueva_compra)
+    except KeyError:
+        # Es un dato inválido del cuerpo, no un recurso inexistente en la URL
+        return jsonify({'success': False, 'message': 'Proveedor o componente no encontrado'}), 400
+    
+    return jsonify({
+        'success': True,
+        'data': nueva_compra,
+        'message': 'Compra registrada exitosamente'
+    }), 201
+
+@app.route('/api/v1/compras/<int:id>', methods=['PUT'])
+def actualizar_compra(id):
+    """Actualizar una compra (estado, fechas, observaciones)"""
+    data = request.get_json() or {}
+    
+    if STORE.compras.get(id) is None:
+        return jsonify({'success': False, 'message': 'Compra no encontrada'}), 404
+    
+    if 'estado' in data and data['estado'] not in ESTADOS_COMPRA:
+        return jsonify({'success': False, 'message': 'Estado de compra inválido'}), 400
+    
+    campos = ('estado', 'numero_factura', 'fecha_entrega_esperada', 'fecha_entrega_real', 'observacion')
+    cambios = {campo: data[campo] for campo in campos if campo in data}
+    compra = STORE.compras.update(id, updated_at=datetime.now().isoformat(), **cambios)
+    
+    return jsonify({
+        'success': True,
+        'data': compra,
+        'message': 'Compra actualizada exitosamente'
+    })
+
 @app.route('/api/v1/compras/estados', methods=['GET'])
 def get_estados_compras():
     """Obtener estados de compras"""
-    estados = ['pendiente', 'en_proceso', 'completada', 'cancelada']
     return jsonify({
         'success': True,
-        'data': estados,
+        'data': ESTADOS_COMPRA,
         'message': 'Estados de compras obtenidos exitosamente'
     })
 
@@ -729,13 +781,10 @@ def get_stock():
     componente_id = request.args.get('componente_id', type=int)
     tipo_movimiento = request.args.get('tipo_movimiento')
     
-    stock = MOCK_DATA['stock'].copy()
-    
-    if componente_id:
-        stock = [s for s in stock if s['componente_id'] == componente_id]
-    
-    if tipo_movimiento:
-        stock = [s for s in stock if s['tipo_movimiento'].lower() == tipo_movimiento.lower()]
+    stock = STORE.stock.filter(
+        componente_id=componente_id or None,
+        tipo_movimiento=tipo_movimiento or None
+    )
     
     return jsonify({
         'success': True,
@@ -747,7 +796,7 @@ def get_stock():
 @app.route('/api/v1/stock/<int:id>', methods=['GET'])
 def get_stock_item(id):
     """Obtener item de stock por ID"""
-    item = next((s for s in MOCK_DATA['stock'] if s['id'] == id), None)
+    item = STORE.stock.get(id)
     if not item:
         return jsonify({'success': False, 'message': 'Item de stock no encontrado'}), 404
     
@@ -763,16 +812,18 @@ def get_stock_item(id):
 def get_dashboard():
     """Obtener estadísticas del dashboard"""
     
-    # Calcular estadísticas reales de los datos mock
-    total_componentes = len(MOCK_DATA['componentes'])
-    total_maquinas = len(MOCK_DATA['maquinas'])
-    total_proveedores = len(MOCK_DATA['proveedores'])
-    total_compras = len(MOCK_DATA['compras'])
+    # Leer agregados mantenidos incrementalmente por el store
+    agregados = STORE.agregados
+    total_componentes = len(STORE.componentes)
+    total_maquinas = len(STORE.maquinas)
+    total_proveedores = len(STORE.proveedores)
+    total_compras = len(STORE.compras)
     
-    compras_pendientes = len([c for c in MOCK_DATA['compras'] if c['estado'] == 'pendiente'])
-    componentes_stock_bajo = len([c for c in MOCK_DATA['componentes'] if c['stock_actual'] <= c['stock_minimo']])
-    valor_total_stock = sum(s['valor_total'] for s in MOCK_DATA['stock'])
-    maquinas_activas = len([m for m in MOCK_DATA['maquinas'] if m['activo']])
+    compras_por_estado = agregados.compras_estado(ESTADOS_COMPRA)
+    compras_pendientes = compras_por_estado['pendiente']
+    componentes_stock_bajo = len(agregados.componentes_stock_bajo)
+    valor_total_stock = agregados.valor_inventario()
+    maquinas_activas = agregados.maquinas_activas
     
     dashboard = {
         'resumen': {
@@ -786,17 +837,8 @@ def get_dashboard():
             'maquinas_activas': maquinas_activas
         },
         'graficos': {
-            'stock_por_categoria': {
-                'Motor': 15,
-                'Transmision': 3,
-                'Electrico': 8
-            },
-            'compras_por_estado': {
-                'pendiente': compras_pendientes,
-                'en_proceso': len([c for c in MOCK_DATA['compras'] if c['estado'] == 'en_proceso']),
-                'completada': len([c for c in MOCK_DATA['compras'] if c['estado'] == 'completada']),
-                'cancelada': len([c for c in MOCK_DATA['compras'] if c['estado'] == 'cancelada'])
-            },
+            'stock_por_categoria': agregados.stock_categorias(),
+            'compras_por_estado': compras_por_estado,
             'compras_ultimo_mes': {
                 'labels': ['Semana 1', 'Semana 2', 'Semana 3', 'Semana 4'],
                 'valores': [1, 1, 1, 0]
@@ -806,14 +848,13 @@ def get_dashboard():
     }
     
     # Generar alertas dinámicas
-    for componente in MOCK_DATA['componentes']:
-        if componente['stock_actual'] <= componente['stock_minimo']:
-            dashboard['alertas'].append({
-                'tipo': 'warning',
-                'mensaje': f"{componente['nombre']} tiene stock bajo ({componente['stock_actual']} unidades)",
-                'timestamp': datetime.now().isoformat(),
-                'componente_id': componente['id']
-            })
+    for componente in STORE.componentes_stock_bajo():
+        dashboard['alertas'].append({
+            'tipo': 'warning',
+            'mensaje': f"{componente['nombre']} tiene stock bajo ({componente['stock_actual']} unidades)",
+            'timestamp': datetime.now().isoformat(),
+            'componente_id': componente['id']
+        })
     
     return jsonify({
         'success': True,
@@ -824,10 +865,10 @@ def get_dashboard():
 @app.route('/api/v1/estadisticas/metricas', methods=['GET'])
 def get_metricas():
     """Obtener métricas generales"""
-    total_componentes = len(MOCK_DATA['componentes'])
-    total_maquinas = len(MOCK_DATA['maquinas'])
-    total_compras = len(MOCK_DATA['compras'])
-    valor_total_stock = sum(s['valor_total'] for s in MOCK_DATA['stock'])
+    total_componentes = len(STORE.componentes)
+    total_maquinas = len(STORE.maquinas)
+    total_compras = len(STORE.compras)
+    valor_total_stock = STORE.agregados.valor_inventario()
     
     return jsonify({
         'success': True,
@@ -874,10 +915,10 @@ def get_estadisticas_generales():
         'success': True,
         'data': {
             'resumen': {
-                'total_componentes': len(MOCK_DATA['componentes']),
-                'total_maquinas': len(MOCK_DATA['maquinas']),
-                'total_proveedores': len(MOCK_DATA['proveedores']),
-                'valor_inventario': sum(s['valor_total'] for s in MOCK_DATA['stock'])
+                'total_componentes': len(STORE.componentes),
+                'total_maquinas': len(STORE.maquinas),
+                'total_proveedores': len(STORE.proveedores),
+                'valor_inventario': STORE.agregados.valor_inventario()
             }
         }
     })
@@ -931,9 +972,9 @@ def get_graficos_stock():
 @app.route('/api/v1/stock/resumen', methods=['GET'])
 def get_stock_resumen():
     """Obtener resumen de stock"""
-    total_componentes = len(MOCK_DATA['componentes'])
-    componentes_stock_bajo = len([c for c in MOCK_DATA['componentes'] if c['stock_actual'] <= c['stock_minimo']])
-    valor_total = sum(s['valor_total'] for s in MOCK_DATA['stock'])
+    total_componentes = len(STORE.componentes)
+    componentes_stock_bajo = len(STORE.agregados.componentes_stock_bajo)
+    valor_total = STORE.agregados.valor_inventario()
     
     return jsonify({
         'success': True,
@@ -941,14 +982,14 @@ def get_stock_resumen():
             'total_componentes': total_componentes,
             'componentes_stock_bajo': componentes_stock_bajo,
             'valor_total_stock': valor_total,
-            'ultimo_movimiento': '2024-07-30T14:20:00'
+            'ultimo_movimiento': STORE.agregados.ultimo_movimiento
         }
     })
 
 @app.route('/api/v1/stock/bajo-stock', methods=['GET'])
 def get_bajo_stock():
     """Obtener componentes con stock bajo"""
-    componentes_bajo = [c for c in MOCK_DATA['componentes'] if c['stock_actual'] <= c['stock_minimo']]
+    componentes_bajo = STORE.componentes_stock_bajo()
     return jsonify({
         'success': True,
         'data': componentes_bajo,
@@ -958,17 +999,30 @@ def get_bajo_stock():
 @app.route('/api/v1/stock/movimiento', methods=['POST'])
 def registrar_movimiento_stock():
     """Registrar movimiento de stock"""
-    data = request.get_json()
+    data = request.get_json() or {}
+    
+    componente_id = data.get('componente_id')
+    tipo_movimiento = data.get('tipo_movimiento') or data.get('tipo')
+    cantidad = data.get('cantidad')
+    
+    if tipo_movimiento not in ('entrada', 'salida', 'ajuste'):
+        return jsonify({'success': False, 'message': 'Datos de movimiento inválidos'}), 400
+    
+    if STORE.componentes.get(componente_id) is None:
+        return jsonify({'success': False, 'message': 'Componente no encontrado'}), 404
     
-    # Simular registro de movimiento
     nuevo_movimiento = {
-        'id': len(MOCK_DATA['stock']) + 1,
-        'componente_id': data.get('componente_id'),
-        'tipo_movimiento': data.get('tipo'),
-        'cantidad': data.get('cantidad'),
+        'id': STORE.stock.next_id(),
+        'componente_id': componente_id,
+        'tipo_movimiento': tipo_movimiento,
+        'cantidad': cantidad,
         'observacion': data.get('observacion', ''),
         'fecha': datetime.now().isoformat()
     }
+    try:
+        STORE.registrar_movimiento(nuevo_movimiento)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     
     return jsonify({
         'success': True,
@@ -997,10 +1051,10 @@ def get_resumen_general():
     return jsonify({
         'success': True,
         'data': {
-            'totalComponentes': len(MOCK_DATA['componentes']),
-            'totalMaquinas': len(MOCK_DATA['maquinas']),
-            'totalCompras': len(MOCK_DATA['compras']),
-            'valorInventario': sum(s['valor_total'] for s in MOCK_DATA['stock']),
+            'totalComponentes': len(STORE.componentes),
+            'totalMaquinas': len(STORE.maquinas),
+            'totalCompras': len(STORE.compras),
+            'valorInventario': STORE.agregados.valor_inventario(),
             'ventasUltimoMes': 15420.00,
             'crecimientoMensual': 12.5,
             'componentesVendidos': 45,
@@ -1043,7 +1097,7 @@ def get_compras_periodo():
 @app.route('/api/v1/estadisticas/stock-critico', methods=['GET'])
 def get_stock_critico():
     """Obtener componentes con stock crítico"""
-    componentes_criticos = [c for c in MOCK_DATA['componentes'] if c['stock_actual'] <= c['stock_minimo']]
+    componentes_criticos = STORE.componentes_stock_bajo()
     return jsonify({
         'success': True,
         'data': componentes_criticos
@@ -1055,17 +1109,16 @@ def get_alertas():
     alertas = []
     
     # Generar alertas de stock bajo
-    for componente in MOCK_DATA['componentes']:
-        if componente['stock_actual'] <= componente['stock_minimo']:
-            alertas.append({
-                'id': len(alertas) + 1,
-                'tipo': 'stock_bajo',
-                'prioridad': 'alta' if componente['stock_actual'] == 0 else 'media',
-                'titulo': f'Stock bajo: {componente["nombre"]}',
-                'descripcion': f'Solo quedan {componente["stock_actual"]} unidades',
-                'fecha': datetime.now().isoformat(),
-                'leida': False
-            })
+    for componente in STORE.componentes_stock_bajo():
+        alertas.append({
+            'id': len(alertas) + 1,
+            'tipo': 'stock_bajo',
+            'prioridad': 'alta' if componente['stock_actual'] == 0 else 'media',
+            'titulo': f'Stock bajo: {componente["nombre"]}',
+            'descripcion': f'Solo quedan {componente["stock_actual"]} unidades',
+            'fecha': datetime.now().isoformat(),
+            'leida': False
+        })
     
     # Agregar algunas alertas adicionales
     alertas.extend([
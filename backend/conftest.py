@@ -0,0 +1,30 @@
+"""
+Fixtures de pytest para el backend con datos simulados
+
+app.py se carga desde su ruta con otro nombre de módulo: `app` es el de
+backend_new en la misma sesión de pytest. Cada prueba recibe una copia
+nueva del módulo, con su propio STORE.
+"""
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+
+@pytest.fixture
+def mock_app():
+    spec = importlib.util.spec_from_file_location('backend_mock_app', os.path.join(BACKEND_DIR, 'app.py'))
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.app.config['TESTING'] = True
+    return modulo
+
+
+@pytest.fixture
+def client(mock_app):
+    return mock_app.app.test_client()
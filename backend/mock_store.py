@@ -0,0 +1,308 @@
+"""
+Almacén en memoria indexado para el backend con datos simulados.
+
+Reemplaza los recorridos lineales sobre MOCK_DATA: cada colección se indexa
+por id y mantiene índices hash secundarios sobre los campos de filtro, de modo
+que las búsquedas por id son O(1) y los filtros cuestan en proporción al
+tamaño del resultado. Los agregados del dashboard se mantienen de forma
+incremental a partir de las escrituras sobre las colecciones.
+"""
+
+from collections import Counter, defaultdict
+
+# Campos con índice secundario por colección
+INDICES_POR_COLECCION = {
+    'componentes': ('categoria', 'proveedor_id'),
+    'maquinas': ('tipo', 'estado'),
+    'proveedores': ('tipo',),
+    'compras': ('estado', 'proveedor_id', 'componente_id'),
+    'stock': ('componente_id', 'tipo_movimiento'),
+}
+
+
+def _clave(valor):
+    """Normalizar valores de índice (los filtros de texto no distinguen mayúsculas)"""
+    if isinstance(valor, str):
+        return valor.lower()
+    return valor
+
+
+class IndexedCollection:
+    """Colección de registros (dicts) indexada por id y por campos secundarios"""
+
+    def __init__(self, registros=(), indices=()):
+        self._por_id = {}
+        # campo -> valor normalizado -> {id: registro}; los dicts conservan el orden de inserción
+        self._indices = {campo: defaultdict(dict) for campo in indices}
+        self._observadores = []
+        # Mayor id insertado; los ids eliminados no se reutilizan
+        self._ultimo_id = 0
+        for registro in registros:
+            self.add(registro)
+
+    def __len__(self):
+        return len(self._por_id)
+
+    def __iter__(self):
+        return iter(self._por_id.values())
+
+    def observar(self, callback):
+        """
+        Registrar un observador de escrituras.
+
+        El callback recibe (anterior, actual): anterior es None en inserciones
+        y actual es None en eliminaciones.
+        """
+        self._observadores.append(callback)
+        for registro in self._por_id.values():
+            callback(None, registro)
+
+    def get(self, id):
+        """Obtener registro por id en O(1)"""
+        return self._por_id.get(id)
+
+    def all(self):
+        """Obtener todos los registros en orden de inserción"""
+        return list(self._por_id.values())
+
+    def next_id(self):
+        """Siguiente id disponible en O(1)"""
+        return self._ultimo_id + 1
+
+    def valores(self, campo):
+        """Valores distintos presentes en un campo indexado"""
+        return [next(iter(bucket.values()))[campo]
+                for bucket in self._indices[campo].values() if bucket]
+
+    def filter(self, **criterios):
+        """
+        Filtrar por igualdad sobre campos indexados.
+
+        Se parte del bucket más pequeño y el resto de criterios se verifica
+        sobre esos candidatos, así el costo es proporcional al resultado.
+        """
+        criterios = {campo: valor for campo, valor in criterios.items() if valor is not None}
+        if not criterios:
+            return self.all()
+
+        buckets = []
+        for campo, valor in criterios.items():
+            if campo not in self._indices:
+                raise KeyError(f"El campo '{campo}' no está indexado")
+            bucket = self._indices[campo].get(_clave(valor))
+            if not bucket:
+                return []
+            buckets.append(bucket)
+
+        buckets.sort(key=len)
+        base, resto = buckets[0], buckets[1:]
+        return [registro for id, registro in base.items()
+                if all(id in bucket for bucket in resto)]
+
+    def add(self, registro):
+        """Insertar un registro y actualizar índices"""
+        id = registro['id']
+        if id in self._por_id:
+            raise ValueError(f"Ya existe un registro con id {id}")
+        self._por_id[id] = registro
+        self._ultimo_id = max(self._ultimo_id, id)
+        self._indexar(registro)
+        self._notificar(None, registro)
+        return registro
+
+    def update(self, id, **cambios):
+        """Actualizar campos de un registro manteniendo los índices"""
+        registro = self._por_id.get(id)
+        if registro is None:
+            return None
+        anterior = dict(registro) if self._observadores else None
+        afectados = [campo for campo in cambios if campo in self._indices]
+        for campo in afectados:
+            self._desindexar_campo(registro, campo)
+        registro.update(cambios)
+        for campo in afectados:
+            self._indexar_campo(registro, campo)
+        self._notificar(anterior, registro)
+        return registro
+
+    def remove(self, id):
+        """Eliminar un registro y sus entradas de índice"""
+        registro = self._por_id.pop(id, None)
+        if registro is not None:
+            for campo in self._indices:
+                self._desindexar_campo(registro, campo)
+            self._notificar(registro, None)
+        return registro
+
+    def _notificar(self, anterior, actual):
+        for callback in self._observadores:
+            callback(anterior, actual)
+
+    def _indexar(self, registro):
+        for campo in self._indices:
+            self._indexar_campo(registro, campo)
+
+    def _indexar_campo(self, registro, campo):
+        if campo in registro:
+            self._indices[campo][_clave(registro[campo])][registro['id']] = registro
+
+    def _desindexar_campo(self, registro, campo):
+        if campo not in registro:
+            return
+        clave = _clave(registro[campo])
+        bucket = self._indices[campo].get(clave)
+        if bucket is not None:
+            bucket.pop(registro['id'], None)
+            if not bucket:
+                del self._indices[campo][clave]
+
+
+def _stock_bajo(componente):
+    return componente['stock_actual'] <= componente['stock_minimo']
+
+
+class DashboardAggregates:
+    """
+    Contadores y sumas del dashboard mantenidos en O(1) por escritura.
+
+    Se suscribe a las colecciones del store y aplica el delta de cada
+    registro insertado, modificado o eliminado, en lugar de recorrer
+    los datos en cada consulta.
+    """
+
+    def __init__(self, store):
+        self.compras_por_estado = Counter()
+        self.stock_por_categoria = Counter()
+        self.componentes_stock_bajo = set()
+        self.maquinas_activas = 0
+        self.valor_total_stock = 0.0
+        self.ultimo_movimiento = None
+
+        store.componentes.observar(self._on_componente)
+        store.compras.observar(self._on_compra)
+        store.maquinas.observar(self._on_maquina)
+        store.stock.observar(self._on_stock)
+
+    def _on_componente(self, anterior, actual):
+        if anterior is not None:
+            self.stock_por_categoria[anterior['categoria']] -= anterior['stock_actual']
+            self.componentes_stock_bajo.discard(anterior['id'])
+        if actual is not None:
+            self.stock_por_categoria[actual['categoria']] += actual['stock_actual']
+            if _stock_bajo(actual):
+                self.componentes_stock_bajo.add(actual['id'])
+
+    def _on_compra(self, anterior, actual):
+        if anterior is not None:
+            self.compras_por_estado[anterior['estado']] -= 1
+        if actual is not None:
+            self.compras_por_estado[actual['estado']] += 1
+
+    def _on_maquina(self, anterior, actual):
+        if anterior is not None and anterior['activo']:
+            self.maquinas_activas -= 1
+        if actual is not None and actual['activo']:
+            self.maquinas_activas += 1
+
+    def _on_stock(self, anterior, actual):
+        if anterior is not None:
+            self.valor_total_stock -= anterior.get('valor_total', 0)
+        if actual is not None:
+            self.valor_total_stock += actual.get('valor_total', 0)
+            fecha = actual.get('fecha') or actual.get('ultima_actualizacion')
+            if fecha and (self.ultimo_movimiento is None or fecha > self.ultimo_movimiento):
+                self.ultimo_movimiento = fecha
+
+    def valor_inventario(self):
+        """Valor total del stock redondeado a centavos"""
+        return round(self.valor_total_stock, 2)
+
+    def ids_stock_bajo(self):
+        """Ids de componentes con stock bajo, en orden"""
+        return sorted(self.componentes_stock_bajo)
+
+    def compras_estado(self, estados):
+        """Conteo de compras para cada estado pedido"""
+        return {estado: self.compras_por_estado[estado] for estado in estados}
+
+    def stock_categorias(self):
+        """Unidades en stock por categoría (solo categorías presentes)"""
+        return {categoria: total for categoria, total in self.stock_por_categoria.items() if total}
+
+
+class MockStore:
+    """Repositorio en memoria con una IndexedCollection por entidad"""
+
+    def __init__(self, datos, indices=None):
+        indices = INDICES_POR_COLECCION if indices is None else indices
+        self._colecciones = {
+            nombre: IndexedCollection(registros, indices.get(nombre, ()))
+            for nombre, registros in datos.items()
+        }
+        self.agregados = DashboardAggregates(self)
+
+    def __getattr__(self, nombre):
+        try:
+            return self.__dict__['_colecciones'][nombre]
+        except KeyError:
+            raise AttributeError(nombre) from None
+
+    def __getitem__(self, nombre):
+        return self._colecciones[nombre]
+
+    def conteos(self):
+        """Cantidad de registros por colección"""
+        return {nombre: len(coleccion) for nombre, coleccion in self._colecciones.items()}
+
+    def componentes_stock_bajo(self):
+        """Componentes con stock bajo leídos del bucket de agregados"""
+        return [self.componentes.get(id) for id in self.agregados.ids_stock_bajo()]
+
+    def registrar_compra(self, compra):
+        """Registrar una compra nueva"""
+        if self.proveedores.get(compra['proveedor_id']) is None:
+            raise KeyError(compra['proveedor_id'])
+        if self.componentes.get(compra['componente_id']) is None:
+            raise KeyError(compra['componente_id'])
+        return self.compras.add(compra)
+
+    def registrar_movimiento(self, movimiento):
+        """
+        Registrar un movimiento de stock y reflejarlo en el componente
+
+        Lanza KeyError si el componente no existe y ValueError si la cantidad
+        no es válida (un ajuste fija el stock y admite 0; entradas y salidas
+        deben ser positivas) o si la salida supera el stock actual.
+        """
+        componente = self.componentes.get(movimiento['componente_id'])
+        if componente is None:
+            raise KeyError(movimiento['componente_id'])
+
+        tipo = movimiento['tipo_movimiento']
+        cantidad = movimiento['cantidad']
+        # bool es subclase de int: True no es una cantidad
+        if isinstance(cantidad, bool) or not isinstance(cantidad, (int, float)):
+            raise ValueError('La cantidad debe ser un número')
+        if tipo == 'ajuste':
+            if cantidad < 0:
+                raise ValueError('La cantidad de un ajuste no puede ser negativa')
+        elif cantidad <= 0:
+            raise ValueError('La cantidad debe ser mayor a 0')
+        if tipo == 'salida' and cantidad > componente['stock_actual']:
+            raise ValueError(f"Stock insuficiente: disponible {componente['stock_actual']}")
+
+        if tipo == 'ajuste':
+            nuevo_stock = cantidad
+        elif tipo == 'salida':
+            nuevo_stock = componente['stock_actual'] - cantidad
+        else:
+            nuevo_stock = componente['stock_actual'] + cantidad
+
+        # El valor del movimiento refleja la variación del inventario
+        precio = componente.get('precio_unitario', 0)
+        movimiento.setdefault('precio_promedio', precio)
+        movimiento.setdefault('valor_total', (nuevo_stock - componente['stock_actual']) * precio)
+
+        self.stock.add(movimiento)
+        self.componentes.update(componente['id'], stock_actual=nuevo_stock)
+        return movimiento
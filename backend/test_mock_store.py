@@ -0,0 +1,120 @@
+"""
+Pruebas del almacén indexado y de los agregados del dashboard
+"""
+from mock_store import IndexedCollection, MockStore
+
+
+def _datos():
+    return {
+        'componentes': [
+            {'id': 1, 'nombre': 'Filtro', 'categoria': 'Motor', 'proveedor_id': 1,
+             'stock_actual': 10, 'stock_minimo': 5, 'precio_unitario': 2.0},
+            {'id': 2, 'nombre': 'Correa', 'categoria': 'Transmisión', 'proveedor_id': 2,
+             'stock_actual': 3, 'stock_minimo': 5, 'precio_unitario': 10.0},
+        ],
+        'maquinas': [{'id': 1, 'tipo': 'Tractor', 'estado': 'operativo', 'activo': True}],
+        'proveedores': [{'id': 1, 'tipo': 'Repuestos'}, {'id': 2, 'tipo': 'Repuestos'}],
+        'compras': [{'id': 1, 'estado': 'pendiente', 'proveedor_id': 1, 'componente_id': 1}],
+        'stock': [],
+    }
+
+
+def test_filtros_por_indices_y_next_id():
+    compras = IndexedCollection([
+        {'id': 1, 'estado': 'Pendiente', 'proveedor_id': 1},
+        {'id': 5, 'estado': 'entregada', 'proveedor_id': 1},
+        {'id': 3, 'estado': 'pendiente', 'proveedor_id': 2},
+    ], indices=('estado', 'proveedor_id'))
+
+    assert [c['id'] for c in compras.filter(estado='PENDIENTE')] == [1, 3]
+    assert [c['id'] for c in compras.filter(estado='pendiente', proveedor_id=2)] == [3]
+    assert compras.filter(estado='cancelada') == []
+    assert compras.next_id() == 6
+
+    compras.update(3, estado='entregada')
+    assert [c['id'] for c in compras.filter(estado='entregada')] == [5, 3]
+    assert sorted(compras.valores('estado')) == ['Pendiente', 'entregada']
+
+    # Un id eliminado no se vuelve a entregar
+    compras.remove(5)
+    assert compras.next_id() == 6
+    assert compras.get(5) is None
+
+
+def test_agregados_se_mantienen_con_las_escrituras():
+    store = MockStore(_datos())
+    agregados = store.agregados
+    assert agregados.ids_stock_bajo() == [2]
+    assert agregados.compras_estado(['pendiente', 'entregada']) == {'pendiente': 1, 'entregada': 0}
+
+    store.registrar_compra({'id': store.compras.next_id(), 'estado': 'pendiente',
+                            'proveedor_id': 2, 'componente_id': 2})
+    store.compras.update(1, estado='entregada')
+    assert agregados.compras_estado(['pendiente', 'entregada']) == {'pendiente': 1, 'entregada': 1}
+
+    store.registrar_movimiento({'id': 1, 'componente_id': 2, 'tipo_movimiento': 'entrada', 'cantidad': 4,
+                                'fecha': '2024-05-01T10:00:00'})
+    store.registrar_movimiento({'id': 2, 'componente_id': 1, 'tipo_movimiento': 'salida', 'cantidad': 7,
+                                'fecha': '2024-05-02T10:00:00'})
+    assert agregados.ids_stock_bajo() == [1]
+    assert agregados.stock_categorias() == {'Motor': 3, 'Transmisión': 7}
+    assert agregados.valor_inventario() == 26.0
+    assert agregados.ultimo_movimiento == '2024-05-02T10:00:00'
+
+    store.maquinas.update(1, activo=False)
+    assert agregados.maquinas_activas == 0
+
+
+def test_dashboard_refleja_compras_y_movimientos(client):
+    resumen = client.get('/api/v1/estadisticas/dashboard').get_json()['data']['resumen']
+
+    compra = client.post('/api/v1/compras', json={
+        'proveedor_id': 1, 'componente_id': 1, 'cantidad': 2, 'precio_unitario': 10
+    })
+    assert compra.status_code == 201
+    movimiento = client.post('/api/v1/stock/movimiento', json={
+        'componente_id': 1, 'tipo_movimiento': 'entrada', 'cantidad': 5
+    })
+    assert movimiento.status_code == 200
+
+    despues = client.get('/api/v1/estadisticas/dashboard').get_json()['data']['resumen']
+    assert despues['total_compras'] == resumen['total_compras'] + 1
+    assert despues['compras_pendientes'] == resumen['compras_pendientes'] + 1
+    assert despues['valor_total_stock'] > resumen['valor_total_stock']
+
+    id = compra.get_json()['data']['id']
+    assert client.put(f'/api/v1/compras/{id}', json={'estado': 'completada'}).status_code == 200
+    final = client.get('/api/v1/estadisticas/dashboard').get_json()['data']['resumen']
+    assert final['compras_pendientes'] == resumen['compras_pendientes']
+
+
+def test_compra_con_proveedor_o_componente_invalido_devuelve_400(client):
+    total = len(client.get('/api/v1/compras').get_json()['data'])
+
+    for body in ({'componente_id': 1}, {'proveedor_id': 1}, {'proveedor_id': 999, 'componente_id': 1},
+                 {'proveedor_id': 1, 'componente_id': 999}):
+        response = client.post('/api/v1/compras', json=dict(body, cantidad=1, precio_unitario=5))
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+    assert len(client.get('/api/v1/compras').get_json()['data']) == total
+
+
+def test_movimiento_con_cantidad_invalida_o_sin_stock_devuelve_400(client):
+    stock = client.get('/api/v1/componentes/1').get_json()['data']['stock_actual']
+
+    for body in ({'tipo_movimiento': 'entrada', 'cantidad': True},
+                 {'tipo_movimiento': 'entrada', 'cantidad': 0},
+                 {'tipo_movimiento': 'salida', 'cantidad': -3},
+                 {'tipo_movimiento': 'ajuste', 'cantidad': -1},
+                 {'tipo_movimiento': 'salida', 'cantidad': stock + 1}):
+        response = client.post('/api/v1/stock/movimiento', json=dict(body, componente_id=1))
+        assert response.status_code == 400
+        assert response.get_json()['success'] is False
+
+    assert client.get('/api/v1/componentes/1').get_json()['data']['stock_actual'] == stock
+    ajuste = client.post('/api/v1/stock/movimiento', json={
+        'componente_id': 1, 'tipo_movimiento': 'ajuste', 'cantidad': 0
+    })
+    assert ajuste.status_code == 200
+    assert client.get('/api/v1/componentes/1').get_json()['data']['stock_actual'] == 0
@@ -9,6 +9,11 @@ from . import api_bp
 from models.componente import Componente
 from extensions import db
 from utils import validate_json, paginate_query, save_uploaded_file
+from utils import keyset_response, wants_cursor_pagination, InvalidCursorError
+from utils.autocomplete import indice_componentes, actualizar_componente
+from utils.cache_respuestas import cache_respuesta
+
+MAX_SUGERENCIAS = 50
 
 @api_bp.route('/componentes', methods=['GET'])
 def get_componentes():
@@ -17,6 +22,7 @@ def get_componentes():
         # Parámetros de consulta
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
+        fields = Componente.parse_fields(request.args.get('fields'))
         search = request.args.get('q', '').strip()
         categoria = request.args.get('categoria')
         activo = request.args.get('activo', 'true').lower() == 'true'
@@ -44,6 +50,10 @@ def get_componentes():
         else:
             query = query.order_by(Componente.nombre.asc())
         
+        # Paginación por cursor (opcional, ?cursor= vacío para la primera página)
+        if wants_cursor_pagination():
+            return keyset_response(query, Componente, sort_by, sort_order, per_page, fields, default_sort='nombre')
+        
         # Paginación
         pagination = query.paginate(
             page=page, 
@@ -53,7 +63,7 @@ def get_componentes():
         
         return jsonify({
             'success': True,
-            'data': [componente.to_dict() for componente in pagination.items],
+            'data': [componente.to_dict(fields) for componente in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'pages': pagination.pages,
@@ -63,7 +73,12 @@ def get_componentes():
                 'has_prev': pagination.has_prev
             }
         })
-        
+    
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -131,6 +146,7 @@ def create_componente():
         )
         
         componente.save()
+        actualizar_componente(componente)
         
         return jsonify({
             'success': True,
@@ -179,6 +195,7 @@ def update_componente(id):
             componente.numero_parte = data['numero_parte']
         
         componente.save()
+        actualizar_componente(componente)
         
         return jsonify({
             'success': True,
@@ -207,6 +224,7 @@ def delete_componente(id):
         # Soft delete: marcar como inactivo
         componente.activo = False
         componente.save()
+        actualizar_componente(componente)
         
         return jsonify({
             'success': True,
@@ -263,7 +281,27 @@ def upload_componente_foto(id):
                 'success': False,
                 'error': 'Error al guardar archivo'
             }), 500
-            
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/componentes/autocomplete', methods=['GET'])
+def autocomplete_componentes():
+    """Sugerencias por número de parte, nombre, marca o modelo (tolera errores de tipeo)"""
+    try:
+        termino = request.args.get('q', '').strip()
+        limit = min(int(request.args.get('limit', 10)), MAX_SUGERENCIAS)
+        
+        sugerencias = indice_componentes().buscar(termino, limit) if termino else []
+        
+        return jsonify({
+            'success': True,
+            'data': sugerencias
+        })
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -271,6 +309,7 @@ def upload_componente_foto(id):
         }), 500
 
 @api_bp.route('/componentes/categorias', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('componentes',))
 def get_categorias():
     """Obtener lista de categorías únicas"""
     try:
@@ -328,10 +367,7 @@ def ajustar_stock_componente(id):
                 'error': 'Cantidad debe ser diferente de cero'
             }), 400
         
-        # Actualizar stock
-        stock_nuevo = componente.actualizar_stock(cantidad, 'ajuste')
-        
-        # Crear registro de movimiento
+        # Actualizar stock y registrar el movimiento (un único UPDATE atómico)
         from models.stock import Stock
         movimiento = Stock.crear_movimiento(
             componente_id=id,
@@ -340,20 +376,25 @@ def ajustar_stock_componente(id):
             motivo=motivo,
             usuario=data.get('usuario', 'Sistema')
         )
-        movimiento.save()
         
         db.session.commit()
         
         return jsonify({
             'success': True,
             'data': {
-                'stock_anterior': stock_nuevo - cantidad,
-                'stock_nuevo': stock_nuevo,
+                'stock_anterior': movimiento.stock_anterior,
+                'stock_nuevo': movimiento.stock_nuevo,
                 'movimiento_id': movimiento.id
             },
             'message': 'Stock ajustado exitosamente'
         })
-        
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
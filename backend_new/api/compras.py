@@ -2,13 +2,16 @@
 API para gestión de compras
 """
 from flask import request, jsonify
-from datetime import datetime, date
+from datetime import datetime
 
 from . import api_bp
 from extensions import db
 from models.compra import Compra
 from models.proveedor import Proveedor
 from models.componente import Componente
+from utils import keyset_response, wants_cursor_pagination, InvalidCursorError
+from utils.cache_respuestas import cache_respuesta
+from utils.time_buckets import hoy_utc
 
 @api_bp.route('/compras', methods=['GET'])
 def get_compras():
@@ -16,6 +19,7 @@ def get_compras():
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
+        fields = Compra.parse_fields(request.args.get('fields'))
         search = request.args.get('q', '').strip()
         estado = request.args.get('estado')
         proveedor_id = request.args.get('proveedor_id')
@@ -23,8 +27,8 @@ def get_compras():
         fecha_inicio = request.args.get('fecha_inicio')
         fecha_fin = request.args.get('fecha_fin')
         
-        # Query base
-        query = Compra.query
+        # Query base (proveedor y componente precargados para evitar N+1)
+        query = Compra.con_relaciones()
         
         # Filtros
         if search:
@@ -74,6 +78,10 @@ def get_compras():
         else:
             query = query.order_by(Compra.fecha_compra.desc())
         
+        # Paginación por cursor (opcional, ?cursor= vacío para la primera página)
+        if wants_cursor_pagination():
+            return keyset_response(query, Compra, sort_by, sort_order, per_page, fields, default_sort='fecha_compra')
+        
         # Paginación
         pagination = query.paginate(
             page=page, 
@@ -83,7 +91,7 @@ def get_compras():
         
         return jsonify({
             'success': True,
-            'data': [compra.to_dict() for compra in pagination.items],
+            'data': [compra.to_dict(fields) for compra in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'pages': pagination.pages,
@@ -94,6 +102,11 @@ def get_compras():
             }
         })
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -165,9 +178,9 @@ def create_compra():
             try:
                 fecha_compra = datetime.strptime(fecha_compra, '%Y-%m-%d').date()
             except ValueError:
-                fecha_compra = date.today()
+                fecha_compra = hoy_utc()
         else:
-            fecha_compra = date.today()
+            fecha_compra = hoy_utc()
         
         fecha_entrega_estimada = data.get('fecha_entrega_estimada')
         if fecha_entrega_estimada:
@@ -342,6 +355,7 @@ def marcar_compra_entregada(id):
         }), 500
 
 @api_bp.route('/compras/estados', methods=['GET'])
+@cache_respuesta(ttl=3600)
 def get_estados_compra():
     """Obtener estados de compra disponibles"""
     return jsonify({
@@ -353,7 +367,7 @@ def get_estados_compra():
 def get_compras_pendientes():
     """Obtener compras pendientes de entrega"""
     try:
-        compras = Compra.pendientes_entrega().all()
+        compras = Compra.con_relaciones(Compra.pendientes_entrega()).all()
         
         return jsonify({
             'success': True,
@@ -371,7 +385,7 @@ def get_compras_pendientes():
 def get_compras_con_retraso():
     """Obtener compras con retraso en entrega"""
     try:
-        compras = Compra.con_retraso().all()
+        compras = Compra.con_relaciones(Compra.con_retraso()).all()
         
         return jsonify({
             'success': True,
@@ -2,7 +2,7 @@
 API para estadísticas y reportes del sistema
 """
 from flask import request, jsonify
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 from sqlalchemy import func, and_, or_
 
 from . import api_bp
@@ -12,8 +12,25 @@ from models.maquina import Maquina
 from models.proveedor import Proveedor
 from models.compra import Compra
 from models.stock import Stock
+from models.estadistica_diaria import EstadisticaDiaria
+from utils.time_buckets import GRANULARIDADES, bucket_expression, hoy_utc, to_date
+from utils.cache_respuestas import cache_respuesta
+
+# Rango máximo para las series de evolución de stock
+MAX_DIAS_EVOLUCION = 3 * 366
+
+
+def _dias_param(default):
+    """Leer ?dias= acotado a 1..MAX_DIAS_EVOLUCION (ValueError si no es entero)"""
+    try:
+        dias = int(request.args.get('dias', default))
+    except ValueError:
+        raise ValueError('dias debe ser un número entero')
+    return min(max(dias, 1), MAX_DIAS_EVOLUCION)
+
 
 @api_bp.route('/estadisticas/dashboard', methods=['GET'])
+@cache_respuesta(ttl=60, tablas=('componentes', 'maquinas', 'proveedores', 'compras', 'stock'))
 def get_dashboard_stats():
     """Obtener estadísticas principales para el dashboard"""
     try:
@@ -33,23 +50,27 @@ def get_dashboard_stats():
             func.sum(Componente.stock_actual * Componente.precio_unitario)
         ).filter(Componente.activo == True).scalar() or 0
         
-        # Compras del mes actual
-        inicio_mes = date.today().replace(day=1)
-        compras_mes = Compra.query.filter(
-            Compra.fecha_compra >= inicio_mes,
-            Compra.estado != 'cancelada'
-        ).count()
+        # Compras del mes actual (desde las estadísticas diarias)
+        inicio_mes = hoy_utc().replace(day=1)
+        compras_mes, valor_compras_mes = db.session.query(
+            func.sum(EstadisticaDiaria.cantidad_registros),
+            func.sum(EstadisticaDiaria.valor_total)
+        ).filter(
+            EstadisticaDiaria.de_compras(),
+            EstadisticaDiaria.fecha >= inicio_mes,
+            EstadisticaDiaria.tipo_movimiento != 'cancelada'
+        ).one()
+        compras_mes = compras_mes or 0
+        valor_compras_mes = valor_compras_mes or 0
         
-        valor_compras_mes = db.session.query(func.sum(Compra.total)).filter(
-            Compra.fecha_compra >= inicio_mes,
-            Compra.estado != 'cancelada'
+        # Movimientos de stock del día (created_at se guarda en UTC)
+        movimientos_hoy = db.session.query(
+            func.sum(EstadisticaDiaria.cantidad_registros)
+        ).filter(
+            EstadisticaDiaria.de_stock(),
+            EstadisticaDiaria.fecha == hoy_utc()
         ).scalar() or 0
         
-        # Movimientos de stock del día
-        movimientos_hoy = Stock.query.filter(
-            func.date(Stock.created_at) == date.today()
-        ).count()
-        
         return jsonify({
             'success': True,
             'data': {
@@ -84,67 +105,64 @@ def get_dashboard_stats():
         }), 500
 
 @api_bp.route('/estadisticas/compras', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('compras', 'proveedores', 'estadisticas_diarias'))
 def get_estadisticas_compras():
     """Obtener estadísticas detalladas de compras"""
     try:
         periodo = request.args.get('periodo', '12')  # meses
         meses = int(periodo)
         
-        fecha_inicio = date.today() - timedelta(days=meses * 30)
+        fecha_inicio = hoy_utc() - timedelta(days=meses * 30)
+        
+        # Todas las consultas leen las estadísticas diarias de compras
+        compras = db.session.query(EstadisticaDiaria).filter(
+            EstadisticaDiaria.de_compras(),
+            EstadisticaDiaria.fecha >= fecha_inicio
+        )
+        no_canceladas = compras.filter(EstadisticaDiaria.tipo_movimiento != 'cancelada')
+        cantidad = func.sum(EstadisticaDiaria.cantidad_registros)
+        total = func.sum(EstadisticaDiaria.valor_total)
         
         # Compras por mes
-        compras_por_mes = db.session.query(
-            func.extract('year', Compra.fecha_compra).label('año'),
-            func.extract('month', Compra.fecha_compra).label('mes'),
-            func.count(Compra.id).label('cantidad'),
-            func.sum(Compra.total).label('total')
-        ).filter(
-            Compra.fecha_compra >= fecha_inicio,
-            Compra.estado != 'cancelada'
-        ).group_by(
-            func.extract('year', Compra.fecha_compra),
-            func.extract('month', Compra.fecha_compra)
-        ).order_by('año', 'mes').all()
+        mes = bucket_expression(
+            EstadisticaDiaria.fecha, 'mes', db.session.get_bind().dialect.name
+        ).label('mes')
+        compras_por_mes = no_canceladas.with_entities(
+            mes, cantidad, total
+        ).group_by(mes).order_by(mes).all()
         
         # Compras por proveedor
-        compras_por_proveedor = db.session.query(
-            Proveedor.nombre,
-            func.count(Compra.id).label('cantidad'),
-            func.sum(Compra.total).label('total')
-        ).join(Compra).filter(
-            Compra.fecha_compra >= fecha_inicio,
-            Compra.estado != 'cancelada'
-        ).group_by(Proveedor.nombre).order_by(func.sum(Compra.total).desc()).limit(10).all()
+        compras_por_proveedor = no_canceladas.with_entities(
+            Proveedor.nombre, cantidad, total
+        ).join(
+            Proveedor, Proveedor.id == EstadisticaDiaria.proveedor_id
+        ).group_by(Proveedor.nombre).order_by(total.desc()).limit(10).all()
         
         # Compras por estado
-        compras_por_estado = db.session.query(
-            Compra.estado,
-            func.count(Compra.id).label('cantidad')
-        ).filter(
-            Compra.fecha_compra >= fecha_inicio
-        ).group_by(Compra.estado).all()
+        compras_por_estado = compras.with_entities(
+            EstadisticaDiaria.tipo_movimiento, cantidad
+        ).group_by(EstadisticaDiaria.tipo_movimiento).having(cantidad > 0).all()
         
         # Componentes más comprados
-        componentes_mas_comprados = db.session.query(
+        componentes_mas_comprados = no_canceladas.with_entities(
             Componente.nombre,
-            func.sum(Compra.cantidad).label('cantidad_total'),
-            func.count(Compra.id).label('ordenes')
-        ).join(Compra).filter(
-            Compra.fecha_compra >= fecha_inicio,
-            Compra.estado != 'cancelada'
-        ).group_by(Componente.nombre).order_by(func.sum(Compra.cantidad).desc()).limit(10).all()
+            func.sum(EstadisticaDiaria.cantidad_total),
+            cantidad
+        ).join(
+            Componente, Componente.id == EstadisticaDiaria.componente_id
+        ).group_by(Componente.nombre).order_by(func.sum(EstadisticaDiaria.cantidad_total).desc()).limit(10).all()
         
         return jsonify({
             'success': True,
             'data': {
                 'por_mes': [
                     {
-                        'año': int(año),
-                        'mes': int(mes),
+                        'año': to_date(inicio).year,
+                        'mes': to_date(inicio).month,
                         'cantidad': cantidad,
                         'total': float(total or 0)
                     }
-                    for año, mes, cantidad, total in compras_por_mes
+                    for inicio, cantidad, total in compras_por_mes
                 ],
                 'por_proveedor': [
                     {
@@ -179,6 +197,7 @@ def get_estadisticas_compras():
         }), 500
 
 @api_bp.route('/estadisticas/stock', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('componentes', 'stock', 'estadisticas_diarias'))
 def get_estadisticas_stock():
     """Obtener estadísticas de stock e inventario"""
     try:
@@ -205,41 +224,28 @@ def get_estadisticas_stock():
         ).order_by((Componente.stock_actual * Componente.precio_unitario).desc()).limit(10).all()
         
         # Movimientos de stock por tipo (últimos 30 días)
-        fecha_inicio = date.today() - timedelta(days=30)
+        fecha_inicio = hoy_utc() - timedelta(days=30)
         movimientos_por_tipo = db.session.query(
-            Stock.tipo_movimiento,
-            func.count(Stock.id).label('cantidad'),
-            func.sum(func.abs(Stock.cantidad)).label('cantidad_total')
+            EstadisticaDiaria.tipo_movimiento,
+            func.sum(EstadisticaDiaria.cantidad_registros).label('cantidad'),
+            func.sum(EstadisticaDiaria.cantidad_total).label('cantidad_total')
         ).filter(
-            Stock.created_at >= fecha_inicio
-        ).group_by(Stock.tipo_movimiento).all()
-        
-        # Evolución del stock (últimos 7 días)
-        entradas_por_dia = []
-        salidas_por_dia = []
-        
-        for i in range(7):
-            dia = date.today() - timedelta(days=i)
-            
-            entradas = db.session.query(func.sum(Stock.cantidad)).filter(
-                func.date(Stock.created_at) == dia,
-                Stock.cantidad > 0
-            ).scalar() or 0
-            
-            salidas = db.session.query(func.sum(func.abs(Stock.cantidad))).filter(
-                func.date(Stock.created_at) == dia,
-                Stock.cantidad < 0
-            ).scalar() or 0
-            
-            entradas_por_dia.append({
-                'fecha': dia.isoformat(),
-                'cantidad': entradas
-            })
-            
-            salidas_por_dia.append({
-                'fecha': dia.isoformat(),
-                'cantidad': salidas
-            })
+            EstadisticaDiaria.de_stock(),
+            EstadisticaDiaria.fecha >= fecha_inicio
+        ).group_by(EstadisticaDiaria.tipo_movimiento).having(
+            func.sum(EstadisticaDiaria.cantidad_registros) > 0
+        ).all()
+        
+        # Evolución del stock (últimos N días, una sola consulta agrupada)
+        try:
+            dias = _dias_param(7)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        hoy = hoy_utc()
+        evolucion = EstadisticaDiaria.evolucion(hoy - timedelta(days=dias - 1), hoy)
         
         return jsonify({
             'success': True,
@@ -271,12 +277,70 @@ def get_estadisticas_stock():
                     for tipo, cantidad, cantidad_total in movimientos_por_tipo
                 ],
                 'evolucion_semanal': {
-                    'entradas': list(reversed(entradas_por_dia)),
-                    'salidas': list(reversed(salidas_por_dia))
+                    'dias': dias,
+                    'entradas': [{'fecha': p['fecha'], 'cantidad': p['entradas']} for p in evolucion],
+                    'salidas': [{'fecha': p['fecha'], 'cantidad': p['salidas']} for p in evolucion]
                 }
             }
         })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@api_bp.route('/estadisticas/stock/evolucion', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('componentes', 'stock', 'estadisticas_diarias'))
+def get_evolucion_stock():
+    """Obtener entradas y salidas de stock agrupadas por día, semana o mes"""
+    try:
+        hoy = hoy_utc()
+        granularidad = request.args.get('granularidad', 'dia')
+        componente_id = request.args.get('componente_id', type=int)
+        
+        try:
+            dias = _dias_param(30)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        try:
+            hasta = datetime.strptime(request.args['hasta'], '%Y-%m-%d').date() if request.args.get('hasta') else hoy
+            if request.args.get('desde'):
+                desde = datetime.strptime(request.args['desde'], '%Y-%m-%d').date()
+            else:
+                desde = hasta - timedelta(days=dias - 1)
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'error': 'Fechas inválidas, usar formato YYYY-MM-DD'
+            }), 400
         
+        if desde > hasta or (hasta - desde).days >= MAX_DIAS_EVOLUCION:
+            return jsonify({
+                'success': False,
+                'error': f'El rango debe ser de 1 a {MAX_DIAS_EVOLUCION} días'
+            }), 400
+        
+        if granularidad not in GRANULARIDADES:
+            return jsonify({
+                'success': False,
+                'error': f"Granularidad debe ser una de: {', '.join(GRANULARIDADES)}"
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'desde': desde.isoformat(),
+                'hasta': hasta.isoformat(),
+                'granularidad': granularidad,
+                'periodos': EstadisticaDiaria.evolucion(desde, hasta, granularidad, componente_id)
+            }
+        })
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -284,22 +348,36 @@ def get_estadisticas_stock():
         }), 500
 
 @api_bp.route('/estadisticas/proveedores', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('proveedores', 'compras', 'estadisticas_diarias'))
 def get_estadisticas_proveedores():
     """Obtener estadísticas de proveedores"""
     try:
-        # Ranking de proveedores por volumen de compras
+        # Ranking de proveedores por volumen de compras (desde las estadísticas diarias)
         ranking_proveedores = db.session.query(
+            Proveedor.id,
             Proveedor.nombre,
             Proveedor.calificacion,
-            func.count(Compra.id).label('total_compras'),
-            func.sum(Compra.total).label('total_gastado'),
+            func.sum(EstadisticaDiaria.cantidad_registros).label('total_compras'),
+            func.sum(EstadisticaDiaria.valor_total).label('total_gastado')
+        ).join(
+            EstadisticaDiaria, EstadisticaDiaria.proveedor_id == Proveedor.id
+        ).filter(
+            EstadisticaDiaria.de_compras(),
+            EstadisticaDiaria.tipo_movimiento != 'cancelada'
+        ).group_by(Proveedor.id, Proveedor.nombre, Proveedor.calificacion)\
+         .order_by(func.sum(EstadisticaDiaria.valor_total).desc()).limit(10).all()
+        
+        # El retraso depende de fechas de entrega, que no se agregan: solo para los proveedores del ranking
+        retraso_por_proveedor = dict(db.session.query(
+            Compra.proveedor_id,
             func.avg(
                 func.extract('day', Compra.fecha_entrega_real - Compra.fecha_entrega_estimada)
-            ).label('promedio_retraso')
-        ).join(Compra).filter(
-            Compra.estado != 'cancelada'
-        ).group_by(Proveedor.id, Proveedor.nombre, Proveedor.calificacion)\
-         .order_by(func.sum(Compra.total).desc()).limit(10).all()
+            )
+        ).filter(
+            Compra.proveedor_id.in_([fila.id for fila in ranking_proveedores]),
+            Compra.estado != 'cancelada',
+            Compra.fecha_entrega_real.isnot(None)
+        ).group_by(Compra.proveedor_id).all()) if ranking_proveedores else {}
         
         # Distribución por tipo de proveedor
         proveedores_por_tipo = db.session.query(
@@ -339,9 +417,9 @@ def get_estadisticas_proveedores():
                         'calificacion': float(calificacion or 0),
                         'total_compras': total_compras,
                         'total_gastado': float(total_gastado or 0),
-                        'promedio_retraso': float(promedio_retraso or 0)
+                        'promedio_retraso': float(retraso_por_proveedor.get(id) or 0)
                     }
-                    for nombre, calificacion, total_compras, total_gastado, promedio_retraso in ranking_proveedores
+                    for id, nombre, calificacion, total_compras, total_gastado in ranking_proveedores
                 ],
                 'por_tipo': [
                     {
@@ -374,6 +452,7 @@ def get_estadisticas_proveedores():
         }), 500
 
 @api_bp.route('/estadisticas/maquinas', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('maquinas',))
 def get_estadisticas_maquinas():
     """Obtener estadísticas de máquinas"""
     try:
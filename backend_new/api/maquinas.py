@@ -7,6 +7,8 @@ from . import api_bp
 from models.maquina import Maquina
 from models.componente import Componente
 from extensions import db
+from utils import keyset_response, wants_cursor_pagination, InvalidCursorError
+from utils.cache_respuestas import cache_respuesta
 
 @api_bp.route('/maquinas', methods=['GET'])
 def get_maquinas():
@@ -14,6 +16,7 @@ def get_maquinas():
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
+        fields = Maquina.parse_fields(request.args.get('fields'))
         search = request.args.get('q', '').strip()
         tipo = request.args.get('tipo')
         activa = request.args.get('activa', 'true').lower() == 'true'
@@ -41,6 +44,14 @@ def get_maquinas():
         else:
             query = query.order_by(Maquina.nombre.asc())
         
+        # Conteos de componentes en la misma consulta de la página (solo si se piden)
+        if fields is None or fields & Maquina.CAMPOS_CONTEOS:
+            query = Maquina.con_conteos_componentes(query)
+        
+        # Paginación por cursor (opcional, ?cursor= vacío para la primera página)
+        if wants_cursor_pagination():
+            return keyset_response(query, Maquina, sort_by, sort_order, per_page, fields, default_sort='nombre')
+        
         # Paginación
         pagination = query.paginate(
             page=page, 
@@ -50,7 +61,7 @@ def get_maquinas():
         
         return jsonify({
             'success': True,
-            'data': [maquina.to_dict() for maquina in pagination.items],
+            'data': [maquina.to_dict(fields) for maquina in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'pages': pagination.pages,
@@ -61,6 +72,11 @@ def get_maquinas():
             }
         })
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -71,7 +87,7 @@ def get_maquinas():
 def get_maquina(id):
     """Obtener una máquina específica"""
     try:
-        maquina = Maquina.get_by_id(id)
+        maquina = Maquina.con_conteos_componentes().filter(Maquina.id == id).first()
         if not maquina:
             return jsonify({
                 'success': False,
@@ -343,6 +359,7 @@ def remove_componente_from_maquina(id, componente_id):
         }), 500
 
 @api_bp.route('/maquinas/tipos', methods=['GET'])
+@cache_respuesta(ttl=300, tablas=('maquinas',))
 def get_tipos_maquina():
     """Obtener tipos de máquina únicos"""
     try:
@@ -6,6 +6,7 @@ from flask import request, jsonify
 from . import api_bp
 from models.proveedor import Proveedor
 from extensions import db
+from utils import keyset_response, wants_cursor_pagination, InvalidCursorError
 
 @api_bp.route('/proveedores', methods=['GET'])
 def get_proveedores():
@@ -13,6 +14,7 @@ def get_proveedores():
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
+        fields = Proveedor.parse_fields(request.args.get('fields'))
         search = request.args.get('q', '').strip()
         tipo = request.args.get('tipo')
         activo = request.args.get('activo', 'true').lower() == 'true'
@@ -40,6 +42,14 @@ def get_proveedores():
         else:
             query = query.order_by(Proveedor.nombre.asc())
         
+        # Totales de compras en la misma consulta de la página (solo si se piden)
+        if fields is None or fields & Proveedor.CAMPOS_TOTALES:
+            query = Proveedor.con_totales_compras(query)
+        
+        # Paginación por cursor (opcional, ?cursor= vacío para la primera página)
+        if wants_cursor_pagination():
+            return keyset_response(query, Proveedor, sort_by, sort_order, per_page, fields, default_sort='nombre')
+        
         # Paginación
         pagination = query.paginate(
             page=page, 
@@ -49,7 +59,7 @@ def get_proveedores():
         
         return jsonify({
             'success': True,
-            'data': [proveedor.to_dict() for proveedor in pagination.items],
+            'data': [proveedor.to_dict(fields) for proveedor in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'pages': pagination.pages,
@@ -60,6 +70,11 @@ def get_proveedores():
             }
         })
         
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -70,7 +85,7 @@ def get_proveedores():
 def get_proveedor(id):
     """Obtener un proveedor específico"""
     try:
-        proveedor = Proveedor.get_by_id(id)
+        proveedor = Proveedor.con_totales_compras().filter(Proveedor.id == id).first()
         if not proveedor:
             return jsonify({
                 'success': False,
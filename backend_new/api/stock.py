@@ -2,12 +2,62 @@
 API para gestión de stock y movimientos de inventario
 """
 from flask import request, jsonify
-from datetime import datetime, date
+from datetime import datetime
 
 from . import api_bp
-from models.stock import Stock
+from models.stock import Stock, MovimientoConcurrenteError
 from models.componente import Componente
 from extensions import db
+from utils import keyset_response, wants_cursor_pagination, InvalidCursorError
+from utils.cache_respuestas import cache_respuesta
+from utils.time_buckets import hoy_utc
+
+TIPOS_MOVIMIENTO = ['entrada', 'salida', 'ajuste', 'compra', 'consumo', 'devolucion']
+
+# Máximo de movimientos aceptados en un lote
+MAX_MOVIMIENTOS_LOTE = 500
+
+# Resultado de los movimientos válidos cuando el lote todo_o_nada se rechaza
+NO_APLICADO = 'no aplicado: lote rechazado'
+
+def _normalizar_movimiento(data):
+    """Validar un movimiento recibido y devolver los argumentos para Stock"""
+    if not isinstance(data, dict):
+        raise ValueError('Cada movimiento debe ser un objeto')
+    
+    for field in ['componente_id', 'tipo_movimiento', 'cantidad']:
+        if field not in data:
+            raise ValueError(f'Campo {field} es requerido')
+    
+    componente_id = data['componente_id']
+    if isinstance(componente_id, str) and componente_id.strip().isdigit():
+        componente_id = int(componente_id)
+    if isinstance(componente_id, bool) or not isinstance(componente_id, int):
+        raise ValueError('componente_id debe ser un número entero')
+    
+    try:
+        cantidad = int(data['cantidad'])
+    except (TypeError, ValueError):
+        raise ValueError('Cantidad debe ser un número entero')
+    
+    tipo_movimiento = data['tipo_movimiento']
+    if tipo_movimiento not in TIPOS_MOVIMIENTO:
+        raise ValueError(f'Tipo de movimiento debe ser uno de: {", ".join(TIPOS_MOVIMIENTO)}')
+    
+    # Para salidas, hacer la cantidad negativa
+    if tipo_movimiento in ['salida', 'consumo'] and cantidad > 0:
+        cantidad = -cantidad
+    
+    return {
+        'componente_id': componente_id,
+        'tipo_movimiento': tipo_movimiento,
+        'cantidad': cantidad,
+        'motivo': data.get('motivo', 'Movimiento manual'),
+        'usuario': data.get('usuario', 'Sistema'),
+        'precio_unitario': data.get('precio_unitario'),
+        'numero_documento': data.get('numero_documento'),
+        'observaciones': data.get('observaciones')
+    }
 
 @api_bp.route('/stock', methods=['GET'])
 def get_movimientos_stock():
@@ -15,13 +65,14 @@ def get_movimientos_stock():
     try:
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
+        fields = Stock.parse_fields(request.args.get('fields'))
         componente_id = request.args.get('componente_id')
         tipo_movimiento = request.args.get('tipo_movimiento')
         fecha_inicio = request.args.get('fecha_inicio')
         fecha_fin = request.args.get('fecha_fin')
         
-        # Query base
-        query = Stock.query
+        # Query base (componente precargado para evitar N+1)
+        query = Stock.con_relaciones()
         
         # Filtros
         if componente_id:
@@ -50,6 +101,10 @@ def get_movimientos_stock():
         # Ordenamiento
         query = query.order_by(Stock.created_at.desc())
         
+        # Paginación por cursor (opcional, ?cursor= vacío para la primera página)
+        if wants_cursor_pagination():
+            return keyset_response(query, Stock, 'created_at', 'desc', per_page, fields, default_sort='created_at')
+        
         # Paginación
         pagination = query.paginate(
             page=page, 
@@ -59,7 +114,7 @@ def get_movimientos_stock():
         
         return jsonify({
             'success': True,
-            'data': [movimiento.to_dict() for movimiento in pagination.items],
+            'data': [movimiento.to_dict(fields) for movimiento in pagination.items],
             'pagination': {
                 'page': pagination.page,
                 'pages': pagination.pages,
@@ -69,7 +124,12 @@ def get_movimientos_stock():
                 'has_prev': pagination.has_prev
             }
         })
-        
+    
+    except InvalidCursorError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -91,7 +151,7 @@ def get_movimiento_stock(id):
             'success': True,
             'data': movimiento.to_dict()
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -102,68 +162,20 @@ def get_movimiento_stock(id):
 def crear_movimiento_stock():
     """Crear un nuevo movimiento de stock"""
     try:
-        data = request.get_json()
-        
-        # Validaciones
-        required_fields = ['componente_id', 'tipo_movimiento', 'cantidad']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False,
-                    'error': f'Campo {field} es requerido'
-                }), 400
-        
-        componente_id = data['componente_id']
-        tipo_movimiento = data['tipo_movimiento']
-        cantidad = data['cantidad']
-        motivo = data.get('motivo', 'Movimiento manual')
-        usuario = data.get('usuario', 'Sistema')
-        precio_unitario = data.get('precio_unitario')
-        numero_documento = data.get('numero_documento')
-        observaciones = data.get('observaciones')
+        # Mismas validaciones que cada movimiento de un lote
+        movimiento = _normalizar_movimiento(request.get_json(silent=True))
         
         # Validar componente
-        componente = Componente.get_by_id(componente_id)
+        componente = Componente.get_by_id(movimiento['componente_id'])
         if not componente:
             return jsonify({
                 'success': False,
                 'error': 'Componente no encontrado'
             }), 404
         
-        # Validar cantidad
-        try:
-            cantidad = int(cantidad)
-        except ValueError:
-            return jsonify({
-                'success': False,
-                'error': 'Cantidad debe ser un número entero'
-            }), 400
-        
-        # Validar tipo de movimiento
-        tipos_validos = ['entrada', 'salida', 'ajuste', 'compra', 'consumo', 'devolucion']
-        if tipo_movimiento not in tipos_validos:
-            return jsonify({
-                'success': False,
-                'error': f'Tipo de movimiento debe ser uno de: {", ".join(tipos_validos)}'
-            }), 400
-        
-        # Para salidas, hacer la cantidad negativa
-        if tipo_movimiento in ['salida', 'consumo'] and cantidad > 0:
-            cantidad = -cantidad
-        
         # Crear movimiento
-        movimiento = Stock.crear_movimiento(
-            componente_id=componente_id,
-            tipo_movimiento=tipo_movimiento,
-            cantidad=cantidad,
-            motivo=motivo,
-            usuario=usuario,
-            precio_unitario=precio_unitario,
-            numero_documento=numero_documento,
-            observaciones=observaciones
-        )
+        movimiento = Stock.crear_movimiento(**movimiento)
         
-        movimiento.save()
         db.session.commit()
         
         return jsonify({
@@ -171,7 +183,7 @@ def crear_movimiento_stock():
             'data': movimiento.to_dict(),
             'message': 'Movimiento de stock creado exitosamente'
         }), 201
-        
+    
     except ValueError as e:
         db.session.rollback()
         return jsonify({
@@ -185,6 +197,122 @@ def crear_movimiento_stock():
             'error': str(e)
         }), 500
 
+@api_bp.route('/stock/movimientos/lote', methods=['POST'])
+def crear_movimientos_lote():
+    """
+    Crear varios movimientos de stock en una sola transacción
+    
+    Body: {"movimientos": [...], "modo": "todo_o_nada" | "parcial"}
+    En modo todo_o_nada (por defecto) no se aplica nada si algún movimiento
+    falla; en modo parcial se aplican los válidos. Siempre se devuelve un
+    resultado por movimiento, en el mismo orden recibido: si el lote se
+    rechaza, los movimientos sin error propio figuran como no aplicados.
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('movimientos') if isinstance(data, dict) else data
+        modo = data.get('modo', 'todo_o_nada') if isinstance(data, dict) else 'todo_o_nada'
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({
+                'success': False,
+                'error': 'Se requiere una lista de movimientos'
+            }), 400
+        
+        if len(items) > MAX_MOVIMIENTOS_LOTE:
+            return jsonify({
+                'success': False,
+                'error': f'El lote admite hasta {MAX_MOVIMIENTOS_LOTE} movimientos'
+            }), 400
+        
+        if modo not in ['todo_o_nada', 'parcial']:
+            return jsonify({
+                'success': False,
+                'error': 'Modo debe ser uno de: todo_o_nada, parcial'
+            }), 400
+        
+        # Validar formato de todos los movimientos antes de tocar la base
+        validos = []
+        errores = {}
+        for indice, item in enumerate(items):
+            try:
+                validos.append((indice, _normalizar_movimiento(item)))
+            except ValueError as e:
+                errores[indice] = str(e)
+        
+        resultados = {
+            indice: {'indice': indice, 'success': False, 'error': error}
+            for indice, error in errores.items()
+        }
+        aplicado = False
+        if validos and (modo == 'parcial' or not errores):
+            resultados_stock, aplicado = Stock.crear_movimientos_lote(
+                [movimiento for _, movimiento in validos],
+                parcial=(modo == 'parcial')
+            )
+            for (indice, _), resultado in zip(validos, resultados_stock):
+                resultados[indice] = dict(resultado, indice=indice)
+        else:
+            # Lote rechazado por formato: los movimientos válidos no se evaluaron contra el stock
+            for indice, _ in validos:
+                resultados[indice] = {'indice': indice, 'success': True}
+        
+        # Errores propios de cada movimiento (sin contar los no aplicados)
+        con_error = sum(1 for resultado in resultados.values() if not resultado['success'])
+        
+        if aplicado:
+            db.session.flush()
+            for resultado in resultados.values():
+                if 'movimiento' in resultado:
+                    resultado['movimiento'] = resultado['movimiento'].id
+            db.session.commit()
+            # Recargar en bloque los movimientos creados (el commit los expiró)
+            ids = [resultado['movimiento'] for resultado in resultados.values() if 'movimiento' in resultado]
+            creados = {m.id: m for m in Stock.con_relaciones(Stock.query.filter(Stock.id.in_(ids)))}
+        else:
+            db.session.rollback()
+            # Lote rechazado: tampoco quedó registrado ninguno de los válidos
+            for resultado in resultados.values():
+                if resultado['success']:
+                    resultado.pop('movimiento', None)
+                    resultado.update(success=False, error=NO_APLICADO)
+        
+        aplicados = 0
+        for resultado in resultados.values():
+            movimiento_id = resultado.pop('movimiento', None)
+            if movimiento_id is not None and aplicado:
+                resultado['data'] = creados[movimiento_id].to_dict()
+                aplicados += 1
+        
+        response = {
+            'success': aplicado,
+            'data': [resultados[indice] for indice in range(len(items))],
+            'resumen': {
+                'modo': modo,
+                'total': len(items),
+                'aplicados': aplicados,
+                'con_error': con_error,
+                'no_aplicados': len(items) - aplicados - con_error
+            }
+        }
+        if not aplicado:
+            response['error'] = 'No se aplicó ningún movimiento del lote'
+        
+        return jsonify(response), 201 if aplicado else 400
+    
+    except MovimientoConcurrenteError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @api_bp.route('/stock/componente/<int:componente_id>', methods=['GET'])
 def get_movimientos_por_componente(componente_id):
     """Obtener movimientos de stock de un componente específico"""
@@ -199,7 +327,7 @@ def get_movimientos_por_componente(componente_id):
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
         
-        movimientos_query = Stock.por_componente(componente_id)
+        movimientos_query = Stock.con_relaciones(Stock.por_componente(componente_id))
         
         pagination = movimientos_query.paginate(
             page=page, 
@@ -226,7 +354,7 @@ def get_movimientos_por_componente(componente_id):
                 'has_prev': pagination.has_prev
             }
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -252,7 +380,7 @@ def get_resumen_stock():
         
         # Movimientos recientes
         movimientos_hoy = Stock.query.filter(
-            db.func.date(Stock.created_at) == date.today()
+            db.func.date(Stock.created_at) == hoy_utc()
         ).count()
         
         # Tipos de movimientos más comunes
@@ -279,7 +407,7 @@ def get_resumen_stock():
                 }
             }
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -287,6 +415,7 @@ def get_resumen_stock():
         }), 500
 
 @api_bp.route('/stock/tipos-movimiento', methods=['GET'])
+@cache_respuesta(ttl=3600)
 def get_tipos_movimiento():
     """Obtener tipos de movimiento disponibles"""
     return jsonify({
@@ -308,7 +437,7 @@ def get_entradas_stock():
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
         
-        query = Stock.entradas().order_by(Stock.created_at.desc())
+        query = Stock.con_relaciones(Stock.entradas()).order_by(Stock.created_at.desc())
         
         pagination = query.paginate(
             page=page, 
@@ -328,7 +457,7 @@ def get_entradas_stock():
                 'has_prev': pagination.has_prev
             }
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -342,7 +471,7 @@ def get_salidas_stock():
         page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 20)), 100)
         
-        query = Stock.salidas().order_by(Stock.created_at.desc())
+        query = Stock.con_relaciones(Stock.salidas()).order_by(Stock.created_at.desc())
         
         pagination = query.paginate(
             page=page, 
@@ -362,7 +491,7 @@ def get_salidas_stock():
                 'has_prev': pagination.has_prev
             }
         })
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
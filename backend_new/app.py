@@ -24,6 +24,10 @@ def create_app(config_name=None):
     # Inicializar extensiones
     init_app(app)
     
+    # Caché de respuestas de catálogos y estadísticas
+    from utils.cache_respuestas import init_cache_respuestas
+    init_cache_respuestas(app)
+    
     # Configurar CORS
     CORS(app, resources={
         r"/api/*": {
@@ -46,13 +50,35 @@ def create_app(config_name=None):
     # Configurar rutas de salud
     configure_health_routes(app)
     
+    # Registrar comandos de consola
+    configure_cli_commands(app)
+    
     # Crear tablas si no existen (solo en desarrollo)
     if config_name == 'development':
         with app.app_context():
             db.create_all()
     
+    # Cargar índices en memoria
+    configure_autocomplete(app)
+    
     return app
 
+def configure_autocomplete(app):
+    """Construir el índice de autocompletado de componentes al iniciar"""
+    if not app.config.get('AUTOCOMPLETE_PRECARGAR'):
+        return
+    
+    from utils.autocomplete import construir_indice_componentes
+    
+    with app.app_context():
+        try:
+            indice = construir_indice_componentes(app)
+            app.logger.info(f'Índice de autocompletado: {len(indice)} componentes')
+        except Exception as e:
+            # Base sin tablas o no disponible: se construirá en la primera consulta
+            db.session.rollback()
+            app.logger.warning(f'No se pudo precargar el índice de autocompletado: {e}')
+
 def configure_error_handlers(app):
     """Configurar manejadores de errores globales"""
     
@@ -73,6 +99,52 @@ def configure_error_handlers(app):
     def forbidden(error):
         return jsonify({'error': 'Acceso denegado'}), 403
 
+def configure_cli_commands(app):
+    """Registrar comandos `flask ...` de mantenimiento"""
+    
+    @app.cli.command('rebuild-estadisticas')
+    def rebuild_estadisticas():
+        """Reconstruir las estadísticas diarias desde stock y compras"""
+        import click
+        from models.estadistica_diaria import EstadisticaDiaria
+        
+        filas = EstadisticaDiaria.reconstruir()
+        db.session.commit()
+        click.echo(f'Estadísticas diarias reconstruidas: {filas} filas')
+    
+    @app.cli.command('rebuild-totales-proveedores')
+    def rebuild_totales_proveedores():
+        """Agregar las columnas de totales de compras si faltan y recalcularlas"""
+        import click
+        from models.proveedor import Proveedor
+        
+        agregadas = Proveedor.agregar_columnas_totales()
+        Proveedor.recalcular_totales()
+        db.session.commit()
+        if agregadas:
+            click.echo(f"Columnas agregadas a proveedores: {', '.join(agregadas)}")
+        click.echo('Totales de compras de proveedores recalculados')
+    
+    @app.cli.command('normalize-timestamps')
+    def normalize_timestamps():
+        """Reescribir en SQLite los DateTime sin fracción (filas creadas con CURRENT_TIMESTAMP)"""
+        import click
+        from utils.timestamps import normalizar_timestamps
+        
+        valores = normalizar_timestamps()
+        db.session.commit()
+        click.echo(f'Fechas normalizadas: {valores} valores')
+    
+    @app.cli.command('rebuild-busqueda')
+    def rebuild_busqueda():
+        """Crear y poblar los índices de texto de componentes, máquinas y proveedores"""
+        import click
+        from utils.search import instalar_indices
+        
+        tablas = instalar_indices()
+        db.session.commit()
+        click.echo(f"Índices de búsqueda disponibles: {', '.join(tablas) or 'ninguno (motor sin soporte)'}")
+
 def configure_health_routes(app):
     """Configurar rutas de salud y monitoreo"""
     
@@ -93,6 +165,29 @@ def configure_health_routes(app):
             'version': '1.0.0'
         })
     
+    @app.route('/health/pool')
+    def pool_status():
+        """Conexiones del pool en uso, overflow y tiempos de espera de este proceso"""
+        from utils.db_engine import estado_pool
+        
+        return jsonify({
+            'success': True,
+            'data': estado_pool(db.engine),
+            'pid': os.getpid()
+        })
+    
+    @app.route('/health/cache')
+    def cache_status():
+        """Entradas, aciertos e invalidaciones de la caché de respuestas de este proceso"""
+        from utils.cache_respuestas import cache_actual
+        
+        cache = cache_actual()
+        return jsonify({
+            'success': True,
+            'data': cache.estado() if cache is not None else None,
+            'pid': os.getpid()
+        })
+    
     @app.route('/api/test')
     def api_test():
         """Endpoint de prueba de API"""
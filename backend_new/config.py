@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Cargar variables de entorno
@@ -20,6 +21,38 @@ class Config:
     SQLALCHEMY_DATABASE_URI = DATABASE_URL or 'sqlite:///sistema_agricola.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Pool de conexiones por proceso; vacío = calculado según GUNICORN_THREADS
+    # (ver utils/db_engine.py). Timeouts en milisegundos, 0 para desactivar.
+    DB_POOL_SIZE = os.environ.get('DB_POOL_SIZE')
+    DB_MAX_OVERFLOW = os.environ.get('DB_MAX_OVERFLOW')
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    
+    # Caché de respuestas GET de catálogos y estadísticas (ETag / 304)
+    RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 512))
+    # Segundos máximos de una copia en el LRU local (vacío = TTL del endpoint)
+    RESPONSE_CACHE_LOCAL_TTL = int(os.environ['RESPONSE_CACHE_LOCAL_TTL']) if os.environ.get('RESPONSE_CACHE_LOCAL_TTL') else None
+    
+    # Almacén compartido entre workers: local (ninguno), sqlite o redis
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH') or os.path.join(tempfile.gettempdir(), 'agricola_cache.db')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL') or os.environ.get('REDIS_URL')
+    # Cada cuánto lee cada worker los eventos de invalidación del archivo SQLite
+    CACHE_EVENTOS_INTERVALO_MS = int(os.environ.get('CACHE_EVENTOS_INTERVALO_MS', 50))
+    
+    # Totales de compras guardados en cada proveedor en lugar de calcularse al listar
+    # (requiere las columnas compras_* en la tabla proveedores)
+    PROVEEDOR_TOTALES_DENORMALIZADOS = os.environ.get('PROVEEDOR_TOTALES_DENORMALIZADOS', 'false').lower() == 'true'
+    
+    # Índice en memoria de /componentes/autocomplete: se carga al iniciar y
+    # se reconstruye si tiene más de AUTOCOMPLETE_MAX_EDAD segundos (cubre
+    # cambios hechos por otros procesos; 0 para no vencer nunca)
+    AUTOCOMPLETE_PRECARGAR = os.environ.get('AUTOCOMPLETE_PRECARGAR', 'true').lower() == 'true'
+    AUTOCOMPLETE_MAX_EDAD = int(os.environ.get('AUTOCOMPLETE_MAX_EDAD', 300))
+    
     # Configuración de archivos
     BASE_DIR = os.path.abspath(os.path.dirname(__file__))
     UPLOAD_FOLDER = os.path.join(BASE_DIR, 'static', 'uploads')
@@ -49,12 +82,16 @@ class ProductionConfig(Config):
     """Configuración para producción"""
     DEBUG = False
     SQLALCHEMY_ECHO = False
+    # gunicorn corre varios workers: compartir la caché entre ellos
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND') or ('redis' if os.environ.get('REDIS_URL') else 'sqlite')
 
 class TestingConfig(Config):
     """Configuración para pruebas"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    AUTOCOMPLETE_PRECARGAR = False
+    CACHE_BACKEND = 'local'
 
 # Configuraciones disponibles
 config = {
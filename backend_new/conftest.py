@@ -0,0 +1,59 @@
+"""
+Fixtures de pytest para el backend reimplementado (pytest-flask)
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# Los módulos de backend_new se importan sin prefijo de paquete (from extensions import db)
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if sys.path[0] != BACKEND_DIR:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Importar ya el config de backend_new: pytest antepone la raíz del repo al path
+# y ahí existe otro config.py que create_app() importaría en su lugar
+import config  # noqa: F401
+from app import create_app
+from extensions import db as _db
+from models.stock import Stock
+
+
+@pytest.fixture
+def app():
+    """Aplicación con base SQLite en memoria y tablas creadas"""
+    app = create_app('testing')
+    with app.app_context():
+        _db.create_all()
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+    # Las cachés en memoria sobreviven a la base de cada prueba
+    Stock.limpiar_cache_resumenes()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@contextmanager
+def _contar_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries(db):
+    """Context manager que registra las sentencias SQL ejecutadas"""
+    return lambda: _contar_queries(db.engine)
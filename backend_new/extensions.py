@@ -10,5 +10,12 @@ migrate = Migrate()
 
 def init_app(app):
     """Inicializar extensiones con la aplicación Flask"""
+    from utils.db_engine import opciones_engine, configurar_engine
+    
+    # Pool y timeouts según el motor (ver utils/db_engine.py)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opciones_engine(app.config)
     db.init_app(app)
     migrate.init_app(app, db)
+    
+    with app.app_context():
+        configurar_engine(app, db.engine)
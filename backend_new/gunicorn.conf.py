@@ -0,0 +1,21 @@
+# gunicorn.conf.py - Configuración de gunicorn para backend_new
+#   cd backend_new && gunicorn -c gunicorn.conf.py 'app:create_app()'
+# Solo aplica a backend_new: el Procfile de la raíz (run:app, backend/) sigue
+# con la configuración por defecto de gunicorn (un worker sync)
+import os
+
+# Procesos y threads por proceso; backend_new dimensiona su pool de
+# conexiones con GUNICORN_THREADS (utils/db_engine.py)
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+keepalive = 5
+
+# Reciclar workers de a poco para acotar memoria
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+# Sin variable GUNICORN_THREADS, la app ve el valor que usa gunicorn
+os.environ.setdefault('GUNICORN_THREADS', str(threads))
@@ -6,11 +6,13 @@ from .maquina import Maquina
 from .proveedor import Proveedor
 from .compra import Compra
 from .stock import Stock
+from .estadistica_diaria import EstadisticaDiaria
 
 __all__ = [
     'Componente', 
     'Maquina', 
     'Proveedor', 
     'Compra', 
-    'Stock'
+    'Stock',
+    'EstadisticaDiaria'
 ]
@@ -1,20 +1,154 @@
 """
 Modelo base simplificado para todos los modelos del sistema
 """
-from datetime import datetime
+from datetime import date
+from decimal import Decimal
+from operator import attrgetter
+
+from sqlalchemy import Column, event, inspect
+from sqlalchemy.orm import Mapper
+
+# Serializadores compilados por modelo para subconjuntos de ?fields=
+MAX_SERIALIZERS = 64
+
+
+def _iso(value):
+    return value.isoformat()
+
+
+def _decimal(value):
+    return float(value)
+
+
+def _converter_for(column):
+    """Conversor JSON de una columna según su tipo (None si no necesita)"""
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return None
+    if issubclass(python_type, date):  # date y datetime
+        return _iso
+    if python_type is Decimal:
+        return _decimal
+    # JSON, texto, enteros y booleanos se serializan tal cual
+    return None
+
+
+def _extra_value(value):
+    """Convertir el valor de un campo calculado (su tipo no se conoce de antemano)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class RowSerializer:
+    """
+    Serializador de filas compilado para un modelo y un conjunto de campos.
+    
+    Las columnas, sus conversores y los campos calculados se resuelven una
+    sola vez; serializar una fila es una lectura con attrgetter y la
+    conversión de las columnas que la necesitan.
+    """
+    
+    def __init__(self, columns, extras):
+        self.keys = tuple(key for key, _ in columns)
+        self._convert = tuple((i, conv) for i, (_, conv) in enumerate(columns) if conv)
+        self._extras = tuple(extras)
+        
+        if len(self.keys) == 1:
+            getter = attrgetter(self.keys[0])
+            self._values = lambda obj: [getter(obj)]
+        elif self.keys:
+            getter = attrgetter(*self.keys)
+            self._values = lambda obj: list(getter(obj))
+        else:
+            self._values = lambda obj: []
+    
+    def __call__(self, obj):
+        values = self._values(obj)
+        for i, conv in self._convert:
+            if values[i] is not None:
+                values[i] = conv(values[i])
+        result = dict(zip(self.keys, values))
+        for name, func in self._extras:
+            result[name] = _extra_value(func(obj))
+        return result
+
 
 class BaseModelMixin:
     """Mixin con funcionalidades comunes para todos los modelos"""
     
-    def to_dict(self):
+    # Campos calculados agregados a to_dict: nombre -> función(instancia)
+    extra_fields = {}
+    
+    @classmethod
+    def _column_converters(cls):
+        columns = cls.__dict__.get('_columns_cache')
+        if columns is None:
+            # Solo columnas de la tabla cargadas por defecto: las diferidas y las
+            # expresiones de consulta (query_expression) se exponen vía extra_fields
+            columns = tuple(
+                (attr.key, _converter_for(attr.columns[0]))
+                for attr in inspect(cls).column_attrs
+                if isinstance(attr.columns[0], Column) and not attr.deferred
+            )
+            cls._columns_cache = columns
+        return columns
+    
+    @classmethod
+    def serializer(cls, fields=None):
+        """
+        Obtener el serializador compilado del modelo
+        
+        Args:
+            fields: Conjunto de campos a incluir (None para todos)
+        
+        Returns:
+            RowSerializer cacheado por modelo y conjunto de campos conocidos
+            (hasta MAX_SERIALIZERS combinaciones; el resto se compila cada vez)
+        """
+        cache = cls.__dict__.get('_serializers_cache')
+        if cache is None:
+            cache = cls._serializers_cache = {}
+        
+        columns = cls._column_converters()
+        key = None
+        if fields:
+            # La clave solo contiene nombres conocidos: los desconocidos no generan entradas
+            key = frozenset(fields) & ({name for name, _ in columns} | set(cls.extra_fields))
+            if len(key) == len(columns) + len(cls.extra_fields):
+                key = None
+        
+        serializer = cache.get(key)
+        if serializer is None:
+            extras = cls.extra_fields.items()
+            if key is not None:
+                columns = [col for col in columns if col[0] in key]
+                extras = [(name, func) for name, func in extras if name in key]
+            serializer = RowSerializer(columns, extras)
+            if key is None or len(cache) < MAX_SERIALIZERS:
+                cache[key] = serializer
+        return serializer
+    
+    @classmethod
+    def parse_fields(cls, raw):
+        """
+        Interpretar el parámetro ?fields=a,b,c
+        
+        Los nombres desconocidos se ignoran; devuelve None si no queda ninguno
+        (es decir, todos los campos).
+        """
+        if not raw:
+            return None
+        known = {key for key, _ in cls._column_converters()} | set(cls.extra_fields)
+        fields = {name.strip() for name in raw.split(',')} & known
+        return fields or None
+    
+    def to_dict(self, fields=None):
         """Convertir modelo a diccionario"""
-        result = {}
-        for column in self.__table__.columns:
-            value = getattr(self, column.name)
-            if isinstance(value, datetime):
-                value = value.isoformat()
-            result[column.name] = value
-        return result
+        return self.serializer(fields)(self)
     
     def save(self):
         """Guardar el modelo en la base de datos"""
@@ -41,3 +175,10 @@ class BaseModelMixin:
     
     def __repr__(self):
         return f'<{self.__class__.__name__} {getattr(self, "id", "unknown")}>'
+
+
+@event.listens_for(Mapper, 'mapper_configured')
+def _compilar_serializador(mapper, cls):
+    """Resolver columnas y conversores al configurar los mappers, no en la primera request"""
+    if issubclass(cls, BaseModelMixin):
+        cls.serializer()
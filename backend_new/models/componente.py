@@ -1,7 +1,9 @@
 """
 Modelo de Componente
 """
+from datetime import datetime
 from extensions import db
+from utils.search import buscar_texto, registrar_busqueda
 from .base_mixin import BaseModelMixin
 
 class Componente(BaseModelMixin, db.Model):
@@ -10,8 +12,8 @@ class Componente(BaseModelMixin, db.Model):
     
     # Información básica
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
-    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     numero_parte = db.Column(db.String(100), unique=True, nullable=False, index=True)
     nombre = db.Column(db.String(200), nullable=False, index=True)
@@ -43,6 +45,13 @@ class Componente(BaseModelMixin, db.Model):
     compras = db.relationship('Compra', backref='componente_ref', lazy='dynamic')
     movimientos_stock = db.relationship('Stock', backref='componente_ref', lazy='dynamic')
     
+    # Información extendida para to_dict
+    extra_fields = {
+        'necesita_restock': lambda c: c.necesita_restock,
+        'valor_total_stock': lambda c: c.valor_total_stock,
+        'precio_formateado': lambda c: f"{c.moneda} {c.precio_unitario or 0:,.2f}"
+    }
+    
     def __init__(self, numero_parte, nombre, **kwargs):
         self.numero_parte = numero_parte
         self.nombre = nombre
@@ -61,45 +70,20 @@ class Componente(BaseModelMixin, db.Model):
         return float(self.stock_actual * (self.precio_unitario or 0))
     
     def actualizar_stock(self, cantidad, tipo_movimiento='manual'):
-        """Actualizar stock del componente"""
-        self.stock_actual += cantidad
-        
-        # Crear registro en tabla de movimientos
+        """Actualizar stock del componente y registrar el movimiento"""
         from .stock import Stock
-        movimiento = Stock(
+        movimiento = Stock.crear_movimiento(
             componente_id=self.id,
             tipo_movimiento=tipo_movimiento,
-            cantidad=cantidad,
-            stock_anterior=self.stock_actual - cantidad,
-            stock_nuevo=self.stock_actual
+            cantidad=cantidad
         )
-        db.session.add(movimiento)
         
-        return self.stock_actual
-    
-    def to_dict(self):
-        """Convertir a diccionario con información extendida"""
-        data = super().to_dict()
-        data.update({
-            'necesita_restock': self.necesita_restock,
-            'valor_total_stock': self.valor_total_stock,
-            'precio_formateado': f"{self.moneda} {self.precio_unitario or 0:,.2f}"
-        })
-        return data
+        return movimiento.stock_nuevo
     
     @classmethod
     def buscar(cls, termino):
-        """Buscar componentes por término"""
-        termino = f"%{termino}%"
-        return cls.query.filter(
-            db.or_(
-                cls.nombre.ilike(termino),
-                cls.numero_parte.ilike(termino),
-                cls.descripcion.ilike(termino),
-                cls.categoria.ilike(termino),
-                cls.marca.ilike(termino)
-            )
-        ).filter(cls.activo == True)
+        """Buscar componentes por término (por relevancia si hay índice de texto)"""
+        return buscar_texto(cls, termino).filter(cls.activo == True)
     
     @classmethod
     def por_categoria(cls, categoria):
@@ -119,3 +103,13 @@ class Componente(BaseModelMixin, db.Model):
     
     def __repr__(self):
         return f'<Componente {self.numero_parte}: {self.nombre}>'
+
+
+# Campos de buscar() con su peso en el ranking
+registrar_busqueda(Componente, {
+    'nombre': 10,
+    'numero_parte': 10,
+    'marca': 4,
+    'categoria': 2,
+    'descripcion': 1,
+})
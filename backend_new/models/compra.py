@@ -3,19 +3,26 @@ Modelo de Compra
 """
 from datetime import datetime, date
 from extensions import db
+from utils.time_buckets import hoy_utc
 from .base_mixin import BaseModelMixin
 
 class Compra(BaseModelMixin, db.Model):
     """Modelo para registrar compras de componentes"""
     __tablename__ = 'compras'
+    __table_args__ = (
+        # Índice para la paginación por cursor (fecha_compra, id)
+        db.Index('ix_compras_fecha_compra_id', 'fecha_compra', 'id'),
+        # Índice para los totales de compras por proveedor
+        db.Index('ix_compras_proveedor_fecha', 'proveedor_id', 'fecha_compra'),
+    )
     
     # Información básica
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
-    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     numero_compra = db.Column(db.String(100), unique=True, nullable=False, index=True)
-    fecha_compra = db.Column(db.Date, default=date.today, nullable=False)
+    fecha_compra = db.Column(db.Date, default=hoy_utc, nullable=False)
     fecha_entrega_estimada = db.Column(db.Date)
     fecha_entrega_real = db.Column(db.Date)
     
@@ -46,6 +53,16 @@ class Compra(BaseModelMixin, db.Model):
     # Archivos relacionados
     documentos = db.Column(db.JSON)  # Array de rutas a documentos
     
+    # Información extendida para to_dict
+    extra_fields = {
+        'proveedor_nombre': lambda c: c.proveedor_ref.nombre if c.proveedor_ref else None,
+        'componente_nombre': lambda c: c.componente_ref.nombre if c.componente_ref else None,
+        'dias_hasta_entrega': lambda c: c.dias_hasta_entrega,
+        'entregada_a_tiempo': lambda c: c.entregada_a_tiempo,
+        'dias_retraso': lambda c: c.dias_retraso,
+        'total_formateado': lambda c: f"{c.moneda} {c.total:,.2f}" if c.total else None
+    }
+    
     def __init__(self, numero_compra, proveedor_id, componente_id, cantidad, precio_unitario, **kwargs):
         self.numero_compra = numero_compra
         self.proveedor_id = proveedor_id
@@ -114,18 +131,14 @@ class Compra(BaseModelMixin, db.Model):
             return True
         return False
     
-    def to_dict(self):
-        """Convertir a diccionario con información extendida"""
-        data = super().to_dict()
-        data.update({
-            'proveedor_nombre': self.proveedor_ref.nombre if self.proveedor_ref else None,
-            'componente_nombre': self.componente_ref.nombre if self.componente_ref else None,
-            'dias_hasta_entrega': self.dias_hasta_entrega,
-            'entregada_a_tiempo': self.entregada_a_tiempo,
-            'dias_retraso': self.dias_retraso,
-            'total_formateado': f"{self.moneda} {self.total:,.2f}" if self.total else None
-        })
-        return data
+    @classmethod
+    def con_relaciones(cls, query=None):
+        """Precargar proveedor y componente en bloque para serializar listas sin N+1"""
+        query = cls.query if query is None else query
+        return query.options(
+            db.selectinload(cls.proveedor_ref),
+            db.selectinload(cls.componente_ref)
+        )
     
     @classmethod
     def por_proveedor(cls, proveedor_id):
@@ -0,0 +1,318 @@
+"""
+Modelo de Estadísticas Diarias (totales precalculados de stock y compras)
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import event, inspect, select, literal
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from .base_mixin import BaseModelMixin
+from .compra import Compra
+from .stock import Stock
+
+ORIGEN_STOCK = 'stock'
+ORIGEN_COMPRA = 'compra'
+
+# Los movimientos sin compra asociada se agrupan bajo este proveedor
+SIN_PROVEEDOR = 0
+
+CLAVE = ('fecha', 'origen', 'componente_id', 'proveedor_id', 'tipo_movimiento')
+MEDIDAS = ('cantidad_registros', 'entradas', 'salidas', 'cantidad_total', 'valor_total')
+
+# Columnas que determinan el aporte de cada registro a las estadísticas
+CAMPOS_STOCK = ('created_at', 'componente_id', 'compra_id', 'tipo_movimiento', 'cantidad', 'valor_total')
+CAMPOS_COMPRA = ('fecha_compra', 'componente_id', 'proveedor_id', 'estado', 'cantidad', 'total')
+
+# Dialectos con INSERT ... ON CONFLICT DO UPDATE
+UPSERT_POR_DIALECTO = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+class EstadisticaDiaria(BaseModelMixin, db.Model):
+    """
+    Totales diarios por componente, proveedor y tipo de movimiento.
+    
+    Se mantiene de forma incremental al guardar movimientos de stock y
+    compras; para las compras tipo_movimiento guarda el estado de la compra.
+    Puede reconstruirse completa con `flask rebuild-estadisticas`.
+    """
+    __tablename__ = 'estadisticas_diarias'
+    __table_args__ = (
+        db.UniqueConstraint(*CLAVE, name='uq_estadisticas_diarias_clave'),
+        db.Index('ix_estadisticas_diarias_origen_fecha', 'origen', 'fecha'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    
+    # Clave del agregado
+    fecha = db.Column(db.Date, nullable=False)
+    origen = db.Column(db.String(20), nullable=False)  # 'stock' o 'compra'
+    componente_id = db.Column(db.Integer, db.ForeignKey('componentes.id'), nullable=False)
+    proveedor_id = db.Column(db.Integer, nullable=False, default=SIN_PROVEEDOR)
+    tipo_movimiento = db.Column(db.String(50), nullable=False)
+    
+    # Medidas
+    cantidad_registros = db.Column(db.Integer, nullable=False, default=0)
+    entradas = db.Column(db.Integer, nullable=False, default=0)
+    salidas = db.Column(db.Integer, nullable=False, default=0)
+    cantidad_total = db.Column(db.Integer, nullable=False, default=0)
+    valor_total = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    
+    @classmethod
+    def de_stock(cls):
+        """Filtro de filas correspondientes a movimientos de stock"""
+        return cls.origen == ORIGEN_STOCK
+    
+    @classmethod
+    def de_compras(cls):
+        """Filtro de filas correspondientes a compras"""
+        return cls.origen == ORIGEN_COMPRA
+    
+    @classmethod
+    def evolucion(cls, desde, hasta, granularidad='dia', componente_id=None):
+        """
+        Entradas y salidas de stock agrupadas por período
+        
+        Args:
+            desde: Fecha inicial (inclusive)
+            hasta: Fecha final (inclusive)
+            granularidad: 'dia', 'semana' o 'mes'
+            componente_id: Limitar a un componente (opcional)
+        
+        Returns:
+            list: [{'fecha', 'entradas', 'salidas'}] con los períodos sin movimientos en cero
+        """
+        from utils.time_buckets import bucket_expression, rellenar_periodos
+        
+        dialect = db.session.get_bind().dialect.name
+        bucket = bucket_expression(cls.fecha, granularidad, dialect).label('bucket')
+        
+        query = db.session.query(
+            bucket,
+            db.func.sum(cls.entradas),
+            db.func.sum(cls.salidas)
+        ).filter(
+            cls.de_stock(),
+            cls.fecha >= desde,
+            cls.fecha <= hasta
+        )
+        if componente_id is not None:
+            query = query.filter(cls.componente_id == componente_id)
+        
+        filas = query.group_by(bucket).all()
+        return rellenar_periodos(filas, desde, hasta, granularidad, ('entradas', 'salidas'))
+    
+    @classmethod
+    def aplicar(cls, connection, deltas):
+        """
+        Sumar variaciones a las filas de estadísticas (creándolas si no existen)
+        
+        Args:
+            connection: Conexión de la transacción en curso
+            deltas: {clave: {medida: variación}} con la clave en el orden de CLAVE
+        """
+        tabla = cls.__table__
+        upsert = UPSERT_POR_DIALECTO.get(connection.dialect.name)
+        
+        for clave, medidas in deltas.items():
+            if not any(medidas.values()):
+                continue
+            
+            if upsert is not None:
+                stmt = upsert(tabla).values(**dict(zip(CLAVE, clave)), **medidas)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=list(CLAVE),
+                    set_={medida: tabla.c[medida] + stmt.excluded[medida] for medida in MEDIDAS}
+                )
+                connection.execute(stmt)
+                continue
+            
+            # Otros motores: UPDATE incremental y INSERT si la fila no existía
+            condicion = [tabla.c[campo] == valor for campo, valor in zip(CLAVE, clave)]
+            resultado = connection.execute(
+                tabla.update().where(*condicion).values(
+                    {medida: tabla.c[medida] + valor for medida, valor in medidas.items()}
+                )
+            )
+            if not resultado.rowcount:
+                connection.execute(tabla.insert().values(**dict(zip(CLAVE, clave)), **medidas))
+    
+    @classmethod
+    def reconstruir(cls):
+        """
+        Recalcular todas las estadísticas desde las tablas de stock y compras
+        
+        Returns:
+            int: Cantidad de filas generadas
+        """
+        from utils.time_buckets import bucket_expression
+        
+        dialect = db.session.get_bind().dialect.name
+        tabla = cls.__table__
+        columnas = list(CLAVE + MEDIDAS)
+        dia = bucket_expression(Stock.created_at, 'dia', dialect)
+        
+        movimientos = select(
+            dia,
+            literal(ORIGEN_STOCK),
+            Stock.componente_id,
+            db.func.coalesce(Compra.proveedor_id, SIN_PROVEEDOR),
+            Stock.tipo_movimiento,
+            db.func.count(Stock.id),
+            db.func.sum(db.case((Stock.cantidad > 0, Stock.cantidad), else_=0)),
+            db.func.sum(db.case((Stock.cantidad < 0, -Stock.cantidad), else_=0)),
+            db.func.sum(db.func.abs(Stock.cantidad)),
+            db.func.sum(db.func.coalesce(Stock.valor_total, 0))
+        ).select_from(Stock).outerjoin(
+            Compra, Compra.id == Stock.compra_id
+        ).group_by(dia, Stock.componente_id, Compra.proveedor_id, Stock.tipo_movimiento)
+        
+        compras = select(
+            Compra.fecha_compra,
+            literal(ORIGEN_COMPRA),
+            Compra.componente_id,
+            Compra.proveedor_id,
+            db.func.coalesce(Compra.estado, 'pendiente'),
+            db.func.count(Compra.id),
+            literal(0),
+            literal(0),
+            db.func.sum(Compra.cantidad),
+            db.func.sum(db.func.coalesce(Compra.total, 0))
+        ).group_by(Compra.fecha_compra, Compra.componente_id, Compra.proveedor_id, Compra.estado)
+        
+        db.session.execute(tabla.delete())
+        db.session.execute(tabla.insert().from_select(columnas, movimientos))
+        db.session.execute(tabla.insert().from_select(columnas, compras))
+        
+        return db.session.query(db.func.count(cls.id)).scalar()
+    
+    def __repr__(self):
+        return f'<EstadisticaDiaria {self.fecha} {self.origen}:{self.tipo_movimiento}>'
+
+
+def _decimal(valor):
+    return Decimal(str(valor)) if valor else Decimal(0)
+
+
+def _aporte_stock(valores, proveedores):
+    """Clave y medidas con que un movimiento de stock suma a las estadísticas"""
+    # created_at se guarda en UTC: el día de la fila es su día UTC
+    fecha = valores['created_at'].date()
+    proveedor_id = proveedores.get(valores['compra_id']) or SIN_PROVEEDOR
+    
+    cantidad = valores['cantidad'] or 0
+    clave = (fecha, ORIGEN_STOCK, valores['componente_id'], proveedor_id, valores['tipo_movimiento'])
+    return clave, {
+        'cantidad_registros': 1,
+        'entradas': max(cantidad, 0),
+        'salidas': max(-cantidad, 0),
+        'cantidad_total': abs(cantidad),
+        'valor_total': _decimal(valores['valor_total'])
+    }
+
+
+def _aporte_compra(valores, proveedores):
+    """Clave y medidas con que una compra suma a las estadísticas"""
+    estado = valores['estado'] or 'pendiente'
+    
+    clave = (valores['fecha_compra'], ORIGEN_COMPRA, valores['componente_id'], valores['proveedor_id'], estado)
+    return clave, {
+        'cantidad_registros': 1,
+        'entradas': 0,
+        'salidas': 0,
+        'cantidad_total': valores['cantidad'] or 0,
+        'valor_total': _decimal(valores['total'])
+    }
+
+
+APORTES = {
+    Stock: (CAMPOS_STOCK, _aporte_stock),
+    Compra: (CAMPOS_COMPRA, _aporte_compra),
+}
+
+# Aportes de cambios y bajas leídos antes del flush, pendientes de aplicar
+PENDIENTES = 'estadisticas_pendientes'
+
+
+def _valores_actuales(obj, campos):
+    return {campo: getattr(obj, campo) for campo in campos}
+
+
+def _valores_en_base(connection, obj, campos):
+    """Valores todavía guardados en la base (el UPDATE aún no se ejecutó)"""
+    tabla = obj.__table__
+    fila = connection.execute(
+        select(*[tabla.c[campo] for campo in campos]).where(tabla.c.id == obj.id)
+    ).mappings().first()
+    return dict(fila) if fila else None
+
+
+def _proveedores_de_compras(connection, cambios):
+    """proveedor_id de las compras referidas por los movimientos (una sola consulta)"""
+    ids = {valores['compra_id'] for tipo, valores, _ in cambios if tipo is Stock and valores['compra_id']}
+    if not ids:
+        return {}
+    return dict(connection.execute(select(Compra.id, Compra.proveedor_id).where(Compra.id.in_(ids))).all())
+
+
+@event.listens_for(db.session, 'before_flush')
+def _registrar_cambios(session, flush_context, instances):
+    """Leer los aportes de cambios y bajas mientras la base conserva los valores previos"""
+    cambios = []
+    for obj in session.dirty:
+        campos = APORTES.get(type(obj), (None,))[0]
+        if campos and any(inspect(obj).attrs[campo].history.has_changes() for campo in campos):
+            cambios.append((obj, True))
+    for obj in session.deleted:
+        if type(obj) in APORTES:
+            cambios.append((obj, False))
+    
+    if not cambios:
+        return
+    
+    connection = session.connection()
+    pendientes = session.info.setdefault(PENDIENTES, [])
+    for obj, modificado in cambios:
+        campos = APORTES[type(obj)][0]
+        if modificado:
+            anteriores = _valores_en_base(connection, obj, campos)
+            if anteriores is not None:
+                pendientes.append((type(obj), anteriores, -1))
+            pendientes.append((type(obj), _valores_actuales(obj, campos), 1))
+        else:
+            pendientes.append((type(obj), _valores_actuales(obj, campos), -1))
+
+
+@event.listens_for(db.session, 'after_flush')
+def _actualizar_estadisticas(session, flush_context):
+    """
+    Trasladar altas, cambios y bajas de stock y compras a las estadísticas diarias
+    
+    Las altas se leen después del INSERT, con los defaults de columna ya
+    aplicados (created_at, fecha_compra), así el día es el de la fila guardada.
+    """
+    cambios = session.info.pop(PENDIENTES, [])
+    for obj in session.new:
+        if type(obj) in APORTES:
+            cambios.append((type(obj), _valores_actuales(obj, APORTES[type(obj)][0]), 1))
+    
+    if not cambios:
+        return
+    
+    connection = session.connection()
+    proveedores = _proveedores_de_compras(connection, cambios)
+    deltas = defaultdict(lambda: dict.fromkeys(MEDIDAS, 0))
+    for tipo, valores, signo in cambios:
+        clave, medidas = APORTES[tipo][1](valores, proveedores)
+        for medida, valor in medidas.items():
+            deltas[clave][medida] += signo * valor
+    
+    EstadisticaDiaria.aplicar(connection, deltas)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_pendientes(session):
+    session.info.pop(PENDIENTES, None)
@@ -1,7 +1,10 @@
 """
 Modelo de Máquina
 """
+from datetime import datetime
+from sqlalchemy.orm.attributes import set_committed_value
 from extensions import db
+from utils.search import buscar_texto, registrar_busqueda
 from .base_mixin import BaseModelMixin
 
 # Tabla de asociación para relación many-to-many entre máquinas y componentes
@@ -18,8 +21,8 @@ class Maquina(BaseModelMixin, db.Model):
     
     # Información básica
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
-    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     codigo_maquina = db.Column(db.String(100), unique=True, nullable=False, index=True)
     nombre = db.Column(db.String(200), nullable=False, index=True)
@@ -59,12 +62,27 @@ class Maquina(BaseModelMixin, db.Model):
     # Estado
     activa = db.Column(db.Boolean, default=True)
     
+    # Conteos de componentes calculados en la misma consulta por con_conteos_componentes()
+    agregado_cantidad_componentes = db.query_expression()
+    agregado_componentes_criticos = db.query_expression()
+    
     # Relaciones
     componentes = db.relationship('Componente', 
                                 secondary=maquinas_componentes,
                                 backref=db.backref('maquinas', lazy='dynamic'),
                                 lazy='dynamic')
     
+    # Información extendida para to_dict
+    extra_fields = {
+        'edad_años': lambda m: m.edad_años,
+        'necesita_revision': lambda m: m.necesita_revision,
+        'cantidad_componentes': lambda m: m.cantidad_componentes,
+        'componentes_criticos_count': lambda m: m.componentes_criticos_count
+    }
+    
+    # Campos de to_dict que requieren los conteos de componentes
+    CAMPOS_CONTEOS = {'cantidad_componentes', 'componentes_criticos_count'}
+    
     def __init__(self, codigo_maquina, nombre, **kwargs):
         self.codigo_maquina = codigo_maquina
         self.nombre = nombre
@@ -95,6 +113,54 @@ class Maquina(BaseModelMixin, db.Model):
             maquinas_componentes.c.es_critico == True
         )
     
+    @property
+    def cantidad_componentes(self):
+        """Cantidad de componentes asociados a la máquina"""
+        return self._conteos_componentes()[0]
+    
+    @property
+    def componentes_criticos_count(self):
+        """Cantidad de componentes críticos de la máquina"""
+        return self._conteos_componentes()[1]
+    
+    def _conteos_componentes(self):
+        """(componentes, componentes críticos) asociados a la máquina"""
+        if 'agregado_cantidad_componentes' not in self.__dict__:
+            # Máquina cargada sin con_conteos_componentes(): una sola consulta agregada
+            conteos = db.session.query(*self._expresiones_conteos()).filter(
+                maquinas_componentes.c.maquina_id == self.id
+            ).one()
+            for campo, valor in zip(('agregado_cantidad_componentes', 'agregado_componentes_criticos'), conteos):
+                set_committed_value(self, campo, valor)
+        
+        return self.agregado_cantidad_componentes, self.agregado_componentes_criticos
+    
+    @staticmethod
+    def _expresiones_conteos():
+        """COUNT de componentes y de componentes críticos sobre la tabla de asociación"""
+        return (
+            db.func.count(maquinas_componentes.c.componente_id),
+            db.func.coalesce(db.func.sum(
+                db.case((maquinas_componentes.c.es_critico == True, 1), else_=0)
+            ), 0)
+        )
+    
+    @classmethod
+    def con_conteos_componentes(cls, query=None):
+        """Cargar los conteos de componentes junto con las máquinas, sin una consulta por fila"""
+        query = cls.query if query is None else query
+        cantidad, criticos = cls._expresiones_conteos()
+        conteos = db.session.query(
+            maquinas_componentes.c.maquina_id.label('maquina_id'),
+            cantidad.label('cantidad'),
+            criticos.label('criticos')
+        ).group_by(maquinas_componentes.c.maquina_id).subquery()
+        
+        return query.outerjoin(conteos, conteos.c.maquina_id == cls.id).options(
+            db.with_expression(cls.agregado_cantidad_componentes, db.func.coalesce(conteos.c.cantidad, 0)),
+            db.with_expression(cls.agregado_componentes_criticos, db.func.coalesce(conteos.c.criticos, 0))
+        )
+    
     def agregar_componente(self, componente, cantidad=1, es_critico=False):
         """Agregar componente a la máquina"""
         if componente not in self.componentes:
@@ -126,30 +192,10 @@ class Maquina(BaseModelMixin, db.Model):
             from datetime import date, timedelta
             self.proxima_revision = date.today() + timedelta(days=30)
     
-    def to_dict(self):
-        """Convertir a diccionario con información extendida"""
-        data = super().to_dict()
-        data.update({
-            'edad_años': self.edad_años,
-            'necesita_revision': self.necesita_revision,
-            'cantidad_componentes': self.componentes.count(),
-            'componentes_criticos_count': self.componentes_criticos.count()
-        })
-        return data
-    
     @classmethod
     def buscar(cls, termino):
-        """Buscar máquinas por término"""
-        termino = f"%{termino}%"
-        return cls.query.filter(
-            db.or_(
-                cls.nombre.ilike(termino),
-                cls.codigo_maquina.ilike(termino),
-                cls.marca.ilike(termino),
-                cls.modelo.ilike(termino),
-                cls.tipo_maquina.ilike(termino)
-            )
-        ).filter(cls.activa == True)
+        """Buscar máquinas por término (por relevancia si hay índice de texto)"""
+        return buscar_texto(cls, termino).filter(cls.activa == True)
     
     @classmethod
     def por_tipo(cls, tipo):
@@ -170,3 +216,12 @@ class Maquina(BaseModelMixin, db.Model):
     
     def __repr__(self):
         return f'<Maquina {self.codigo_maquina}: {self.nombre}>'
+
+
+registrar_busqueda(Maquina, {
+    'nombre': 10,
+    'codigo_maquina': 10,
+    'marca': 4,
+    'modelo': 4,
+    'tipo_maquina': 2,
+})
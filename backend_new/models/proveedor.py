@@ -1,8 +1,17 @@
 """
 Modelo de Proveedor
 """
+from datetime import datetime
+from itertools import chain
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, inspect, text
+from sqlalchemy.orm.attributes import set_committed_value
+
 from extensions import db
+from utils.search import buscar_texto, registrar_busqueda
 from .base_mixin import BaseModelMixin
+from .compra import Compra
 
 class Proveedor(BaseModelMixin, db.Model):
     """Modelo para proveedores de componentes"""
@@ -10,8 +19,8 @@ class Proveedor(BaseModelMixin, db.Model):
     
     # Información básica
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
-    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     codigo_proveedor = db.Column(db.String(50), unique=True, nullable=False, index=True)
     nombre = db.Column(db.String(200), nullable=False, index=True)
@@ -47,9 +56,33 @@ class Proveedor(BaseModelMixin, db.Model):
     notas = db.Column(db.Text)
     documentos = db.Column(db.JSON)  # Array de rutas a documentos
     
+    # Totales de compras denormalizados (opcional, ver PROVEEDOR_TOTALES_DENORMALIZADOS);
+    # diferidos para que las bases sin estas columnas sigan funcionando con la opción apagada
+    compras_registradas = db.deferred(db.Column(db.Integer))
+    compras_total = db.deferred(db.Column(db.Numeric(14, 2)))
+    compras_ultima_fecha = db.deferred(db.Column(db.Date))
+    
+    # Totales de compras calculados en la misma consulta por con_totales_compras()
+    agregado_cantidad_compras = db.query_expression()
+    agregado_total_compras = db.query_expression()
+    agregado_ultima_compra = db.query_expression()
+    
     # Relaciones
     compras = db.relationship('Compra', backref='proveedor_ref', lazy='dynamic')
     
+    # Información extendida para to_dict
+    extra_fields = {
+        'direccion_completa': lambda p: p.direccion_completa,
+        'total_compras': lambda p: p.total_compras,
+        'ultima_compra': lambda p: p.ultima_compra.isoformat() if p.ultima_compra else None,
+        'cantidad_compras': lambda p: p.cantidad_compras
+    }
+    
+    # Campos de to_dict que requieren los totales de compras
+    CAMPOS_TOTALES = {'total_compras', 'ultima_compra', 'cantidad_compras'}
+    # Columnas denormalizadas (agregar_columnas_totales() las crea en bases existentes)
+    COLUMNAS_TOTALES = ('compras_registradas', 'compras_total', 'compras_ultima_fecha')
+    
     def __init__(self, codigo_proveedor, nombre, **kwargs):
         self.codigo_proveedor = codigo_proveedor
         self.nombre = nombre
@@ -66,38 +99,129 @@ class Proveedor(BaseModelMixin, db.Model):
     @property
     def total_compras(self):
         """Calcula el total de compras realizadas a este proveedor"""
-        return sum([compra.total for compra in self.compras if compra.total])
+        return self._totales_compras()[1]
     
     @property
     def ultima_compra(self):
         """Devuelve la fecha de la última compra"""
-        ultima = self.compras.order_by(db.desc('fecha_compra')).first()
-        return ultima.fecha_compra if ultima else None
-    
-    def to_dict(self):
-        """Convertir a diccionario con información extendida"""
-        data = super().to_dict()
-        data.update({
-            'direccion_completa': self.direccion_completa,
-            'total_compras': self.total_compras,
-            'ultima_compra': self.ultima_compra.isoformat() if self.ultima_compra else None,
-            'cantidad_compras': self.compras.count()
-        })
-        return data
+        return self._totales_compras()[2]
+    
+    @property
+    def cantidad_compras(self):
+        """Cantidad de compras realizadas a este proveedor"""
+        return self._totales_compras()[0]
+    
+    def _totales_compras(self):
+        """(cantidad, total, fecha de la última compra) de las compras del proveedor"""
+        if 'agregado_cantidad_compras' not in self.__dict__:
+            if self.totales_denormalizados():
+                totales = (self.compras_registradas or 0, self.compras_total or 0, self.compras_ultima_fecha)
+            else:
+                # Proveedor cargado sin con_totales_compras(): una sola consulta agregada
+                totales = db.session.query(*self._expresiones_totales()).filter(
+                    Compra.proveedor_id == self.id
+                ).one()
+            for campo, valor in zip(('agregado_cantidad_compras', 'agregado_total_compras',
+                                     'agregado_ultima_compra'), totales):
+                set_committed_value(self, campo, valor)
+        
+        return self.agregado_cantidad_compras, self.agregado_total_compras, self.agregado_ultima_compra
+    
+    @staticmethod
+    def _expresiones_totales():
+        """COUNT, SUM(total) y MAX(fecha_compra) sobre las compras"""
+        return (
+            db.func.count(Compra.id),
+            db.func.coalesce(db.func.sum(Compra.total), 0),
+            db.func.max(Compra.fecha_compra)
+        )
+    
+    @staticmethod
+    def totales_denormalizados():
+        """Si los totales de compras se leen de las columnas del proveedor"""
+        return has_app_context() and current_app.config.get('PROVEEDOR_TOTALES_DENORMALIZADOS', False)
     
     @classmethod
-    def buscar(cls, termino):
-        """Buscar proveedores por término"""
-        termino = f"%{termino}%"
-        return cls.query.filter(
-            db.or_(
-                cls.nombre.ilike(termino),
-                cls.codigo_proveedor.ilike(termino),
-                cls.razon_social.ilike(termino),
-                cls.email.ilike(termino),
-                cls.cuit_dni.ilike(termino)
+    def con_totales_compras(cls, query=None):
+        """
+        Cargar los totales de compras junto con los proveedores, sin una consulta por fila
+        
+        Con los totales denormalizados se leen las columnas del proveedor; si no,
+        se une una subconsulta agrupada por proveedor_id.
+        """
+        query = cls.query if query is None else query
+        if cls.totales_denormalizados():
+            return query.options(
+                db.with_expression(cls.agregado_cantidad_compras, db.func.coalesce(cls.compras_registradas, 0)),
+                db.with_expression(cls.agregado_total_compras, db.func.coalesce(cls.compras_total, 0)),
+                db.with_expression(cls.agregado_ultima_compra, cls.compras_ultima_fecha)
             )
-        ).filter(cls.activo == True)
+        
+        cantidad, total, ultima = cls._expresiones_totales()
+        totales = db.session.query(
+            Compra.proveedor_id.label('proveedor_id'),
+            cantidad.label('cantidad'),
+            total.label('total'),
+            ultima.label('ultima')
+        ).group_by(Compra.proveedor_id).subquery()
+        
+        return query.outerjoin(totales, totales.c.proveedor_id == cls.id).options(
+            db.with_expression(cls.agregado_cantidad_compras, db.func.coalesce(totales.c.cantidad, 0)),
+            db.with_expression(cls.agregado_total_compras, db.func.coalesce(totales.c.total, 0)),
+            db.with_expression(cls.agregado_ultima_compra, totales.c.ultima)
+        )
+    
+    @classmethod
+    def agregar_columnas_totales(cls, connection=None):
+        """
+        Agregar a una base existente las columnas de totales que le falten
+        
+        create_all() no modifica las tablas ya creadas. No confirma la
+        transacción.
+        
+        Returns:
+            list: Nombres de las columnas agregadas
+        """
+        connection = connection or db.session.connection()
+        tabla = cls.__table__
+        existentes = {columna['name'] for columna in inspect(connection).get_columns(tabla.name)}
+        
+        agregadas = []
+        for nombre in cls.COLUMNAS_TOTALES:
+            if nombre in existentes:
+                continue
+            tipo = tabla.c[nombre].type.compile(dialect=connection.dialect)
+            connection.execute(text(f'ALTER TABLE {tabla.name} ADD COLUMN {nombre} {tipo}'))
+            agregadas.append(nombre)
+        return agregadas
+    
+    @classmethod
+    def recalcular_totales(cls, ids=None, connection=None):
+        """
+        Recalcular los totales denormalizados de compras
+        
+        Args:
+            ids: IDs de proveedores a recalcular (None para todos)
+            connection: Conexión a usar (por defecto la de la sesión)
+        """
+        tabla = cls.__table__
+        cantidad, total, ultima = cls._expresiones_totales()
+        de_proveedor = Compra.proveedor_id == tabla.c.id
+        
+        stmt = tabla.update().values(
+            compras_registradas=db.select(cantidad).where(de_proveedor).scalar_subquery(),
+            compras_total=db.select(total).where(de_proveedor).scalar_subquery(),
+            compras_ultima_fecha=db.select(ultima).where(de_proveedor).scalar_subquery()
+        )
+        if ids is not None:
+            stmt = stmt.where(tabla.c.id.in_(ids))
+        
+        (connection or db.session).execute(stmt)
+    
+    @classmethod
+    def buscar(cls, termino):
+        """Buscar proveedores por término (por relevancia si hay índice de texto)"""
+        return buscar_texto(cls, termino).filter(cls.activo == True)
     
     @classmethod
     def por_tipo(cls, tipo):
@@ -124,3 +248,30 @@ class Proveedor(BaseModelMixin, db.Model):
     
     def __repr__(self):
         return f'<Proveedor {self.codigo_proveedor}: {self.nombre}>'
+
+
+@event.listens_for(db.session, 'after_flush')
+def _actualizar_totales_denormalizados(session, flush_context):
+    """Mantener los totales denormalizados de los proveedores con compras escritas"""
+    if not Proveedor.totales_denormalizados():
+        return
+    
+    ids = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Compra):
+            ids.add(obj.proveedor_id)
+            # Si la compra cambió de proveedor, también el anterior
+            ids.update(inspect(obj).attrs.proveedor_id.history.deleted)
+    ids.discard(None)
+    
+    if ids:
+        Proveedor.recalcular_totales(ids, connection=session.connection())
+
+
+registrar_busqueda(Proveedor, {
+    'nombre': 10,
+    'codigo_proveedor': 10,
+    'razon_social': 6,
+    'cuit_dni': 4,
+    'email': 2,
+})
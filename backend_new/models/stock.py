@@ -1,18 +1,42 @@
 """
 Modelo de Stock (Movimientos de inventario)
 """
+import time
 from datetime import datetime
+from itertools import chain
+
+from sqlalchemy import event
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.orm.attributes import set_committed_value
 from extensions import db
+from utils.cache_respuestas import al_invalidar_remoto
 from .base_mixin import BaseModelMixin
 
+# Segundos que un resumen por componente puede servirse desde la caché
+RESUMEN_CACHE_TTL = 60
+
+# componente_id -> (vencimiento, resumen)
+_resumenes_cache = {}
+
+
+class MovimientoConcurrenteError(RuntimeError):
+    """El stock de un componente cambió mientras se procesaba un lote"""
+
+
 class Stock(BaseModelMixin, db.Model):
     """Modelo para registrar movimientos de stock"""
     __tablename__ = 'stock'
+    __table_args__ = (
+        # Índice para la paginación por cursor (created_at, id)
+        db.Index('ix_stock_created_at_id', 'created_at', 'id'),
+        # Índice para los movimientos y el resumen de un componente
+        db.Index('ix_stock_componente_created_at', 'componente_id', 'created_at', 'id'),
+    )
     
     # Información básica
     id = db.Column(db.Integer, primary_key=True)
-    created_at = db.Column(db.DateTime, default=db.func.now(), nullable=False)
-    updated_at = db.Column(db.DateTime, default=db.func.now(), onupdate=db.func.now(), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relación con componente
     componente_id = db.Column(db.Integer, db.ForeignKey('componentes.id'), nullable=False)
@@ -40,6 +64,16 @@ class Stock(BaseModelMixin, db.Model):
     # Notas adicionales
     observaciones = db.Column(db.Text)
     
+    # Información extendida para to_dict
+    extra_fields = {
+        'componente_nombre': lambda m: m.componente_ref.nombre if m.componente_ref else None,
+        'componente_numero_parte': lambda m: m.componente_ref.numero_parte if m.componente_ref else None,
+        'es_entrada': lambda m: m.es_entrada,
+        'es_salida': lambda m: m.es_salida,
+        'cantidad_absoluta': lambda m: m.cantidad_absoluta,
+        'valor_formateado': lambda m: f"${m.valor_total:,.2f}" if m.valor_total else None
+    }
+    
     def __init__(self, componente_id, tipo_movimiento, cantidad, stock_anterior, stock_nuevo, **kwargs):
         self.componente_id = componente_id
         self.tipo_movimiento = tipo_movimiento
@@ -70,18 +104,11 @@ class Stock(BaseModelMixin, db.Model):
         """Devuelve la cantidad en valor absoluto"""
         return abs(self.cantidad)
     
-    def to_dict(self):
-        """Convertir a diccionario con información extendida"""
-        data = super().to_dict()
-        data.update({
-            'componente_nombre': self.componente_ref.nombre if self.componente_ref else None,
-            'componente_numero_parte': self.componente_ref.numero_parte if self.componente_ref else None,
-            'es_entrada': self.es_entrada,
-            'es_salida': self.es_salida,
-            'cantidad_absoluta': self.cantidad_absoluta,
-            'valor_formateado': f"${self.valor_total:,.2f}" if self.valor_total else None
-        })
-        return data
+    @classmethod
+    def con_relaciones(cls, query=None):
+        """Precargar el componente en bloque para serializar listas sin N+1"""
+        query = cls.query if query is None else query
+        return query.options(db.selectinload(cls.componente_ref))
     
     @classmethod
     def por_componente(cls, componente_id):
@@ -113,38 +140,118 @@ class Stock(BaseModelMixin, db.Model):
     
     @classmethod
     def resumen_por_componente(cls, componente_id):
-        """Obtener resumen de movimientos por componente"""
-        movimientos = cls.por_componente(componente_id).all()
+        """
+        Obtener resumen de movimientos por componente
+        
+        Se calcula con una única consulta de agregados condicionales y se
+        cachea por componente hasta que se escribe un movimiento del mismo.
+        Las escrituras de otros workers llegan como eventos de invalidación
+        si hay caché compartida (CACHE_BACKEND); si no, vence a los
+        RESUMEN_CACHE_TTL segundos.
+        """
+        en_cache = _resumenes_cache.get(componente_id)
+        if en_cache is not None and en_cache[0] > time.monotonic():
+            return dict(en_cache[1])
+        
+        entrada = cls.cantidad > 0
+        salida = cls.cantidad < 0
+        valor = db.func.coalesce(cls.valor_total, 0)
+        
+        # Stock del último movimiento (subconsulta no correlacionada)
+        ultimo_stock = db.select(cls.stock_nuevo).where(
+            cls.componente_id == componente_id
+        ).order_by(cls.created_at.desc(), cls.id.desc()).limit(1).correlate(None).scalar_subquery()
         
-        total_entradas = sum([m.cantidad for m in movimientos if m.cantidad > 0])
-        total_salidas = sum([abs(m.cantidad) for m in movimientos if m.cantidad < 0])
-        valor_total_entradas = sum([m.valor_total or 0 for m in movimientos if m.cantidad > 0])
-        valor_total_salidas = sum([m.valor_total or 0 for m in movimientos if m.cantidad < 0])
+        (total_movimientos, total_entradas, total_salidas, valor_total_entradas,
+         valor_total_salidas, ultimo_movimiento, stock_actual) = db.session.query(
+            db.func.count(cls.id),
+            db.func.coalesce(db.func.sum(db.case((entrada, cls.cantidad), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((salida, -cls.cantidad), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((entrada, valor), else_=0)), 0),
+            db.func.coalesce(db.func.sum(db.case((salida, valor), else_=0)), 0),
+            db.func.max(cls.created_at),
+            ultimo_stock
+        ).filter(cls.componente_id == componente_id).one()
         
-        return {
-            'total_movimientos': len(movimientos),
+        resumen = {
+            'total_movimientos': total_movimientos,
             'total_entradas': total_entradas,
             'total_salidas': total_salidas,
-            'stock_actual': movimientos[0].stock_nuevo if movimientos else 0,
+            'stock_actual': stock_actual or 0,
             'valor_total_entradas': valor_total_entradas,
             'valor_total_salidas': valor_total_salidas,
-            'ultimo_movimiento': movimientos[0].created_at if movimientos else None
+            'ultimo_movimiento': ultimo_movimiento
         }
+        _resumenes_cache[componente_id] = (time.monotonic() + RESUMEN_CACHE_TTL, resumen)
+        return dict(resumen)
+    
+    @staticmethod
+    def limpiar_cache_resumenes():
+        """Descartar todos los resúmenes cacheados"""
+        _resumenes_cache.clear()
     
     @classmethod
-    def crear_movimiento(cls, componente_id, tipo_movimiento, cantidad, motivo=None, **kwargs):
-        """Crear un nuevo movimiento de stock"""
+    def sumar_a_componente(cls, componente_id, cantidad):
+        """
+        Sumar una cantidad al stock de un componente de forma atómica
+        
+        El control de stock negativo y la actualización se hacen en un único
+        UPDATE condicional, de modo que dos movimientos concurrentes sobre el
+        mismo componente no pueden pisarse ni dejar el stock negativo.
+        
+        Args:
+            componente_id: ID del componente
+            cantidad: Cantidad a sumar (negativa para salidas)
+        
+        Returns:
+            int: Stock resultante, o None si el componente no existe o quedaría negativo
+        """
         from .componente import Componente
         
-        componente = Componente.get_by_id(componente_id)
-        if not componente:
-            raise ValueError("Componente no encontrado")
+        tabla = Componente.__table__
+        stock_nuevo = db.func.coalesce(tabla.c.stock_actual, 0) + cantidad
+        
+        if db.session.get_bind().dialect.update_returning:
+            # UPDATE ... WHERE stock_actual + :cantidad >= 0 RETURNING stock_actual
+            resultado = db.session.execute(
+                tabla.update()
+                .where(tabla.c.id == componente_id, stock_nuevo >= 0)
+                .values(stock_actual=stock_nuevo)
+                .returning(tabla.c.stock_actual)
+            ).scalar()
+        else:
+            # Sin RETURNING: bloquear la fila (SELECT ... FOR UPDATE) hasta el commit
+            actual = db.session.execute(
+                db.select(tabla.c.stock_actual).where(tabla.c.id == componente_id).with_for_update()
+            ).first()
+            if actual is None or (actual[0] or 0) + cantidad < 0:
+                return None
+            resultado = (actual[0] or 0) + cantidad
+            db.session.execute(
+                tabla.update().where(tabla.c.id == componente_id).values(stock_actual=resultado)
+            )
+        
+        # Reflejar el valor en el componente ya cargado en la sesión sin marcarlo como modificado
+        componente = db.session.identity_map.get(identity_key(Componente, componente_id))
+        if componente is not None and resultado is not None:
+            set_committed_value(componente, 'stock_actual', resultado)
+        
+        return resultado
+    
+    @classmethod
+    def crear_movimiento(cls, componente_id, tipo_movimiento, cantidad, motivo=None, **kwargs):
+        """
+        Crear un nuevo movimiento de stock
         
-        stock_anterior = componente.stock_actual
-        stock_nuevo = stock_anterior + cantidad
+        Actualiza el stock del componente de forma atómica y agrega el
+        movimiento a la sesión; el commit queda a cargo de quien llama.
+        """
+        from .componente import Componente
         
-        # Validar que no quede stock negativo
-        if stock_nuevo < 0:
+        stock_nuevo = cls.sumar_a_componente(componente_id, cantidad)
+        if stock_nuevo is None:
+            if not db.session.query(Componente.id).filter(Componente.id == componente_id).first():
+                raise ValueError("Componente no encontrado")
             raise ValueError("El movimiento resultaría en stock negativo")
         
         # Crear movimiento
@@ -152,16 +259,131 @@ class Stock(BaseModelMixin, db.Model):
             componente_id=componente_id,
             tipo_movimiento=tipo_movimiento,
             cantidad=cantidad,
-            stock_anterior=stock_anterior,
+            stock_anterior=stock_nuevo - cantidad,
             stock_nuevo=stock_nuevo,
             motivo=motivo,
             **kwargs
         )
-        
-        # Actualizar stock del componente
-        componente.stock_actual = stock_nuevo
+        db.session.add(movimiento)
         
         return movimiento
     
+    @classmethod
+    def crear_movimientos_lote(cls, items, parcial=False):
+        """
+        Registrar varios movimientos de stock en una sola pasada
+        
+        Los componentes se leen (y bloquean donde el motor lo permite) con una
+        única consulta IN, los movimientos se validan en orden sobre el stock
+        acumulado y cada componente recibe un solo UPDATE con su variación neta.
+        Los movimientos quedan en la sesión; el commit queda a cargo de quien llama.
+        
+        Args:
+            items: Lista de dicts con componente_id, tipo_movimiento, cantidad (con signo) y campos opcionales
+            parcial: Si es True se aplican los movimientos válidos aunque otros fallen
+        
+        Returns:
+            tuple: (resultados, aplicado) con un resultado por item
+                   {'indice', 'success', 'movimiento' | 'error'}
+        """
+        from .componente import Componente
+        
+        ids = {item['componente_id'] for item in items}
+        componentes = {
+            componente.id: componente
+            for componente in Componente.query.filter(Componente.id.in_(ids))
+            .with_for_update().populate_existing()
+        }
+        stock_leido = {id: componente.stock_actual or 0 for id, componente in componentes.items()}
+        stock = dict(stock_leido)
+        
+        resultados = []
+        movimientos = []
+        for indice, item in enumerate(items):
+            componente_id = item['componente_id']
+            cantidad = item['cantidad']
+            
+            if componente_id not in componentes:
+                resultados.append({'indice': indice, 'success': False, 'error': 'Componente no encontrado'})
+                continue
+            if stock[componente_id] + cantidad < 0:
+                resultados.append({
+                    'indice': indice,
+                    'success': False,
+                    'error': 'El movimiento resultaría en stock negativo'
+                })
+                continue
+            
+            extras = {campo: valor for campo, valor in item.items() if campo not in ('componente_id', 'cantidad')}
+            movimiento = cls(
+                componente_id=componente_id,
+                cantidad=cantidad,
+                stock_anterior=stock[componente_id],
+                stock_nuevo=stock[componente_id] + cantidad,
+                **extras
+            )
+            stock[componente_id] += cantidad
+            movimientos.append(movimiento)
+            resultados.append({'indice': indice, 'success': True, 'movimiento': movimiento})
+        
+        if not movimientos or (not parcial and len(movimientos) < len(items)):
+            return resultados, False
+        
+        # Un UPDATE por componente, condicionado al stock leído (control optimista
+        # para motores sin SELECT ... FOR UPDATE)
+        tabla = Componente.__table__
+        for componente_id, stock_nuevo in stock.items():
+            if stock_nuevo == stock_leido[componente_id]:
+                continue
+            resultado = db.session.execute(
+                tabla.update()
+                .where(
+                    tabla.c.id == componente_id,
+                    db.func.coalesce(tabla.c.stock_actual, 0) == stock_leido[componente_id]
+                )
+                .values(stock_actual=stock_nuevo)
+            )
+            if resultado.rowcount != 1:
+                raise MovimientoConcurrenteError(
+                    f"El stock del componente {componente_id} cambió durante el lote"
+                )
+            set_committed_value(componentes[componente_id], 'stock_actual', stock_nuevo)
+        
+        db.session.add_all(movimientos)
+        return resultados, True
+    
     def __repr__(self):
         return f'<Stock {self.tipo_movimiento}: {self.cantidad} unidades>'
+
+
+def _componentes_con_movimientos(session):
+    return {
+        obj.componente_id
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Stock)
+    }
+
+
+@event.listens_for(db.session, 'after_flush')
+def _invalidar_resumenes_al_escribir(session, flush_context):
+    """Descartar los resúmenes de los componentes con movimientos escritos"""
+    ids = _componentes_con_movimientos(session)
+    if ids:
+        session.info.setdefault('resumenes_modificados', set()).update(ids)
+        for componente_id in ids:
+            _resumenes_cache.pop(componente_id, None)
+
+
+@al_invalidar_remoto
+def _invalidar_resumenes_remoto(tablas):
+    """Otro worker escribió movimientos: descartar todos los resúmenes"""
+    if tablas is None or 'stock' in tablas:
+        _resumenes_cache.clear()
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _invalidar_resumenes_al_terminar(session):
+    """Volver a descartarlos al confirmar: otra request pudo cachear el valor previo"""
+    for componente_id in session.info.pop('resumenes_modificados', ()):
+        _resumenes_cache.pop(componente_id, None)
@@ -0,0 +1,92 @@
+"""
+Pruebas del índice de n-gramas de /componentes/autocomplete
+"""
+from models.componente import Componente
+from utils.autocomplete import EXTENSION, IndiceNgramas
+
+
+def _crear_componentes(db):
+    db.session.add_all([
+        Componente('FA-001', 'Filtro de aire', marca='Bosch'),
+        Componente('FA-010', 'Filtro de aceite', marca='Fram'),
+        Componente('BAT-003', 'Batería 12V', marca='Moura'),
+        Componente('XX-001', 'Correa', activo=False),
+    ])
+    db.session.commit()
+
+
+def _sugerencias(client, termino):
+    response = client.get('/api/v1/componentes/autocomplete', query_string={'q': termino})
+    assert response.status_code == 200
+    return [fila['numero_parte'] for fila in response.get_json()['data']]
+
+
+def test_prefijo_y_errores_de_tipeo(client, db):
+    _crear_componentes(db)
+    
+    assert _sugerencias(client, 'fa00')[0] == 'FA-001'
+    assert _sugerencias(client, 'FA-010')[0] == 'FA-010'
+    # Letras transpuestas y acento omitido
+    assert _sugerencias(client, 'BTA-003') == ['BAT-003']
+    assert _sugerencias(client, 'bateria') == ['BAT-003']
+    # Los inactivos no se sugieren
+    assert 'XX-001' not in _sugerencias(client, 'xx-001')
+
+
+def test_consulta_sin_acceso_a_la_base(client, db, count_queries):
+    _crear_componentes(db)
+    _sugerencias(client, 'filtro')
+    
+    with count_queries() as statements:
+        assert _sugerencias(client, 'filtro aire')[0] == 'FA-001'
+    
+    assert statements == []
+
+
+def test_indice_actualizado_por_la_api(client, db):
+    _crear_componentes(db)
+    _sugerencias(client, 'fa')
+    
+    response = client.post('/api/v1/componentes', json={'numero_parte': 'BOM-100', 'nombre': 'Bomba hidráulica'})
+    assert response.status_code == 201
+    id = response.get_json()['data']['id']
+    assert _sugerencias(client, 'bom-10') == ['BOM-100']
+    
+    client.put(f'/api/v1/componentes/{id}', json={'numero_parte': 'HID-200'})
+    assert _sugerencias(client, 'hid-200') == ['HID-200']
+    assert 'BOM-100' not in _sugerencias(client, 'bom-100')
+    
+    client.delete(f'/api/v1/componentes/{id}')
+    assert 'HID-200' not in _sugerencias(client, 'hid-200')
+
+
+def test_postings_acotados():
+    indice = IndiceNgramas(max_postings=3)
+    indice.reemplazar(
+        (i, [(f'FA-{i:03}', 1.0, True)], {'id': i}) for i in range(10)
+    )
+    
+    # ' f' y 'fa' aparecen en los 10 documentos y dejan de indexarse
+    assert {' f', 'fa'} <= indice._saturados
+    assert all(len(ids) <= 3 for ids in indice._postings.values())
+    assert indice.buscar('fa-007')[0]['id'] == 7
+
+
+def test_indice_vencido_se_sigue_usando_mientras_otro_lo_reconstruye(app, client, db, count_queries):
+    _crear_componentes(db)
+    _sugerencias(client, 'fa')
+    indice = app.extensions[EXTENSION]
+    app.config['AUTOCOMPLETE_MAX_EDAD'] = 60
+    indice.construido_en -= 120
+    
+    indice.reconstruccion.acquire()
+    try:
+        with count_queries() as statements:
+            assert _sugerencias(client, 'bateria') == ['BAT-003']
+        assert statements == []
+    finally:
+        indice.reconstruccion.release()
+    
+    db.session.add(Componente('BOM-100', 'Bomba hidráulica'))
+    db.session.commit()
+    assert _sugerencias(client, 'bom-100') == ['BOM-100']
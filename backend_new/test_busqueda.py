@@ -0,0 +1,85 @@
+"""
+Pruebas de la búsqueda de texto indexada (FTS5 en SQLite)
+"""
+from sqlalchemy import text
+
+from models.componente import Componente
+from models.maquina import Maquina
+from utils.search import indice_disponible
+
+
+def _crear_componentes(db):
+    db.session.add_all([
+        Componente('FA-1234', 'Filtro de aire', marca='Bosch', categoria='Filtros'),
+        Componente('FA-9900', 'Filtro de aceite', descripcion='Compatible con filtro de aire FA-12'),
+        Componente('RD-0001', 'Rodamiento', descripcion='Rodamiento para filtro'),
+        Componente('XX-0002', 'Correa', activo=False),
+    ])
+    db.session.commit()
+
+
+def _buscar(client, termino, recurso='componentes'):
+    response = client.get(f'/api/v1/{recurso}', query_string={'q': termino})
+    assert response.status_code == 200
+    return [fila['nombre'] for fila in response.get_json()['data']]
+
+
+def test_indice_creado_con_las_tablas(db):
+    assert indice_disponible(Componente)
+    assert indice_disponible(Maquina)
+
+
+def test_prefijo_de_numero_de_parte(client, db):
+    _crear_componentes(db)
+    
+    # 'FA-12' se divide en 'fa' y '12' y ambos se buscan como prefijo
+    assert _buscar(client, 'FA-12') == ['Filtro de aire', 'Filtro de aceite']
+    assert _buscar(client, 'rod') == ['Rodamiento']
+
+
+def test_resultados_ordenados_por_relevancia(db):
+    _crear_componentes(db)
+    
+    # El nombre pesa más que la descripción
+    resultados = Componente.buscar('filtro').all()
+    
+    assert [c.nombre for c in resultados][-1] == 'Rodamiento'
+    assert 'Correa' not in [c.nombre for c in resultados]
+
+
+def test_indice_sincronizado_al_modificar_y_borrar(client, db):
+    _crear_componentes(db)
+    componente = Componente.query.filter_by(numero_parte='RD-0001').one()
+    
+    componente.nombre = 'Buje'
+    componente.descripcion = None
+    db.session.commit()
+    assert _buscar(client, 'rodamiento') == []
+    assert _buscar(client, 'buje') == ['Buje']
+    
+    db.session.delete(componente)
+    db.session.commit()
+    assert _buscar(client, 'buje') == []
+
+
+def test_busqueda_de_maquinas(client, db):
+    db.session.add_all([
+        Maquina('TR-01', 'Tractor John Deere', marca='John Deere', tipo_maquina='Tractor'),
+        Maquina('CO-01', 'Cosechadora', marca='Claas', tipo_maquina='Cosechadora'),
+    ])
+    db.session.commit()
+    
+    assert _buscar(client, 'deer', 'maquinas') == ['Tractor John Deere']
+
+
+def test_comando_rebuild_indexa_filas_existentes(app, db):
+    _crear_componentes(db)
+    # Base anterior al índice: la tabla FTS se crea vacía sobre filas ya cargadas
+    db.session.execute(text('DROP TABLE componentes_fts'))
+    db.session.commit()
+    
+    resultado = app.test_cli_runner().invoke(args=['rebuild-busqueda'])
+    
+    assert resultado.exit_code == 0
+    assert 'componentes' in resultado.output
+    assert [c.nombre for c in Componente.buscar('bosch')] == ['Filtro de aire']
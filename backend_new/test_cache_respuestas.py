@@ -0,0 +1,298 @@
+"""
+Pruebas de la caché de respuestas (ETag / 304 e invalidación por escritura)
+"""
+import json
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+from models.componente import Componente
+from models.maquina import Maquina
+from models.stock import Stock, _resumenes_cache
+from utils import cache_backends
+from utils.cache_backends import CacheLocal, CacheSQLite, CacheRedis
+from utils.cache_respuestas import CacheRespuestas, Entrada
+
+
+def _crear_componentes(db, *categorias, desde=0):
+    for i, categoria in enumerate(categorias, desde):
+        db.session.add(Componente(f'PART-{i}', f'Componente {i}', categoria=categoria))
+    db.session.commit()
+
+
+def test_segundo_pedido_sale_de_la_cache(client, db, count_queries):
+    _crear_componentes(db, 'Filtros', 'Correas')
+
+    primera = client.get('/api/v1/componentes/categorias')
+    assert primera.status_code == 200
+    assert primera.headers['X-Cache'] == 'MISS'
+    assert primera.headers['ETag']
+    assert primera.headers['Last-Modified']
+
+    with count_queries() as statements:
+        segunda = client.get('/api/v1/componentes/categorias')
+
+    assert statements == []
+    assert segunda.headers['X-Cache'] == 'HIT'
+    assert segunda.get_data() == primera.get_data()
+    assert segunda.headers['ETag'] == primera.headers['ETag']
+
+
+def test_if_none_match_devuelve_304(client, db):
+    _crear_componentes(db, 'Filtros')
+    etag = client.get('/api/v1/componentes/categorias').headers['ETag']
+
+    response = client.get('/api/v1/componentes/categorias', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+    otra = client.get('/api/v1/componentes/categorias', headers={'If-None-Match': '"otro"'})
+    assert otra.status_code == 200
+
+
+def test_escritura_invalida_la_respuesta(client, db):
+    _crear_componentes(db, 'Filtros')
+    primera = client.get('/api/v1/componentes/categorias')
+    assert primera.get_json()['data'] == ['Filtros']
+
+    _crear_componentes(db, 'Correas', desde=1)
+    segunda = client.get('/api/v1/componentes/categorias', headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 200
+    assert segunda.headers['X-Cache'] == 'MISS'
+    assert sorted(segunda.get_json()['data']) == ['Correas', 'Filtros']
+
+    # Escribir en otra tabla no afecta la entrada
+    client.get('/api/v1/componentes/categorias')
+    db.session.add(Maquina('MAQ-1', 'Tractor', tipo_maquina='Tractor'))
+    db.session.commit()
+    assert client.get('/api/v1/componentes/categorias').headers['X-Cache'] == 'HIT'
+
+
+def test_la_clave_incluye_los_parametros(client):
+    assert client.get('/api/v1/estadisticas/stock?dias=7').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/v1/estadisticas/stock?dias=14').headers['X-Cache'] == 'MISS'
+    assert client.get('/api/v1/estadisticas/stock?dias=7').headers['X-Cache'] == 'HIT'
+
+
+def _entrada(clave, tablas=('componentes',)):
+    return Entrada(
+        vence=time.time() + 60, etag=clave, modificado=datetime.now(timezone.utc).replace(microsecond=0),
+        cuerpo=b'{"data": []}', mimetype='application/json', tablas=tablas
+    )
+
+
+def _worker(ruta, intervalo=60):
+    return CacheRespuestas(CacheLocal(16), CacheSQLite(ruta, intervalo=intervalo))
+
+
+def test_lru_local_acotado():
+    local = CacheLocal(max_entradas=2)
+    for clave in ('a', 'b', 'c'):
+        local.guardar(clave, clave, time.time() + 60)
+    assert local.obtener('a') is None
+    assert local.obtener('c') == 'c'
+
+    local.guardar('d', 'd', time.time() - 1)
+    assert local.obtener('d') is None
+
+
+def test_almacen_compartido_entre_workers(tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    a, b = _worker(ruta), _worker(ruta)
+
+    assert a.guardar('/categorias', _entrada('x'), a.versiones(('componentes',)))
+    entrada = b.obtener('/categorias')
+    assert entrada.cuerpo == b'{"data": []}'
+    assert b.estado()['aciertos_compartidos'] == 1
+
+    # b conserva una copia local hasta recibir el evento de a
+    a.invalidar({'componentes'})
+    assert b.local.obtener('/categorias') is not None
+    b.compartido.procesar_eventos(b.recibir_evento)
+    assert b.obtener('/categorias') is None
+    assert b.estado()['eventos_recibidos'] == 1
+
+
+def test_no_guarda_si_otro_worker_invalido(tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    a, b = _worker(ruta), _worker(ruta)
+
+    versiones = a.versiones(('stock',))
+    b.invalidar({'stock'})
+    assert not a.guardar('/estadisticas/stock', _entrada('x', ('stock',)), versiones)
+    assert a.obtener('/estadisticas/stock') is None
+
+
+def test_eventos_llegan_a_otro_worker_en_milisegundos(tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    a, b = _worker(ruta), _worker(ruta, intervalo=0.01)
+    a.guardar('/compras/estados', _entrada('x', ('compras',)), a.versiones(('compras',)))
+    assert b.obtener('/compras/estados') is not None
+
+    a.invalidar({'compras'})
+    limite = time.monotonic() + 2
+    while b.local.obtener('/compras/estados') is not None and time.monotonic() < limite:
+        time.sleep(0.005)
+    assert b.local.obtener('/compras/estados') is None
+
+
+def test_evento_remoto_descarta_resumenes_de_stock(app):
+    _resumenes_cache[1] = (time.monotonic() + 60, {})
+    app.extensions['cache_respuestas'].recibir_evento(['stock'], 'otro-worker')
+    assert _resumenes_cache == {}
+
+
+def test_almacen_bloqueado_no_impide_la_escritura(app, client, db, tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    cache = CacheRespuestas(CacheLocal(16), CacheSQLite(ruta, timeout=0.05))
+    app.extensions['cache_respuestas'] = cache
+    componente = Componente('PART-1', 'Filtro')
+    db.session.add(componente)
+    db.session.commit()
+
+    bloqueo = sqlite3.connect(ruta, isolation_level=None)
+    bloqueo.execute('BEGIN IMMEDIATE')
+    try:
+        response = client.post('/api/v1/stock/movimiento', json={
+            'componente_id': componente.id, 'tipo_movimiento': 'entrada', 'cantidad': 5
+        })
+        assert client.get('/api/v1/componentes/categorias').status_code == 200
+    finally:
+        bloqueo.execute('ROLLBACK')
+        bloqueo.close()
+
+    assert response.status_code == 201
+    assert Stock.query.count() == 1
+    assert cache.estado()['errores_compartido'] > 0
+
+
+class _ConflictoWatch(Exception):
+    pass
+
+
+class _RedisFalso:
+    """Subconjunto de comandos de Redis con vencimientos sobre un reloj manual"""
+
+    def __init__(self):
+        self.ahora = 0.0
+        self.datos = {}
+        self.vence = {}
+        self.cambios = {}
+        self.publicados = []
+
+    def _vivo(self, clave):
+        if clave in self.vence and self.vence[clave] <= self.ahora:
+            self.datos.pop(clave, None)
+            self.vence.pop(clave, None)
+        return clave in self.datos
+
+    def _tocar(self, clave):
+        self.cambios[clave] = self.cambios.get(clave, 0) + 1
+
+    def get(self, clave):
+        return self.datos[clave] if self._vivo(clave) else None
+
+    def mget(self, claves):
+        return [self.get(clave) for clave in claves]
+
+    def set(self, clave, valor, px=None):
+        self.datos[clave] = valor
+        self.vence.pop(clave, None)
+        if px is not None:
+            self.vence[clave] = self.ahora + px / 1000
+        self._tocar(clave)
+
+    def sadd(self, clave, *miembros):
+        if not self._vivo(clave):
+            self.datos[clave] = set()
+        self.datos[clave].update(miembros)
+        self._tocar(clave)
+
+    def smembers(self, clave):
+        return set(self.datos[clave]) if self._vivo(clave) else set()
+
+    def pttl(self, clave):
+        if not self._vivo(clave):
+            return -2
+        return int((self.vence[clave] - self.ahora) * 1000) if clave in self.vence else -1
+
+    def pexpire(self, clave, ms):
+        if self._vivo(clave):
+            self.vence[clave] = self.ahora + ms / 1000
+
+    def incr(self, clave):
+        self.set(clave, int(self.get(clave) or 0) + 1)
+
+    def delete(self, *claves):
+        for clave in claves:
+            self.datos.pop(clave, None)
+            self.vence.pop(clave, None)
+            self._tocar(clave)
+
+    def publish(self, canal, mensaje):
+        self.publicados.append((canal, mensaje))
+
+    def pipeline(self):
+        return _PipelineFalso(self)
+
+
+class _PipelineFalso:
+    def __init__(self, cliente):
+        self.cliente = cliente
+        self.vigiladas = {}
+        self.cola = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def watch(self, *claves):
+        self.vigiladas = {clave: self.cliente.cambios.get(clave, 0) for clave in claves}
+
+    def multi(self):
+        self.cola = []
+
+    def execute(self):
+        if any(self.cliente.cambios.get(clave, 0) != n for clave, n in self.vigiladas.items()):
+            raise _ConflictoWatch()
+        for nombre, args, kwargs in self.cola or ():
+            getattr(self.cliente, nombre)(*args, **kwargs)
+
+    def __getattr__(self, nombre):
+        def comando(*args, **kwargs):
+            if self.cola is None:
+                return getattr(self.cliente, nombre)(*args, **kwargs)
+            self.cola.append((nombre, args, kwargs))
+        return comando
+
+
+def test_redis_etiqueta_vive_tanto_como_su_entrada_mas_larga(monkeypatch):
+    cliente = _RedisFalso()
+    monkeypatch.setattr(cache_backends.time, 'time', lambda: cliente.ahora)
+    almacen = CacheRedis(cliente, watch_error=_ConflictoWatch)
+
+    assert almacen.guardar_si('/estadisticas/stock', 'stock', 300, ('stock',), almacen.versiones(('stock',)))
+    assert almacen.guardar_si('/estadisticas/dashboard', 'dashboard', 60, ('stock',), almacen.versiones(('stock',)))
+
+    # Vencida la entrada de 60 s, la etiqueta sigue apuntando a la de 300 s
+    cliente.ahora = 120
+    assert almacen.obtener('/estadisticas/dashboard') is None
+    assert almacen.obtener('/estadisticas/stock') == 'stock'
+
+    assert almacen.invalidar({'stock'}, 'worker-a') == 2
+    assert almacen.obtener('/estadisticas/stock') is None
+    assert almacen.versiones(('stock',)) == (1,)
+    assert json.loads(cliente.publicados[-1][1]) == {'tablas': ['stock'], 'origen': 'worker-a'}
+
+
+def test_redis_no_guarda_con_versiones_viejas(monkeypatch):
+    cliente = _RedisFalso()
+    monkeypatch.setattr(cache_backends.time, 'time', lambda: cliente.ahora)
+    almacen = CacheRedis(cliente, watch_error=_ConflictoWatch)
+
+    versiones = almacen.versiones(('compras',))
+    almacen.invalidar({'compras'}, 'worker-b')
+    assert not almacen.guardar_si('/estadisticas/compras', 'x', 300, ('compras',), versiones)
+    assert almacen.obtener('/estadisticas/compras') is None
@@ -0,0 +1,54 @@
+"""
+Pruebas de las opciones del engine y de /health/pool
+"""
+from sqlalchemy import create_engine, text
+
+from utils.db_engine import MeteredQueuePool, opciones_engine, configurar_engine, estado_pool
+
+
+def test_sqlite_en_archivo_usa_wal(app, tmp_path):
+    config = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'agricola.db'}", 'SQLITE_BUSY_TIMEOUT_MS': 2500}
+    opciones = opciones_engine(config)
+    assert opciones['poolclass'] is MeteredQueuePool
+    
+    engine = create_engine(config['SQLALCHEMY_DATABASE_URI'], **opciones)
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = 2500
+    configurar_engine(app, engine)
+    with engine.connect() as conn:
+        assert conn.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert conn.execute(text('PRAGMA busy_timeout')).scalar() == 2500
+        assert conn.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+    
+    estado = estado_pool(engine)
+    assert estado['checkouts'] == 1
+    assert estado['en_uso'] == 0
+    engine.dispose()
+
+
+def test_opciones_postgresql_y_prioridad_de_la_config(monkeypatch):
+    monkeypatch.setenv('GUNICORN_THREADS', '8')
+    opciones = opciones_engine({'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@localhost/agricola'})
+    assert opciones['pool_size'] == 10
+    assert opciones['max_overflow'] == 10
+    assert opciones['pool_pre_ping'] is True
+    assert opciones['connect_args'] == {'options': '-c statement_timeout=30000'}
+    
+    opciones = opciones_engine({
+        'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@localhost/agricola',
+        'DB_POOL_SIZE': '3',
+        'DB_STATEMENT_TIMEOUT_MS': 0,
+        'SQLALCHEMY_ENGINE_OPTIONS': {'pool_recycle': 60},
+    })
+    assert opciones['pool_size'] == 3
+    assert opciones['pool_recycle'] == 60
+    assert 'connect_args' not in opciones
+    
+    # SQLite en memoria (pruebas) queda con los valores de Flask-SQLAlchemy
+    assert opciones_engine({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}) == {}
+
+
+def test_endpoint_pool(client):
+    response = client.get('/health/pool')
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert 'clase' in data
@@ -0,0 +1,146 @@
+"""
+Pruebas del mantenimiento incremental de las estadísticas diarias
+"""
+import time
+from datetime import datetime
+
+import pytest
+
+from models.componente import Componente
+from models.compra import Compra
+from models.estadistica_diaria import EstadisticaDiaria, SIN_PROVEEDOR
+from models.proveedor import Proveedor
+from models.stock import Stock
+from utils import time_buckets
+
+
+class _RelojFijo(datetime):
+    """00:30 UTC del 11/3: en un servidor UTC-3 todavía son las 21:30 del 10/3"""
+
+    @classmethod
+    def utcnow(cls):
+        return cls(2024, 3, 11, 0, 30)
+
+
+@pytest.fixture
+def servidor_utc_menos_3(monkeypatch):
+    monkeypatch.setattr(time_buckets, 'datetime', _RelojFijo)
+    monkeypatch.setenv('TZ', 'America/Sao_Paulo')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _filas():
+    return sorted(
+        (str(e.fecha), e.origen, e.componente_id, e.proveedor_id, e.tipo_movimiento,
+         e.cantidad_registros, e.entradas, e.salidas, e.cantidad_total, float(e.valor_total))
+        for e in EstadisticaDiaria.query.all() if e.cantidad_registros
+    )
+
+
+def _operar(client, db):
+    proveedor = Proveedor('PROV-1', 'Proveedor 1')
+    componente = Componente('PART-1', 'Filtro', stock_actual=10, precio_unitario=5)
+    db.session.add_all([proveedor, componente])
+    db.session.commit()
+
+    compra = {'proveedor_id': proveedor.id, 'componente_id': componente.id}
+    client.post('/api/v1/compras', json=dict(compra, numero_compra='C-1', cantidad=4, precio_unitario=10))
+    id_entregada = client.post(
+        '/api/v1/compras', json=dict(compra, numero_compra='C-2', cantidad=2, precio_unitario=3)
+    ).get_json()['data']['id']
+    client.post(f'/api/v1/compras/{id_entregada}/entregar', json={})
+    client.put('/api/v1/compras/1', json={'cantidad': 6})
+    client.post('/api/v1/stock/movimiento', json={
+        'componente_id': componente.id, 'tipo_movimiento': 'salida', 'cantidad': 3, 'motivo': 'uso'
+    })
+
+
+def test_incremental_coincide_con_reconstruccion(client, db):
+    _operar(client, db)
+    incremental = _filas()
+
+    EstadisticaDiaria.reconstruir()
+    db.session.commit()
+
+    assert incremental
+    assert incremental == _filas()
+
+
+def test_dia_utc_en_escrituras_y_lecturas(client, db, servidor_utc_menos_3):
+    proveedor = Proveedor('PROV-1', 'Proveedor 1')
+    componente = Componente('PART-1', 'Filtro', stock_actual=10)
+    db.session.add_all([proveedor, componente])
+    db.session.flush()
+    # 21:10 y 18:00 hora local; 00:10 del 11/3 y 21:00 del 10/3 en UTC
+    for hora, cantidad in ((datetime(2024, 3, 11, 0, 10), 5), (datetime(2024, 3, 10, 21, 0), 2)):
+        movimiento = Stock(componente.id, 'entrada', cantidad, 0, cantidad)
+        movimiento.created_at = hora
+        db.session.add(movimiento)
+    db.session.commit()
+    response = client.post('/api/v1/compras', json={
+        'numero_compra': 'C-1', 'proveedor_id': proveedor.id, 'componente_id': componente.id,
+        'cantidad': 1, 'precio_unitario': 1
+    })
+    assert response.get_json()['data']['fecha_compra'] == '2024-03-11'
+
+    filas = {fila[:2] for fila in _filas()}
+    assert filas == {('2024-03-11', 'stock'), ('2024-03-10', 'stock'), ('2024-03-11', 'compra')}
+
+    evolucion = client.get('/api/v1/estadisticas/stock/evolucion?dias=2').get_json()['data']['periodos']
+    assert [(p['fecha'], p['entradas']) for p in evolucion] == [('2024-03-10', 2), ('2024-03-11', 5)]
+    dashboard = client.get('/api/v1/estadisticas/dashboard').get_json()['data']['mes_actual']
+    assert dashboard['movimientos_hoy'] == 1
+    assert dashboard['compras_realizadas'] == 1
+
+    incremental = _filas()
+    EstadisticaDiaria.reconstruir()
+    db.session.commit()
+    assert incremental == _filas()
+
+
+def test_una_consulta_de_proveedores_por_flush(client, db, count_queries):
+    proveedor = Proveedor('PROV-1', 'Proveedor 1')
+    componente = Componente('PART-1', 'Filtro', stock_actual=100)
+    db.session.add_all([proveedor, componente])
+    db.session.flush()
+    compras = [Compra(f'C-{i}', proveedor.id, componente.id, 1, 10) for i in range(5)]
+    db.session.add_all(compras)
+    db.session.commit()
+    ids = [compra.id for compra in compras]
+    componente_id = componente.id
+
+    with count_queries() as statements:
+        db.session.add_all([Stock(componente_id, 'compra', 1, 0, 1, compra_id=id) for id in ids])
+        db.session.commit()
+
+    consultas = [sql for sql in statements if sql.startswith('SELECT compras.id, compras.proveedor_id')]
+    assert len(consultas) == 1
+    assert ('compra', SIN_PROVEEDOR) not in {(fila[4], fila[3]) for fila in _filas() if fila[1] == 'stock'}
+
+
+def test_endpoints_leen_estadisticas(client, db):
+    _operar(client, db)
+
+    compras = client.get('/api/v1/estadisticas/compras').get_json()['data']
+    por_estado = {fila['estado']: fila['cantidad'] for fila in compras['por_estado']}
+    assert por_estado == {'pendiente': 1, 'entregada': 1}
+    assert compras['por_mes'][0]['total'] == 66.0
+
+    dashboard = client.get('/api/v1/estadisticas/dashboard').get_json()['data']
+    assert dashboard['mes_actual']['compras_realizadas'] == 2
+    assert dashboard['mes_actual']['movimientos_hoy'] == 2
+
+
+def test_comando_rebuild(app, db):
+    _operar(app.test_client(), db)
+    EstadisticaDiaria.query.delete()
+    db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['rebuild-estadisticas'])
+
+    assert resultado.exit_code == 0
+    assert 'reconstruidas' in resultado.output
+    assert _filas()
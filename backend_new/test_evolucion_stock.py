@@ -0,0 +1,60 @@
+"""
+Pruebas de la evolución de stock agrupada por período
+"""
+from datetime import datetime, timedelta
+
+from models.componente import Componente
+from models.stock import Stock
+
+
+def _crear_movimientos(db, movimientos):
+    componente = Componente('FA-1', 'Filtro de aceite', stock_actual=100)
+    db.session.add(componente)
+    db.session.flush()
+
+    ahora = datetime.now()
+    for dias_atras, cantidad in movimientos:
+        movimiento = Stock(componente.id, 'entrada' if cantidad > 0 else 'salida', cantidad, 0, 0)
+        movimiento.created_at = ahora - timedelta(days=dias_atras)
+        db.session.add(movimiento)
+    db.session.commit()
+
+
+def test_evolucion_una_sola_consulta_y_dias_sin_movimientos(client, db, count_queries):
+    _crear_movimientos(db, [(0, 5), (0, -2), (1, 3), (3, -4), (10, 7)])
+
+    with count_queries() as statements:
+        response = client.get('/api/v1/estadisticas/stock/evolucion?dias=7')
+
+    periodos = response.get_json()['data']['periodos']
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert len(periodos) == 7
+    assert [p['fecha'] for p in periodos] == sorted(p['fecha'] for p in periodos)
+    assert periodos[-1]['entradas'] == 5 and periodos[-1]['salidas'] == 2
+    assert periodos[-2]['entradas'] == 3
+    assert periodos[-4]['salidas'] == 4
+    assert sum(p['entradas'] for p in periodos) == 8
+
+
+def test_evolucion_por_mes(client, db):
+    _crear_movimientos(db, [(0, 5), (0, -2), (10, 7)])
+
+    response = client.get('/api/v1/estadisticas/stock/evolucion?dias=60&granularidad=mes')
+
+    periodos = response.get_json()['data']['periodos']
+    assert all(p['fecha'].endswith('-01') for p in periodos)
+    assert sum(p['entradas'] for p in periodos) == 12
+    assert sum(p['salidas'] for p in periodos) == 2
+
+
+def test_evolucion_granularidad_invalida(client, db):
+    response = client.get('/api/v1/estadisticas/stock/evolucion?granularidad=hora')
+    assert response.status_code == 400
+
+
+def test_dias_no_numerico_devuelve_400(client, db):
+    for url in ('/api/v1/estadisticas/stock/evolucion?dias=abc', '/api/v1/estadisticas/stock?dias=abc'):
+        response = client.get(url)
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'dias debe ser un número entero'
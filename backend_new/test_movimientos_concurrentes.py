@@ -0,0 +1,67 @@
+"""
+Pruebas de movimientos de stock concurrentes sobre un mismo componente
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import config
+from app import create_app
+from extensions import db as _db
+from models.componente import Componente
+from models.stock import Stock
+
+STOCK_INICIAL = 40
+PEDIDOS = 100
+HILOS = 8
+
+
+@pytest.fixture
+def app_archivo(tmp_path, monkeypatch):
+    """Aplicación sobre un archivo SQLite: cada hilo usa su propia conexión"""
+    monkeypatch.setattr(config.TestingConfig, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'stock.db'}")
+    app = create_app('testing')
+    with app.app_context():
+        _db.create_all()
+        componente = Componente('PART-1', 'Filtro', stock_actual=STOCK_INICIAL)
+        _db.session.add(componente)
+        _db.session.commit()
+        yield app, componente.id
+        _db.session.remove()
+        _db.drop_all()
+
+
+def test_consumos_concurrentes_no_pierden_actualizaciones(app_archivo):
+    app, componente_id = app_archivo
+
+    def consumir(_):
+        with app.test_client() as client:
+            return client.post('/api/v1/stock/movimiento', json={
+                'componente_id': componente_id, 'tipo_movimiento': 'consumo', 'cantidad': 1
+            }).status_code
+
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        estados = list(pool.map(consumir, range(PEDIDOS)))
+
+    _db.session.expire_all()
+    componente = _db.session.get(Componente, componente_id)
+    movimientos = Stock.query.filter(Stock.componente_id == componente_id).all()
+
+    assert estados.count(201) == STOCK_INICIAL
+    assert estados.count(400) == PEDIDOS - STOCK_INICIAL
+    assert componente.stock_actual == 0
+    # El libro de movimientos cuadra con el stock y cada movimiento parte del anterior
+    assert STOCK_INICIAL + sum(m.cantidad for m in movimientos) == componente.stock_actual
+    assert sorted(m.stock_nuevo for m in movimientos) == list(range(STOCK_INICIAL))
+
+
+def test_ajuste_no_duplica_movimiento(client, db):
+    componente = Componente('PART-2', 'Correa', stock_actual=5)
+    db.session.add(componente)
+    db.session.commit()
+
+    response = client.post(f'/api/v1/componentes/{componente.id}/stock', json={'cantidad': 3})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['stock_nuevo'] == 8
+    assert Stock.query.filter(Stock.componente_id == componente.id).count() == 1
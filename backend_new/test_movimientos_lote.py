@@ -0,0 +1,104 @@
+"""
+Pruebas del endpoint de movimientos de stock en lote
+"""
+from models.componente import Componente
+from models.stock import Stock
+
+URL = '/api/v1/stock/movimientos/lote'
+
+
+def _crear_componentes(db):
+    filtro = Componente('PART-1', 'Filtro', stock_actual=10)
+    correa = Componente('PART-2', 'Correa', stock_actual=2)
+    db.session.add_all([filtro, correa])
+    db.session.commit()
+    return filtro.id, correa.id
+
+
+def _consumo(componente_id, cantidad=1):
+    return {'componente_id': componente_id, 'tipo_movimiento': 'consumo', 'cantidad': cantidad}
+
+
+def test_todo_o_nada_no_aplica_si_alguno_falla(client, db):
+    filtro, correa = _crear_componentes(db)
+
+    response = client.post(URL, json={'movimientos': [_consumo(filtro, 3), _consumo(correa, 5)]})
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert [item['success'] for item in body['data']] == [False, False]
+    assert body['data'][0]['error'] == 'no aplicado: lote rechazado'
+    assert body['data'][1]['error'] == 'El movimiento resultaría en stock negativo'
+    assert body['resumen']['con_error'] == 1
+    assert body['resumen']['no_aplicados'] == 1
+    assert db.session.get(Componente, filtro).stock_actual == 10
+    assert Stock.query.count() == 0
+
+
+def test_parcial_aplica_los_validos_en_orden(client, db):
+    filtro, correa = _crear_componentes(db)
+    movimientos = [
+        _consumo(filtro, 4),
+        _consumo(correa, 2),
+        _consumo(correa, 1),
+        {'componente_id': 999, 'tipo_movimiento': 'entrada', 'cantidad': 1},
+        {'componente_id': filtro, 'tipo_movimiento': 'regalo', 'cantidad': 1},
+        {'componente_id': correa, 'tipo_movimiento': 'entrada', 'cantidad': 3},
+    ]
+
+    response = client.post(URL, json={'movimientos': movimientos, 'modo': 'parcial'})
+
+    body = response.get_json()
+    assert response.status_code == 201
+    assert [item['success'] for item in body['data']] == [True, True, False, False, False, True]
+    assert body['resumen']['aplicados'] == 3
+    assert [item['data']['stock_nuevo'] for item in body['data'] if item['success']] == [6, 0, 3]
+    assert db.session.get(Componente, filtro).stock_actual == 6
+    assert db.session.get(Componente, correa).stock_actual == 3
+
+
+def test_lote_una_lectura_y_un_update_por_componente(client, db, count_queries):
+    filtro, correa = _crear_componentes(db)
+    movimientos = [_consumo(filtro) for _ in range(8)] + [_consumo(correa) for _ in range(2)]
+
+    with count_queries() as statements:
+        response = client.post(URL, json={'movimientos': movimientos})
+
+    assert response.status_code == 201
+    assert sum(1 for sql in statements if sql.startswith('SELECT componentes')) <= 2
+    assert sum(1 for sql in statements if sql.startswith('UPDATE componentes')) == 2
+
+
+def test_todo_o_nada_rechazado_por_formato_marca_los_validos(client, db):
+    filtro, _ = _crear_componentes(db)
+    movimientos = [_consumo(filtro), {'componente_id': 'abc', 'tipo_movimiento': 'entrada', 'cantidad': 1}]
+
+    response = client.post(URL, json={'movimientos': movimientos})
+
+    body = response.get_json()
+    assert response.status_code == 400
+    assert body['data'][0] == {'indice': 0, 'success': False, 'error': 'no aplicado: lote rechazado'}
+    assert body['data'][1]['error'] == 'componente_id debe ser un número entero'
+    assert Stock.query.count() == 0
+
+
+def test_movimiento_individual_usa_las_mismas_validaciones(client, db):
+    filtro, _ = _crear_componentes(db)
+    url = '/api/v1/stock/movimiento'
+
+    for body, error in [
+        ({'componente_id': [filtro], 'tipo_movimiento': 'entrada', 'cantidad': 1}, 'componente_id debe ser un número entero'),
+        ({'componente_id': True, 'tipo_movimiento': 'entrada', 'cantidad': 1}, 'componente_id debe ser un número entero'),
+        ({'componente_id': filtro, 'tipo_movimiento': 'entrada', 'cantidad': None}, 'Cantidad debe ser un número entero'),
+        ({'componente_id': filtro, 'tipo_movimiento': 'regalo', 'cantidad': 1}, 'Tipo de movimiento debe ser uno de'),
+        ({'componente_id': filtro}, 'Campo tipo_movimiento es requerido'),
+    ]:
+        response = client.post(url, json=body)
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith(error)
+
+    assert client.post(url, json=_consumo(999)).status_code == 404
+
+    response = client.post(url, json=_consumo(str(filtro), 3))
+    assert response.status_code == 201
+    assert db.session.get(Componente, filtro).stock_actual == 7
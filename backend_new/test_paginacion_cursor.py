@@ -0,0 +1,94 @@
+"""
+Pruebas de la paginación por cursor recorriendo tablas completas
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, text
+
+from models.componente import Componente
+from models.stock import Stock
+from utils.timestamps import normalizar_timestamps
+
+
+def _recorrer(client, url):
+    ids, cursor = [], ''
+    while cursor is not None:
+        response = client.get(f'{url}&cursor={cursor}')
+        assert response.status_code == 200
+        body = response.get_json()
+        ids.extend(item['id'] for item in body['data'])
+        cursor = body['pagination']['next_cursor']
+    return ids
+
+
+def test_cursor_recorre_empates_y_segundos_enteros(client, db):
+    componente = Componente('FA-1', 'Filtro de aceite')
+    db.session.add(componente)
+    db.session.flush()
+
+    empate = datetime(2024, 1, 1, 10, 0, 0)
+    fechas = [empate] * 10 + [empate + timedelta(microseconds=500 * i) for i in range(1, 11)]
+    fechas += [empate - timedelta(seconds=i) for i in range(1, 6)]
+    for fecha in fechas:
+        movimiento = Stock(componente.id, 'entrada', 1, 0, 1)
+        movimiento.created_at = fecha
+        db.session.add(movimiento)
+    for _ in range(5):
+        db.session.add(Stock(componente.id, 'entrada', 1, 0, 1))
+    db.session.commit()
+
+    # Filas con el formato de CURRENT_TIMESTAMP (sin fracción) en el mismo segundo del empate
+    db.session.execute(text(
+        "UPDATE stock SET created_at = '2024-01-01 10:00:00' WHERE id IN "
+        "(SELECT id FROM stock ORDER BY id DESC LIMIT 5)"
+    ))
+    db.session.commit()
+    assert normalizar_timestamps() == 5
+    db.session.commit()
+
+    ids = _recorrer(client, '/api/v1/stock?per_page=5')
+
+    esperado = [
+        movimiento.id for movimiento in
+        sorted(Stock.query.all(), key=lambda m: (m.created_at, m.id), reverse=True)
+    ]
+    assert len(ids) == 30
+    assert ids == esperado
+
+
+def test_cursor_orden_ascendente_por_nombre_con_empates(client, db):
+    for i in range(12):
+        db.session.add(Componente(f'PART-{i}', 'Correa' if i % 2 else 'Filtro'))
+    db.session.commit()
+
+    ids = _recorrer(client, '/api/v1/componentes?per_page=5&sort_by=nombre&sort_order=asc')
+
+    esperado = [c.id for c in sorted(Componente.query.all(), key=lambda c: (c.nombre, c.id))]
+    assert ids == esperado
+
+
+def test_pagina_siguiente_usa_el_indice(client, db):
+    componente = Componente('FA-1', 'Filtro de aceite')
+    db.session.add(componente)
+    db.session.flush()
+    db.session.add_all([Stock(componente.id, 'entrada', 1, 0, 1) for _ in range(20)])
+    db.session.commit()
+    cursor = client.get('/api/v1/stock?per_page=5&cursor=').get_json()['pagination']['next_cursor']
+
+    sentencias = []
+
+    def capturar(conn, cursor, statement, parameters, context, executemany):
+        sentencias.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capturar)
+    try:
+        assert client.get(f'/api/v1/stock?per_page=5&cursor={cursor}').status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capturar)
+
+    statement, parameters = next(s for s in sentencias if s[0].startswith('SELECT stock.'))
+    plan = ' '.join(
+        fila[-1] for fila in db.session.connection().exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+    )
+    assert 'SEARCH stock USING INDEX ix_stock_created_at_id' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,76 @@
+"""
+Pruebas de los totales de compras en el listado y detalle de proveedores
+"""
+import pytest
+
+from models.componente import Componente
+from models.compra import Compra
+from models.proveedor import Proveedor
+
+PROVEEDORES = 30
+
+
+def _crear_datos(db):
+    componente = Componente('PART-1', 'Filtro')
+    proveedores = [Proveedor(f'PROV-{i}', f'Proveedor {i:03}') for i in range(PROVEEDORES)]
+    db.session.add(componente)
+    db.session.add_all(proveedores)
+    db.session.flush()
+
+    # El proveedor i tiene i compras de 10
+    for i, proveedor in enumerate(proveedores):
+        for j in range(i):
+            db.session.add(Compra(f'COMP-{i}-{j}', proveedor.id, componente.id, 1, 10))
+    db.session.commit()
+    ids = [proveedor.id for proveedor in proveedores]
+    db.session.expunge_all()
+    return ids
+
+
+@pytest.mark.parametrize('denormalizado', [False, True])
+def test_listado_con_totales_sin_n_mas_uno(app, client, db, count_queries, denormalizado):
+    app.config['PROVEEDOR_TOTALES_DENORMALIZADOS'] = denormalizado
+    _crear_datos(db)
+
+    with count_queries() as statements:
+        response = client.get(f'/api/v1/proveedores?per_page={PROVEEDORES}')
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    # Query de la página + COUNT(*) de paginate()
+    assert len(statements) <= 2
+    assert [p['cantidad_compras'] for p in data] == list(range(PROVEEDORES))
+    assert float(data[3]['total_compras']) == 30
+    assert data[0]['ultima_compra'] is None
+
+
+def test_totales_denormalizados_se_mantienen(app, client, db):
+    app.config['PROVEEDOR_TOTALES_DENORMALIZADOS'] = True
+    ids = _crear_datos(db)
+
+    compra = Compra.query.filter(Compra.proveedor_id == ids[2]).first()
+    db.session.delete(compra)
+    db.session.commit()
+
+    detalle = client.get(f'/api/v1/proveedores/{ids[2]}').get_json()['data']
+    assert detalle['cantidad_compras'] == 1
+    assert float(detalle['total_compras']) == 10
+    assert db.session.get(Proveedor, ids[2]).compras_registradas == 1
+
+
+def test_rebuild_agrega_las_columnas_en_una_base_existente(app, db):
+    ids = _crear_datos(db)
+    # Base creada antes de las columnas denormalizadas
+    for columna in Proveedor.COLUMNAS_TOTALES:
+        db.session.execute(db.text(f'ALTER TABLE proveedores DROP COLUMN {columna}'))
+    db.session.commit()
+
+    resultado = app.test_cli_runner().invoke(args=['rebuild-totales-proveedores'])
+    assert resultado.exit_code == 0, resultado.output
+    assert 'compras_ultima_fecha' in resultado.output
+
+    app.config['PROVEEDOR_TOTALES_DENORMALIZADOS'] = True
+    db.session.expunge_all()
+    proveedor = db.session.get(Proveedor, ids[4])
+    assert (proveedor.compras_registradas, float(proveedor.compras_total)) == (4, 40)
+    assert Proveedor.agregar_columnas_totales() == []
@@ -0,0 +1,95 @@
+"""
+Pruebas de cantidad de queries por página en los listados de stock, compras y máquinas
+"""
+from models.componente import Componente
+from models.compra import Compra
+from models.maquina import Maquina
+from models.proveedor import Proveedor
+from models.stock import Stock
+
+FILAS = 50
+# Query de la página + COUNT(*) de paginate() + una carga en bloque por relación
+MAX_QUERIES_STOCK = 3
+MAX_QUERIES_COMPRAS = 4
+# Query de la página (con los conteos de componentes) + COUNT(*) de paginate()
+MAX_QUERIES_MAQUINAS = 2
+
+
+def _crear_datos(db):
+    proveedores = [Proveedor(f'PROV-{i}', f'Proveedor {i}') for i in range(FILAS)]
+    componentes = [Componente(f'PART-{i}', f'Componente {i}', stock_actual=10) for i in range(FILAS)]
+    db.session.add_all(proveedores + componentes)
+    db.session.flush()
+
+    for i, (proveedor, componente) in enumerate(zip(proveedores, componentes)):
+        db.session.add(Stock(componente.id, 'entrada', 1, 10, 11))
+        db.session.add(Compra(f'COMP-{i}', proveedor.id, componente.id, 1, 10))
+    db.session.commit()
+    # Vaciar el identity map para que las relaciones no salgan de caché
+    db.session.expunge_all()
+
+
+def test_listado_stock_sin_n_mas_uno(client, db, count_queries):
+    _crear_datos(db)
+
+    with count_queries() as statements:
+        response = client.get(f'/api/v1/stock?per_page={FILAS}')
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert len(data) == FILAS
+    assert all(item['componente_nombre'] for item in data)
+    assert len(statements) <= MAX_QUERIES_STOCK
+
+
+def test_listado_compras_sin_n_mas_uno(client, db, count_queries):
+    _crear_datos(db)
+
+    with count_queries() as statements:
+        response = client.get(f'/api/v1/compras?per_page={FILAS}')
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert len(data) == FILAS
+    assert all(item['proveedor_nombre'] and item['componente_nombre'] for item in data)
+    assert len(statements) <= MAX_QUERIES_COMPRAS
+
+
+def _crear_maquinas(db):
+    componentes = [Componente(f'PART-{i}', f'Componente {i}') for i in range(3)]
+    maquinas = [Maquina(f'MAQ-{i}', f'Maquina {i:03}') for i in range(FILAS)]
+    db.session.add_all(componentes + maquinas)
+    db.session.flush()
+    ids = [maquina.id for maquina in maquinas]
+
+    # La máquina i tiene i % 4 componentes; el primero es crítico
+    for i, maquina in enumerate(maquinas):
+        for j, componente in enumerate(componentes[:i % 4]):
+            maquina.agregar_componente(componente, es_critico=(j == 0))
+    db.session.commit()
+    db.session.expunge_all()
+    return ids
+
+
+def test_listado_maquinas_sin_n_mas_uno(client, db, count_queries):
+    _crear_maquinas(db)
+
+    with count_queries() as statements:
+        response = client.get(f'/api/v1/maquinas?per_page={FILAS}')
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert [m['cantidad_componentes'] for m in data] == [i % 4 for i in range(FILAS)]
+    assert [m['componentes_criticos_count'] for m in data] == [min(i % 4, 1) for i in range(FILAS)]
+    assert len(statements) <= MAX_QUERIES_MAQUINAS
+
+
+def test_conteos_de_maquina_sin_precargar(db, count_queries):
+    ids = _crear_maquinas(db)
+    maquina = db.session.get(Maquina, ids[3])
+
+    with count_queries() as statements:
+        datos = maquina.to_dict()
+
+    assert (datos['cantidad_componentes'], datos['componentes_criticos_count']) == (3, 1)
+    assert len(statements) == 1
@@ -0,0 +1,57 @@
+"""
+Pruebas del resumen de movimientos por componente
+"""
+from models.componente import Componente
+from models.stock import Stock
+
+
+def _crear_componente(db):
+    componente = Componente('PART-1', 'Filtro', stock_actual=0)
+    db.session.add(componente)
+    db.session.commit()
+    for cantidad in (10, -3, 5, -2):
+        Stock.crear_movimiento(componente.id, 'entrada' if cantidad > 0 else 'salida', cantidad, precio_unitario=2)
+    db.session.commit()
+    return componente.id
+
+
+def test_resumen_agregado_en_sql(db):
+    componente_id = _crear_componente(db)
+
+    resumen = Stock.resumen_por_componente(componente_id)
+
+    assert resumen['total_movimientos'] == 4
+    assert resumen['total_entradas'] == 15
+    assert resumen['total_salidas'] == 5
+    assert resumen['stock_actual'] == 10
+    assert float(resumen['valor_total_entradas']) == 30
+    assert float(resumen['valor_total_salidas']) == 10
+    assert resumen['ultimo_movimiento'] is not None
+
+
+def test_resumen_cacheado_e_invalidado_al_escribir(db, count_queries):
+    componente_id = _crear_componente(db)
+    Stock.resumen_por_componente(componente_id)
+
+    with count_queries() as statements:
+        Stock.resumen_por_componente(componente_id)
+    assert statements == []
+
+    Stock.crear_movimiento(componente_id, 'salida', -4)
+    db.session.commit()
+
+    resumen = Stock.resumen_por_componente(componente_id)
+    assert resumen['total_movimientos'] == 5
+    assert resumen['stock_actual'] == 6
+
+
+def test_resumen_sin_movimientos(db):
+    componente = Componente('PART-2', 'Correa')
+    db.session.add(componente)
+    db.session.commit()
+
+    resumen = Stock.resumen_por_componente(componente.id)
+
+    assert resumen['total_movimientos'] == 0
+    assert resumen['stock_actual'] == 0
+    assert resumen['ultimo_movimiento'] is None
@@ -0,0 +1,48 @@
+"""
+Pruebas del serializador compilado de los modelos y del parámetro ?fields=
+"""
+from decimal import Decimal
+
+from models import base_mixin
+from models.componente import Componente
+
+
+def _crear_componente(db):
+    componente = Componente('PART-1', 'Filtro', stock_actual=3, precio_unitario=Decimal('2.50'))
+    db.session.add(componente)
+    db.session.commit()
+    return componente
+
+
+def test_fields_limita_las_claves_del_listado(client, db):
+    _crear_componente(db)
+
+    response = client.get('/api/v1/componentes?fields=id,nombre,valor_total_stock,inexistente')
+
+    data = response.get_json()['data']
+    assert response.status_code == 200
+    assert data == [{'id': data[0]['id'], 'nombre': 'Filtro', 'valor_total_stock': 7.5}]
+
+
+def test_campos_calculados_decimales_se_serializan_como_numeros(db):
+    componente = _crear_componente(db)
+
+    data = componente.to_dict()
+
+    assert data['precio_unitario'] == 2.5
+    assert data['valor_total_stock'] == 7.5
+    assert isinstance(data['valor_total_stock'], float)
+
+
+def test_cache_de_serializadores_acotada(db, monkeypatch):
+    componente = _crear_componente(db)
+    monkeypatch.setattr(base_mixin, 'MAX_SERIALIZERS', 3)
+    monkeypatch.setattr(Componente, '_serializers_cache', {})
+
+    # Nombres desconocidos no generan claves nuevas
+    for raro in ('a', 'b', 'c', 'd'):
+        assert componente.to_dict({'nombre', raro}) == {'nombre': 'Filtro'}
+    for campo in ('id', 'stock_actual', 'precio_unitario', 'moneda'):
+        assert set(componente.to_dict({'nombre', campo})) == {'nombre', campo}
+
+    assert len(Componente._serializers_cache) == 3
@@ -3,7 +3,7 @@ Utilidades para la aplicación
 """
 from .validators import validate_json, validate_file_extension
 from .file_handler import save_uploaded_file, delete_file
-from .pagination import paginate_query
+from .pagination import paginate_query, keyset_paginate, keyset_response, get_keyset_info, wants_cursor_pagination, InvalidCursorError
 from .formatters import format_currency, format_date
 
 __all__ = [
@@ -12,6 +12,11 @@ __all__ = [
     'save_uploaded_file',
     'delete_file',
     'paginate_query',
+    'keyset_paginate',
+    'keyset_response',
+    'get_keyset_info',
+    'wants_cursor_pagination',
+    'InvalidCursorError',
     'format_currency',
     'format_date'
 ]
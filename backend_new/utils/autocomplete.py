@@ -0,0 +1,299 @@
+"""
+Índice invertido de n-gramas en memoria para autocompletar componentes
+
+Cada término indexado (palabras de cada campo y los códigos completos sin
+signos, p. ej. 'FA-001' -> 'fa001') se descompone en bigramas. Una consulta
+recupera candidatos por los bigramas que comparte y los ordena por la
+fracción de sus bigramas presentes en el mejor término de cada documento,
+por lo que tolera errores de tipeo y prefijos incompletos.
+"""
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from flask import current_app
+
+from extensions import db
+
+# Largo de los n-gramas: con bigramas un código corto con una letra
+# cambiada o dos transpuestas conserva la mitad de sus n-gramas
+N = 2
+
+# Fracción mínima de los n-gramas de la consulta presentes en un término
+UMBRAL_SIMILITUD = 0.5
+
+# Límites de memoria: los n-gramas con más documentos dejan de indexarse
+# (no distinguen entre resultados) y los términos largos se truncan
+MAX_POSTINGS_POR_NGRAMA = 5000
+MAX_LARGO_TERMINO = 40
+MAX_TERMINOS_POR_DOCUMENTO = 24
+
+# Candidatos (por cantidad de n-gramas compartidos) que se puntúan en detalle
+MAX_CANDIDATOS = 50
+
+BONUS_PREFIJO = 0.25
+BONUS_EXACTO = 0.25
+
+# Se descartan los resultados con menos de esta fracción del mejor score
+MIN_SCORE_RELATIVO = 0.5
+
+_PALABRA = re.compile(r'[a-z0-9]+')
+
+
+def normalizar(texto):
+    """Minúsculas y sin acentos"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    return texto.encode('ascii', 'ignore').decode('ascii').lower()
+
+
+def terminos(texto, codigo=True):
+    """
+    Palabras del texto y, si es un código con varias partes ('FA-001'),
+    también el texto completo sin separadores ('fa001')
+    """
+    palabras = _PALABRA.findall(normalizar(texto))
+    if codigo and len(palabras) > 1:
+        palabras.append(''.join(palabras))
+    return [palabra[:MAX_LARGO_TERMINO] for palabra in palabras]
+
+
+def ngramas(termino, cerrado=True):
+    """
+    N-gramas de un término con relleno al inicio
+    
+    Args:
+        termino: Texto normalizado
+        cerrado: Rellenar también al final (términos indexados); las
+            consultas no se cierran para que funcionen como prefijo
+    
+    Returns:
+        frozenset de n-gramas
+    """
+    relleno = ' ' * (N - 1) + termino + (' ' if cerrado else '')
+    return frozenset(relleno[i:i + N] for i in range(len(relleno) - N + 1))
+
+
+class IndiceNgramas:
+    """
+    Índice invertido de n-gramas -> ids de documento, seguro entre hilos.
+    
+    Cada documento se agrega con sus campos ponderados y un diccionario de
+    datos que se devuelve tal cual en los resultados.
+    """
+    
+    def __init__(self, max_postings=MAX_POSTINGS_POR_NGRAMA):
+        self.max_postings = max_postings
+        self.construido_en = None
+        self._postings = {}
+        self._saturados = set()
+        self._documentos = {}
+        self._lock = threading.RLock()
+        # Tomado por el thread que reconstruye el índice completo
+        self.reconstruccion = threading.Lock()
+    
+    def __len__(self):
+        return len(self._documentos)
+    
+    @staticmethod
+    def _preparar(campos):
+        """Términos del documento con sus n-gramas y el mayor peso de campo"""
+        pesos = {}
+        for texto, peso, codigo in campos:
+            for termino in terminos(texto, codigo):
+                pesos[termino] = max(peso, pesos.get(termino, 0))
+        return tuple(
+            (termino, ngramas(termino), peso)
+            for termino, peso in list(pesos.items())[:MAX_TERMINOS_POR_DOCUMENTO]
+        )
+    
+    def _indexar(self, id, preparado, datos):
+        self._documentos[id] = (preparado, datos)
+        for grama in set().union(*(gramas for _, gramas, _ in preparado)):
+            if grama in self._saturados:
+                continue
+            ids = self._postings.setdefault(grama, set())
+            ids.add(id)
+            if len(ids) > self.max_postings:
+                del self._postings[grama]
+                self._saturados.add(grama)
+    
+    def _desindexar(self, id):
+        documento = self._documentos.pop(id, None)
+        if documento is None:
+            return
+        for _, gramas, _ in documento[0]:
+            for grama in gramas:
+                ids = self._postings.get(grama)
+                if ids is not None:
+                    ids.discard(id)
+                    if not ids:
+                        del self._postings[grama]
+    
+    def agregar(self, id, campos, datos):
+        """
+        Agregar o reemplazar un documento
+        
+        Args:
+            id: Identificador del documento
+            campos: [(texto, peso, es_codigo)] a indexar
+            datos: Diccionario devuelto en los resultados
+        """
+        preparado = self._preparar(campos)
+        with self._lock:
+            self._desindexar(id)
+            self._indexar(id, preparado, datos)
+    
+    def quitar(self, id):
+        """Quitar un documento (no falla si no estaba)"""
+        with self._lock:
+            self._desindexar(id)
+    
+    def reemplazar(self, documentos):
+        """
+        Reconstruir el índice completo
+        
+        Args:
+            documentos: Iterable de (id, campos, datos)
+        """
+        nuevo = IndiceNgramas(self.max_postings)
+        for id, campos, datos in documentos:
+            nuevo._indexar(id, self._preparar(campos), datos)
+        with self._lock:
+            self._postings = nuevo._postings
+            self._saturados = nuevo._saturados
+            self._documentos = nuevo._documentos
+            self.construido_en = time.monotonic()
+    
+    def buscar(self, consulta, limite=10):
+        """
+        Documentos más parecidos a la consulta
+        
+        Args:
+            consulta: Texto ingresado (parcial o con errores de tipeo)
+            limite: Cantidad máxima de resultados
+        
+        Returns:
+            list: Datos de cada documento con su 'score', de mayor a menor
+        """
+        unidades = [(termino, ngramas(termino, cerrado=False)) for termino in terminos(consulta)]
+        if not unidades:
+            return []
+        # El texto completo compite solo; las palabras sueltas se promedian
+        completo = unidades.pop() if len(unidades) > 1 else None
+        
+        gramas_consulta = set().union(*(gramas for _, gramas in unidades))
+        if completo is not None:
+            gramas_consulta |= completo[1]
+        
+        with self._lock:
+            conteo = Counter()
+            for grama in gramas_consulta:
+                conteo.update(self._postings.get(grama, ()))
+            
+            resultados = []
+            for id, _ in conteo.most_common(MAX_CANDIDATOS):
+                preparado, datos = self._documentos[id]
+                score = sum(_mejor(unidad, preparado) for unidad in unidades) / len(unidades)
+                if completo is not None:
+                    score = max(score, _mejor(completo, preparado))
+                if score > 0:
+                    resultados.append((score, id, datos))
+        
+        if not resultados:
+            return []
+        
+        resultados.sort(key=lambda r: (-r[0], r[1]))
+        minimo = resultados[0][0] * MIN_SCORE_RELATIVO
+        return [
+            dict(datos, score=round(score, 3))
+            for score, _, datos in resultados[:limite]
+            if score >= minimo
+        ]
+
+
+def _mejor(unidad, preparado):
+    """Similitud de una palabra de la consulta con el mejor término del documento"""
+    consulta, gramas_consulta = unidad
+    mejor = 0
+    for termino, gramas, peso in preparado:
+        similitud = len(gramas_consulta & gramas) / len(gramas_consulta)
+        if similitud < UMBRAL_SIMILITUD:
+            continue
+        if termino.startswith(consulta):
+            similitud += BONUS_PREFIJO + (BONUS_EXACTO if termino == consulta else 0)
+        mejor = max(mejor, similitud * peso)
+    return mejor
+
+
+# --- Índice de componentes ---------------------------------------------------
+
+EXTENSION = 'autocompletado_componentes'
+
+# Campos indexados: (campo, peso en el ranking, es un código)
+CAMPOS_COMPONENTE = (
+    ('numero_parte', 1.0, True),
+    ('nombre', 0.8, False),
+    ('marca', 0.6, False),
+    ('modelo', 0.6, True),
+)
+
+
+def _documento(componente):
+    datos = {campo: getattr(componente, campo) for campo in ('id',) + tuple(c[0] for c in CAMPOS_COMPONENTE)}
+    campos = [(datos[campo], peso, codigo) for campo, peso, codigo in CAMPOS_COMPONENTE]
+    return componente.id, campos, datos
+
+
+def construir_indice_componentes(app=None):
+    """
+    Cargar en el índice todos los componentes activos (una consulta)
+    
+    Returns:
+        IndiceNgramas: Índice de la aplicación
+    """
+    from models.componente import Componente
+    
+    app = app or current_app
+    indice = app.extensions.setdefault(EXTENSION, IndiceNgramas())
+    columnas = [Componente.id] + [getattr(Componente, campo) for campo, _, _ in CAMPOS_COMPONENTE]
+    filas = db.session.query(*columnas).filter(Componente.activo == True).all()
+    indice.reemplazar(_documento(fila) for fila in filas)
+    return indice
+
+
+def indice_componentes():
+    """
+    Índice de la aplicación, construyéndolo si falta o venció AUTOCOMPLETE_MAX_EDAD
+    
+    La primera construcción se espera; una vez construido, un solo thread lo
+    reconstruye al vencer y los demás siguen consultando el índice anterior.
+    """
+    indice = current_app.extensions.setdefault(EXTENSION, IndiceNgramas())
+    if indice.construido_en is None:
+        with indice.reconstruccion:
+            if indice.construido_en is None:
+                construir_indice_componentes()
+        return indice
+    
+    max_edad = current_app.config.get('AUTOCOMPLETE_MAX_EDAD')
+    if max_edad and time.monotonic() - indice.construido_en > max_edad:
+        if indice.reconstruccion.acquire(blocking=False):
+            try:
+                construir_indice_componentes()
+            finally:
+                indice.reconstruccion.release()
+    return indice
+
+
+def actualizar_componente(componente):
+    """Reflejar el alta, modificación o baja de un componente en el índice"""
+    indice = current_app.extensions.get(EXTENSION)
+    if indice is None or indice.construido_en is None:
+        # Todavía no se construyó: se cargará completo en la primera consulta
+        return
+    if componente.activo:
+        indice.agregar(*_documento(componente))
+    else:
+        indice.quitar(componente.id)
@@ -0,0 +1,363 @@
+"""
+Almacenamiento de la caché de respuestas
+
+- CacheLocal: LRU en memoria del proceso, acotado por cantidad de entradas
+  y por TTL. Es el primer nivel en todos los modos.
+- CacheSQLite: archivo SQLite compartido por los workers de la misma
+  máquina (modo WAL). Las invalidaciones se registran en una tabla de
+  eventos que cada worker consulta cada pocos milisegundos.
+- CacheRedis: servidor Redis compartido por todas las máquinas; las
+  invalidaciones se publican en un canal pub/sub.
+
+Los almacenes compartidos guardan cada entrada serializada (texto JSON),
+las claves asociadas a cada tabla y un número de versión por tabla. Las
+entradas se guardan solo si las versiones de sus tablas no cambiaron
+mientras se calculaban (guardar_si).
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se conservan los eventos de invalidación en SQLite
+RETENCION_EVENTOS = 60
+
+
+class CacheLocal:
+    """LRU en memoria con vencimiento e índice de claves por tabla"""
+    
+    def __init__(self, max_entradas=512, ttl_max=None):
+        self.max_entradas = max_entradas
+        self.ttl_max = ttl_max
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()
+        self._por_tabla = {}
+        self._versiones = {}
+    
+    def obtener(self, clave):
+        with self._lock:
+            item = self._entradas.get(clave)
+            if item is None:
+                return None
+            
+            vence, valor, _ = item
+            if vence <= time.time():
+                self._quitar(clave)
+                return None
+            
+            self._entradas.move_to_end(clave)
+            return valor
+    
+    def versiones(self, tablas):
+        with self._lock:
+            return tuple(self._versiones.get(tabla, 0) for tabla in tablas)
+    
+    def guardar(self, clave, valor, vence, tablas=()):
+        if self.ttl_max is not None:
+            vence = min(vence, time.time() + self.ttl_max)
+        
+        with self._lock:
+            self._guardar(clave, valor, vence, tablas)
+    
+    def guardar_si(self, clave, valor, vence, tablas, versiones):
+        """Guardar salvo que alguna tabla haya cambiado desde `versiones`"""
+        with self._lock:
+            if tuple(self._versiones.get(tabla, 0) for tabla in tablas) != tuple(versiones):
+                return False
+            self._guardar(clave, valor, vence, tablas)
+            return True
+    
+    def invalidar(self, tablas):
+        """Descartar las entradas de las tablas; devuelve cuántas se quitaron"""
+        quitadas = 0
+        with self._lock:
+            for tabla in tablas:
+                self._versiones[tabla] = self._versiones.get(tabla, 0) + 1
+                for clave in list(self._por_tabla.pop(tabla, ())):
+                    quitadas += self._quitar(clave)
+        return quitadas
+    
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_tabla.clear()
+    
+    def __len__(self):
+        return len(self._entradas)
+    
+    def _guardar(self, clave, valor, vence, tablas):
+        self._quitar(clave)
+        self._entradas[clave] = (vence, valor, tuple(tablas))
+        for tabla in tablas:
+            self._por_tabla.setdefault(tabla, set()).add(clave)
+        
+        while len(self._entradas) > self.max_entradas:
+            self._quitar(next(iter(self._entradas)))
+    
+    def _quitar(self, clave):
+        item = self._entradas.pop(clave, None)
+        if item is None:
+            return 0
+        
+        for tabla in item[2]:
+            claves = self._por_tabla.get(tabla)
+            if claves is not None:
+                claves.discard(clave)
+        return 1
+
+
+class CacheSQLite:
+    """Entradas, versiones y eventos en un archivo SQLite compartido entre procesos"""
+    
+    ESQUEMA = (
+        'CREATE TABLE IF NOT EXISTS cache_entradas (clave TEXT PRIMARY KEY, valor TEXT NOT NULL, vence REAL NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS ix_cache_entradas_vence ON cache_entradas (vence)',
+        'CREATE TABLE IF NOT EXISTS cache_etiquetas (tabla TEXT NOT NULL, clave TEXT NOT NULL, PRIMARY KEY (tabla, clave))',
+        'CREATE TABLE IF NOT EXISTS cache_versiones (tabla TEXT PRIMARY KEY, version INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS cache_eventos (id INTEGER PRIMARY KEY AUTOINCREMENT, tablas TEXT NOT NULL, '
+        'origen TEXT NOT NULL, creado REAL NOT NULL)',
+    )
+    
+    def __init__(self, ruta, intervalo=0.05, timeout=5):
+        self.ruta = ruta
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self._local = threading.local()
+        with self._transaccion() as conexion:
+            for sentencia in self.ESQUEMA:
+                conexion.execute(sentencia)
+        # Solo interesan los eventos posteriores a la creación
+        self._ultimo_evento = self._conexion().execute('SELECT COALESCE(MAX(id), 0) FROM cache_eventos').fetchone()[0]
+    
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        # Conexión por thread y por proceso (no se comparten después de un fork)
+        if conexion is None or self._local.pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+    
+    @contextmanager
+    def _transaccion(self):
+        conexion = self._conexion()
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            yield conexion
+        except BaseException:
+            conexion.execute('ROLLBACK')
+            raise
+        conexion.execute('COMMIT')
+    
+    def obtener(self, clave):
+        fila = self._conexion().execute(
+            'SELECT valor FROM cache_entradas WHERE clave = ? AND vence > ?', (clave, time.time())
+        ).fetchone()
+        return fila[0] if fila else None
+    
+    def versiones(self, tablas):
+        return self._versiones(self._conexion(), tablas)
+    
+    def _versiones(self, conexion, tablas):
+        if not tablas:
+            return ()
+        marcas = ', '.join('?' * len(tablas))
+        actuales = dict(conexion.execute(
+            f'SELECT tabla, version FROM cache_versiones WHERE tabla IN ({marcas})', tuple(tablas)
+        ).fetchall())
+        return tuple(actuales.get(tabla, 0) for tabla in tablas)
+    
+    def guardar_si(self, clave, valor, vence, tablas, versiones):
+        with self._transaccion() as conexion:
+            if self._versiones(conexion, tablas) != tuple(versiones):
+                return False
+            
+            conexion.execute('DELETE FROM cache_entradas WHERE vence <= ?', (time.time(),))
+            conexion.execute(
+                'INSERT OR REPLACE INTO cache_entradas (clave, valor, vence) VALUES (?, ?, ?)', (clave, valor, vence)
+            )
+            conexion.executemany(
+                'INSERT OR IGNORE INTO cache_etiquetas (tabla, clave) VALUES (?, ?)',
+                [(tabla, clave) for tabla in tablas]
+            )
+            return True
+    
+    def invalidar(self, tablas, origen):
+        """Subir la versión de las tablas, borrar sus entradas y registrar el evento"""
+        tablas = sorted(set(tablas))
+        if not tablas:
+            return 0
+        
+        marcas = ', '.join('?' * len(tablas))
+        with self._transaccion() as conexion:
+            conexion.executemany(
+                'INSERT INTO cache_versiones (tabla, version) VALUES (?, 1) '
+                'ON CONFLICT (tabla) DO UPDATE SET version = version + 1',
+                [(tabla,) for tabla in tablas]
+            )
+            quitadas = conexion.execute(
+                f'DELETE FROM cache_entradas WHERE clave IN '
+                f'(SELECT clave FROM cache_etiquetas WHERE tabla IN ({marcas}))', tablas
+            ).rowcount
+            conexion.execute(f'DELETE FROM cache_etiquetas WHERE tabla IN ({marcas})', tablas)
+            
+            ahora = time.time()
+            conexion.execute(
+                'INSERT INTO cache_eventos (tablas, origen, creado) VALUES (?, ?, ?)',
+                (json.dumps(tablas), origen, ahora)
+            )
+            conexion.execute('DELETE FROM cache_eventos WHERE creado < ?', (ahora - RETENCION_EVENTOS,))
+        return quitadas
+    
+    def limpiar(self):
+        with self._transaccion() as conexion:
+            conexion.execute('DELETE FROM cache_entradas')
+            conexion.execute('DELETE FROM cache_etiquetas')
+    
+    def procesar_eventos(self, callback):
+        """Entregar a callback(tablas, origen) los eventos nuevos desde la última lectura"""
+        eventos = self._conexion().execute(
+            'SELECT id, tablas, origen FROM cache_eventos WHERE id > ? ORDER BY id', (self._ultimo_evento,)
+        ).fetchall()
+        for evento_id, tablas, origen in eventos:
+            self._ultimo_evento = evento_id
+            callback(json.loads(tablas), origen)
+    
+    def escuchar(self, callback):
+        """Consultar los eventos cada `intervalo` segundos en un thread del proceso"""
+        def bucle():
+            while True:
+                time.sleep(self.intervalo)
+                try:
+                    self.procesar_eventos(callback)
+                except Exception as e:
+                    logger.warning(f"Error leyendo eventos de la caché: {e}")
+        
+        threading.Thread(target=bucle, name='cache-eventos', daemon=True).start()
+
+
+class CacheRedis:
+    """Entradas, versiones y eventos en Redis (cliente redis-py o compatible)"""
+    
+    def __init__(self, cliente, prefijo='agricola:cache:', watch_error=None):
+        self.cliente = cliente
+        self.prefijo = prefijo
+        self.canal = f'{prefijo}eventos'
+        if watch_error is None:
+            from redis.exceptions import WatchError as watch_error
+        self.watch_error = watch_error
+    
+    @classmethod
+    def desde_url(cls, url, **kwargs):
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+    
+    def _entrada(self, clave):
+        return f'{self.prefijo}e:{clave}'
+    
+    def _etiqueta(self, tabla):
+        return f'{self.prefijo}t:{tabla}'
+    
+    def _version(self, tabla):
+        return f'{self.prefijo}v:{tabla}'
+    
+    def obtener(self, clave):
+        valor = self.cliente.get(self._entrada(clave))
+        return valor.decode() if isinstance(valor, bytes) else valor
+    
+    def versiones(self, tablas):
+        if not tablas:
+            return ()
+        return tuple(int(v or 0) for v in self.cliente.mget([self._version(tabla) for tabla in tablas]))
+    
+    def guardar_si(self, clave, valor, vence, tablas, versiones):
+        ttl_ms = int((vence - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return False
+        
+        claves_version = [self._version(tabla) for tabla in tablas]
+        etiquetas = [self._etiqueta(tabla) for tabla in tablas]
+        extender = []
+        with self.cliente.pipeline() as pipe:
+            try:
+                # WATCH: si otra invalidación sube una versión o cambia una
+                # etiqueta, EXEC no se aplica
+                if tablas:
+                    pipe.watch(*claves_version, *etiquetas)
+                    if tuple(int(v or 0) for v in pipe.mget(claves_version)) != tuple(versiones):
+                        return False
+                    
+                    # La etiqueta debe vivir tanto como su entrada más larga:
+                    # solo se extiende su vencimiento, nunca se acorta
+                    for etiqueta in etiquetas:
+                        restante = pipe.pttl(etiqueta)
+                        # -2: no existe todavía; -1: sin vencimiento (se deja así)
+                        if restante == -2 or 0 <= restante < ttl_ms:
+                            extender.append(etiqueta)
+                
+                pipe.multi()
+                pipe.set(self._entrada(clave), valor, px=ttl_ms)
+                for etiqueta in etiquetas:
+                    pipe.sadd(etiqueta, clave)
+                for etiqueta in extender:
+                    pipe.pexpire(etiqueta, ttl_ms)
+                pipe.execute()
+                return True
+            except self.watch_error:
+                return False
+    
+    def invalidar(self, tablas, origen):
+        tablas = sorted(set(tablas))
+        if not tablas:
+            return 0
+        
+        claves = set()
+        for tabla in tablas:
+            claves.update(
+                clave.decode() if isinstance(clave, bytes) else clave
+                for clave in self.cliente.smembers(self._etiqueta(tabla))
+            )
+        
+        pipe = self.cliente.pipeline()
+        for tabla in tablas:
+            pipe.incr(self._version(tabla))
+        if claves:
+            pipe.delete(*[self._entrada(clave) for clave in claves])
+        pipe.delete(*[self._etiqueta(tabla) for tabla in tablas])
+        pipe.publish(self.canal, json.dumps({'tablas': tablas, 'origen': origen}))
+        pipe.execute()
+        return len(claves)
+    
+    def limpiar(self):
+        claves = list(self.cliente.scan_iter(f'{self.prefijo}[et]:*'))
+        if claves:
+            self.cliente.delete(*claves)
+    
+    def escuchar(self, callback):
+        """Suscribirse al canal de eventos en un thread del proceso"""
+        def bucle():
+            while True:
+                try:
+                    pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+                    pubsub.subscribe(self.canal)
+                    # Los eventos perdidos mientras no había suscripción no se
+                    # recuperan: se descarta todo lo local (tablas=None)
+                    callback(None, None)
+                    for mensaje in pubsub.listen():
+                        if mensaje.get('type') != 'message':
+                            continue
+                        evento = json.loads(mensaje['data'])
+                        callback(evento['tablas'], evento['origen'])
+                except Exception as e:
+                    logger.warning(f"Suscripción a eventos de la caché interrumpida: {e}")
+                    time.sleep(1)
+        
+        threading.Thread(target=bucle, name='cache-eventos', daemon=True).start()
@@ -0,0 +1,348 @@
+"""
+Caché de respuestas HTTP para catálogos y estadísticas
+
+@cache_respuesta(ttl, tablas) guarda el cuerpo ya serializado de las
+respuestas 200 de un GET, con clave por ruta y parámetros de la query.
+Cada entrada lleva un ETag fuerte (hash del cuerpo) y Last-Modified, de
+modo que un cliente que repite el pedido con If-None-Match recibe 304
+sin consultar la base ni serializar JSON.
+
+Las entradas se descartan al vencer el TTL o cuando se escribe en alguna
+de sus tablas: los eventos de la sesión registran las tablas modificadas
+en cada flush (objetos y sentencias INSERT/UPDATE/DELETE) y las invalidan
+al hacer flush y de nuevo al confirmar, igual que los resúmenes de Stock.
+Una respuesta calculada mientras cambiaba alguna de sus tablas no se
+guarda (versión por tabla).
+
+Con varios workers de gunicorn, CACHE_BACKEND=sqlite (un archivo por
+máquina) o redis agrega un almacén compartido detrás del LRU local: las
+entradas calculadas por un worker las sirven los demás y cada invalidación
+se publica para que todos descarten sus copias locales.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+from itertools import chain
+from urllib.parse import urlencode
+
+from flask import Response, current_app, has_app_context, make_response, request
+from sqlalchemy import event
+
+from extensions import db
+from utils.cache_backends import CacheLocal, CacheSQLite, CacheRedis
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRADAS = 512
+
+Entrada = namedtuple('Entrada', 'vence etag modificado cuerpo mimetype tablas')
+
+# Funciones llamadas con las tablas invalidadas por otro worker (tablas=None: todas)
+_suscriptores = []
+
+
+def al_invalidar_remoto(callback):
+    """Registrar un callback(tablas) para invalidaciones publicadas por otros workers"""
+    _suscriptores.append(callback)
+    return callback
+
+
+def _codificar(entrada):
+    return json.dumps({
+        'vence': entrada.vence,
+        'etag': entrada.etag,
+        'modificado': entrada.modificado.isoformat(),
+        'cuerpo': base64.b64encode(entrada.cuerpo).decode('ascii'),
+        'mimetype': entrada.mimetype,
+        'tablas': list(entrada.tablas)
+    })
+
+
+def _decodificar(texto):
+    datos = json.loads(texto)
+    return Entrada(
+        vence=datos['vence'],
+        etag=datos['etag'],
+        modificado=datetime.fromisoformat(datos['modificado']),
+        cuerpo=base64.b64decode(datos['cuerpo']),
+        mimetype=datos['mimetype'],
+        tablas=tuple(datos['tablas'])
+    )
+
+
+class CacheRespuestas:
+    """
+    Caché en dos niveles: LRU local del proceso y, opcionalmente, un
+    almacén compartido por todos los workers (ver utils/cache_backends.py)
+    
+    Con almacén compartido, las versiones de las tablas viven en él y cada
+    invalidación se publica: los demás workers descartan sus copias locales
+    al recibir el evento.
+    
+    Un error del almacén compartido (archivo bloqueado, Redis caído) nunca
+    se propaga: se registra, la invalidación se hace solo en local (el resto
+    de los workers queda cubierto por el TTL) y la respuesta no se cachea.
+    """
+    
+    def __init__(self, local, compartido=None):
+        self.local = local
+        self.compartido = compartido
+        self.origen = uuid.uuid4().hex
+        self._pid_escucha = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_compartidos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+        self.eventos_recibidos = 0
+        self.errores_compartido = 0
+    
+    def _error_compartido(self, operacion, error):
+        self._contar('errores_compartido')
+        logger.warning(f"Caché compartida no disponible ({operacion}): {error}")
+    
+    def obtener(self, clave):
+        self._escuchar()
+        entrada = self.local.obtener(clave)
+        if entrada is None and self.compartido is not None:
+            try:
+                texto = self.compartido.obtener(clave)
+            except Exception as e:
+                self._error_compartido('obtener', e)
+                texto = None
+            if texto is not None:
+                entrada = _decodificar(texto)
+                self.local.guardar(clave, entrada, entrada.vence, entrada.tablas)
+                self._contar('aciertos_compartidos')
+        
+        self._contar('fallos' if entrada is None else 'aciertos')
+        return entrada
+    
+    def versiones(self, tablas):
+        """Versiones actuales de las tablas (None si el almacén compartido falla)"""
+        if self.compartido is None:
+            return self.local.versiones(tablas)
+        try:
+            return self.compartido.versiones(tablas)
+        except Exception as e:
+            self._error_compartido('versiones', e)
+            return None
+    
+    def guardar(self, clave, entrada, versiones):
+        """Guardar salvo que alguna tabla haya cambiado desde `versiones`"""
+        if versiones is None:
+            return False
+        if self.compartido is None:
+            return self.local.guardar_si(clave, entrada, entrada.vence, entrada.tablas, versiones)
+        
+        try:
+            guardada = self.compartido.guardar_si(clave, _codificar(entrada), entrada.vence, entrada.tablas, versiones)
+        except Exception as e:
+            self._error_compartido('guardar', e)
+            return False
+        if not guardada:
+            return False
+        self.local.guardar(clave, entrada, entrada.vence, entrada.tablas)
+        return True
+    
+    def invalidar(self, tablas):
+        tablas = set(tablas)
+        quitadas = self.local.invalidar(tablas)
+        if self.compartido is not None:
+            try:
+                quitadas += self.compartido.invalidar(tablas, self.origen)
+            except Exception as e:
+                # Se llama desde eventos de la sesión: un error acá abortaría la escritura
+                self._error_compartido('invalidar', e)
+        self._contar('invalidaciones', quitadas)
+    
+    def recibir_evento(self, tablas, origen):
+        """Invalidación publicada en el almacén compartido"""
+        if origen == self.origen:
+            return
+        
+        self._contar('eventos_recibidos')
+        if tablas is None:
+            self.local.limpiar()
+        else:
+            self.local.invalidar(tablas)
+        
+        for callback in _suscriptores:
+            try:
+                callback(tablas)
+            except Exception as e:
+                logger.warning(f"Error en suscriptor de invalidaciones: {e}")
+    
+    def limpiar(self):
+        self.local.limpiar()
+        if self.compartido is not None:
+            self.compartido.limpiar()
+    
+    def estado(self):
+        with self._lock:
+            return {
+                'almacen': type(self.compartido).__name__ if self.compartido is not None else 'local',
+                'entradas_locales': len(self.local),
+                'aciertos': self.aciertos,
+                'aciertos_compartidos': self.aciertos_compartidos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'eventos_recibidos': self.eventos_recibidos,
+                'errores_compartido': self.errores_compartido
+            }
+    
+    def _contar(self, contador, cantidad=1):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + cantidad)
+    
+    def _escuchar(self):
+        # Se inicia en el proceso que atiende requests (después del fork de gunicorn)
+        if self.compartido is None or self._pid_escucha == os.getpid():
+            return
+        with self._lock:
+            if self._pid_escucha == os.getpid():
+                return
+            self._pid_escucha = os.getpid()
+        self.compartido.escuchar(self.recibir_evento)
+
+
+def cache_actual():
+    """Caché de la aplicación actual (None si está desactivada)"""
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('cache_respuestas')
+
+
+def _clave(req):
+    parametros = sorted(req.args.items(multi=True))
+    return f"{req.path}?{urlencode(parametros)}" if parametros else req.path
+
+
+def _responder(entrada, estado):
+    respuesta = Response(entrada.cuerpo, status=200, mimetype=entrada.mimetype)
+    respuesta.set_etag(entrada.etag)
+    respuesta.last_modified = entrada.modificado
+    # El navegador revalida cada vez; si no cambió recibe un 304 sin cuerpo
+    respuesta.cache_control.no_cache = True
+    respuesta.headers['X-Cache'] = estado
+    return respuesta.make_conditional(request)
+
+
+def cache_respuesta(ttl, tablas=()):
+    """
+    Cachear la respuesta de un GET durante `ttl` segundos
+    
+    `tablas` son las tablas que lee el endpoint: cualquier escritura en
+    ellas descarta las respuestas guardadas. Solo se guardan respuestas 200.
+    """
+    tablas = tuple(tablas)
+    
+    def decorator(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            cache = cache_actual()
+            if cache is None or request.method != 'GET':
+                return vista(*args, **kwargs)
+            
+            clave = _clave(request)
+            entrada = cache.obtener(clave)
+            if entrada is not None:
+                return _responder(entrada, 'HIT')
+            
+            versiones = cache.versiones(tablas)
+            respuesta = make_response(vista(*args, **kwargs))
+            if respuesta.status_code != 200 or respuesta.is_streamed:
+                return respuesta
+            
+            cuerpo = respuesta.get_data()
+            entrada = Entrada(
+                vence=time.time() + ttl,
+                etag=hashlib.sha256(cuerpo).hexdigest()[:32],
+                modificado=datetime.now(timezone.utc).replace(microsecond=0),
+                cuerpo=cuerpo,
+                mimetype=respuesta.mimetype,
+                tablas=tablas
+            )
+            cache.guardar(clave, entrada, versiones)
+            return _responder(entrada, 'MISS')
+        
+        return envoltura
+    return decorator
+
+
+def _tablas_de_objetos(session):
+    return {
+        obj.__table__.name
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if hasattr(obj, '__table__')
+    }
+
+
+def _registrar(session, tablas):
+    if not tablas:
+        return
+    session.info.setdefault('tablas_modificadas', set()).update(tablas)
+    cache = cache_actual()
+    if cache is not None:
+        cache.invalidar(tablas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _invalidar_al_escribir(session, flush_context):
+    """Descartar las respuestas que leen las tablas escritas en el flush"""
+    _registrar(session, _tablas_de_objetos(session))
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _invalidar_sentencias(orm_execute_state):
+    """INSERT/UPDATE/DELETE ejecutados con session.execute()"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        tabla = getattr(orm_execute_state.statement, 'table', None)
+        if tabla is not None and getattr(tabla, 'name', None):
+            _registrar(orm_execute_state.session, {tabla.name})
+
+
+@event.listens_for(db.session, 'after_commit')
+@event.listens_for(db.session, 'after_rollback')
+def _invalidar_al_terminar(session):
+    """Volver a invalidar al confirmar: otra request pudo guardar la versión previa"""
+    tablas = session.info.pop('tablas_modificadas', None)
+    cache = cache_actual()
+    if tablas and cache is not None:
+        cache.invalidar(tablas)
+
+
+def _almacen_compartido(app):
+    tipo = app.config.get('CACHE_BACKEND', 'local')
+    if tipo == 'sqlite':
+        return CacheSQLite(
+            app.config['CACHE_SQLITE_PATH'],
+            intervalo=app.config.get('CACHE_EVENTOS_INTERVALO_MS', 50) / 1000
+        )
+    if tipo == 'redis':
+        try:
+            return CacheRedis.desde_url(app.config['CACHE_REDIS_URL'])
+        except ImportError:
+            app.logger.warning("CACHE_BACKEND=redis requiere el paquete redis; se usa solo la caché local")
+            return None
+    return None
+
+
+def init_cache_respuestas(app):
+    """Crear la caché de la aplicación si RESPONSE_CACHE_ENABLED (almacén según CACHE_BACKEND)"""
+    if not app.config.get('RESPONSE_CACHE_ENABLED', True):
+        return
+    
+    local = CacheLocal(
+        app.config.get('RESPONSE_CACHE_MAX_ENTRIES', MAX_ENTRADAS),
+        ttl_max=app.config.get('RESPONSE_CACHE_LOCAL_TTL')
+    )
+    app.extensions['cache_respuestas'] = CacheRespuestas(local, _almacen_compartido(app))
@@ -0,0 +1,154 @@
+"""
+Opciones del engine de SQLAlchemy y métricas del pool de conexiones
+
+- PostgreSQL: pool dimensionado según los threads de cada worker de
+  gunicorn (cada worker tiene su propio pool), pre-ping, reciclado y
+  statement_timeout por conexión.
+- SQLite en archivo: modo WAL (lecturas concurrentes con una escritura),
+  synchronous=NORMAL, busy_timeout y caché de páginas más grande.
+- SQLite en memoria (pruebas): sin cambios.
+
+El pool (MeteredQueuePool) registra cuánto se espera para obtener una
+conexión; /health/pool lo expone junto con el estado actual.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool que mide la espera al entregar conexiones"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metricas_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except PoolTimeoutError:
+            with self._metricas_lock:
+                self.timeouts += 1
+            raise
+        
+        espera = time.perf_counter() - inicio
+        with self._metricas_lock:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+        return conexion
+    
+    def metricas(self):
+        with self._metricas_lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'espera_promedio_ms': round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0,
+                'espera_max_ms': round(self.espera_max * 1000, 3)
+            }
+
+
+def _entero(config, clave, defecto):
+    valor = config.get(clave)
+    return int(valor) if valor not in (None, '') else defecto
+
+
+def threads_por_worker():
+    """Requests simultáneos por proceso (mismo valor que usa gunicorn.conf.py)"""
+    return max(1, int(os.environ.get('GUNICORN_THREADS', 1)))
+
+
+def opciones_engine(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS según el motor de SQLALCHEMY_DATABASE_URI
+    
+    Las claves DB_* de la configuración ajustan cada valor; lo que ya esté
+    en SQLALCHEMY_ENGINE_OPTIONS tiene prioridad.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    backend = url.get_backend_name()
+    opciones = {}
+    
+    if backend == 'postgresql':
+        # Un thread por request más margen para tareas del mismo proceso
+        pool_size = _entero(config, 'DB_POOL_SIZE', threads_por_worker() + 2)
+        opciones = {
+            'poolclass': MeteredQueuePool,
+            'pool_size': pool_size,
+            'max_overflow': _entero(config, 'DB_MAX_OVERFLOW', pool_size),
+            'pool_timeout': _entero(config, 'DB_POOL_TIMEOUT', 30),
+            'pool_recycle': _entero(config, 'DB_POOL_RECYCLE', 1800),
+            'pool_pre_ping': True,
+        }
+        statement_timeout = _entero(config, 'DB_STATEMENT_TIMEOUT_MS', 30000)
+        if statement_timeout:
+            opciones['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    
+    elif backend == 'sqlite' and url.database not in (None, '', ':memory:'):
+        pool_size = _entero(config, 'DB_POOL_SIZE', threads_por_worker() + 2)
+        opciones = {
+            'poolclass': MeteredQueuePool,
+            'pool_size': pool_size,
+            'max_overflow': _entero(config, 'DB_MAX_OVERFLOW', pool_size),
+            'pool_timeout': _entero(config, 'DB_POOL_TIMEOUT', 30),
+            # El módulo sqlite3 espera el lock con este timeout (segundos)
+            'connect_args': {
+                'timeout': _entero(config, 'SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+                'check_same_thread': False,
+            },
+        }
+    
+    opciones.update(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    return opciones
+
+
+def _pragmas_sqlite(config):
+    return [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={_entero(config, 'SQLITE_BUSY_TIMEOUT_MS', 5000)}",
+        # Valor negativo: tamaño en KiB (64 MB)
+        f"PRAGMA cache_size=-{_entero(config, 'SQLITE_CACHE_KB', 64000)}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def configurar_engine(app, engine):
+    """Aplicar los PRAGMA de SQLite en cada conexión nueva del engine"""
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    
+    pragmas = _pragmas_sqlite(app.config)
+    
+    @event.listens_for(engine, 'connect')
+    def aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def estado_pool(engine):
+    """Estado actual del pool y métricas de espera (sin consultar la base)"""
+    pool = engine.pool
+    estado = {'clase': type(pool).__name__}
+    for nombre, metodo in (('tamano', 'size'), ('disponibles', 'checkedin'),
+                           ('en_uso', 'checkedout'), ('overflow', 'overflow')):
+        funcion = getattr(pool, metodo, None)
+        if callable(funcion):
+            estado[nombre] = funcion()
+    if isinstance(pool, MeteredQueuePool):
+        estado.update(pool.metricas())
+    return estado
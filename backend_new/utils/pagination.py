@@ -1,7 +1,14 @@
 """
 Utilidades para paginación
 """
-from flask import request, url_for
+import base64
+import binascii
+import json
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask import request, url_for, jsonify
+from sqlalchemy import tuple_
 
 def paginate_query(query, page=None, per_page=None, error_out=False):
     """
@@ -90,3 +97,169 @@ def create_pagination_response(items, pagination, endpoint=None, **kwargs):
         'data': items,
         'pagination': get_pagination_info(pagination, endpoint, **kwargs)
     }
+
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginación mal formado o incompatible con el orden pedido"""
+
+
+class KeysetPage:
+    """Página obtenida por paginación keyset (cursor)"""
+    
+    def __init__(self, items, per_page, next_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.total = total
+    
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def wants_cursor_pagination():
+    """Indica si la request pidió paginación por cursor (?cursor=, vacío para la primera página)"""
+    return 'cursor' in request.args
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _decode_value(column, value):
+    """Reconstruir el valor del cursor con el tipo Python de la columna"""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(sort_by, sort_order, sort_value, last_id):
+    """Codificar la posición de la última fila como un cursor opaco"""
+    payload = {'s': sort_by, 'o': sort_order, 'v': _encode_value(sort_value), 'id': last_id}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decodificar un cursor opaco"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        return payload['s'], payload['o'], payload['v'], payload['id']
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError('Cursor de paginación inválido')
+
+
+def keyset_paginate(query, model, sort_by, sort_order='asc', cursor=None, per_page=20,
+                    include_total=False, default_sort=None):
+    """
+    Paginar query por keyset usando (columna de orden, id) como clave
+    
+    A diferencia de paginate(), no usa OFFSET ni COUNT(*): cada página
+    filtra a partir de la última fila devuelta, por lo que el costo no
+    depende de la profundidad.
+    
+    Args:
+        query: Query de SQLAlchemy (se descarta su ORDER BY)
+        model: Modelo consultado
+        sort_by: Nombre de la columna de orden
+        sort_order: 'asc' o 'desc'
+        cursor: Cursor devuelto por la página anterior (None o '' para la primera)
+        per_page: Items por página
+        include_total: Si debe ejecutar además el COUNT(*) total
+        default_sort: Columna a usar si sort_by no es una columna válida
+    
+    Returns:
+        KeysetPage
+    """
+    columns = model.__table__.columns
+    if sort_by not in columns:
+        sort_by = default_sort or 'id'
+    column = getattr(model, sort_by)
+    if columns[sort_by].nullable and sort_by != 'id':
+        raise InvalidCursorError(f"No se puede paginar por cursor ordenando por '{sort_by}'")
+    sort_order = 'desc' if sort_order == 'desc' else 'asc'
+    
+    query = query.order_by(None)
+    total = query.count() if include_total else None
+    
+    if cursor:
+        cursor_sort, cursor_order, cursor_value, last_id = decode_cursor(cursor)
+        if (cursor_sort, cursor_order) != (sort_by, sort_order):
+            raise InvalidCursorError('El cursor no corresponde al orden solicitado')
+        try:
+            value = _decode_value(columns[sort_by], cursor_value)
+        except (TypeError, ValueError, ArithmeticError):
+            raise InvalidCursorError('Cursor de paginación inválido')
+        
+        # Comparación de fila (columna, id): el motor la resuelve como un rango del índice
+        clave = tuple_(column, model.id)
+        if sort_order == 'desc':
+            query = query.filter(clave < tuple_(value, last_id))
+        else:
+            query = query.filter(clave > tuple_(value, last_id))
+    
+    if sort_order == 'desc':
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+    
+    # Pedir una fila extra para saber si hay página siguiente
+    items = query.limit(per_page + 1).all()
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        last = items[-1]
+        next_cursor = encode_cursor(sort_by, sort_order, getattr(last, sort_by), last.id)
+    
+    return KeysetPage(items, per_page, next_cursor, total)
+
+
+def keyset_response(query, model, sort_by, sort_order, per_page, fields=None, default_sort=None):
+    """
+    Respuesta JSON de una página por cursor para los listados
+    
+    Lee ?cursor= y ?include_total= de la request y serializa cada fila con
+    to_dict(fields). Lanza InvalidCursorError si el cursor no es válido.
+    """
+    keyset = keyset_paginate(
+        query, model, sort_by, sort_order,
+        cursor=request.args.get('cursor'),
+        per_page=per_page,
+        include_total=request.args.get('include_total', 'false').lower() == 'true',
+        default_sort=default_sort
+    )
+    return jsonify({
+        'success': True,
+        'data': [item.to_dict(fields) for item in keyset.items],
+        'pagination': get_keyset_info(keyset)
+    })
+
+
+def get_keyset_info(page):
+    """
+    Obtener información de paginación por cursor para respuesta JSON
+    
+    Args:
+        page: KeysetPage
+    
+    Returns:
+        dict: Información de paginación
+    """
+    info = {
+        'per_page': page.per_page,
+        'has_next': page.has_next,
+        'next_cursor': page.next_cursor
+    }
+    if page.total is not None:
+        info['total'] = page.total
+    return info
@@ -0,0 +1,234 @@
+"""
+Búsqueda de texto indexada para los métodos buscar() de los modelos
+
+- PostgreSQL: índice GIN sobre el tsvector de los campos buscables,
+  coincidencia por prefijo (to_tsquery 'term:*') y orden por ts_rank.
+- SQLite: tabla virtual FTS5 de contenido externo sincronizada con
+  triggers en altas, modificaciones y bajas; prefijos ("term"*) y orden
+  por bm25.
+- Otros motores, o bases donde el índice todavía no fue creado: ILIKE
+  sobre cada campo, como antes.
+"""
+import re
+import weakref
+
+from sqlalchemy import event, literal_column, text, Float, Integer
+
+from extensions import db
+
+# Configuración de búsqueda por modelo: {clase: {campo: peso}}
+MODELOS_BUSCABLES = {}
+
+# Existencia del índice por engine y tabla (se actualiza al crear/borrar tablas)
+_indices_disponibles = weakref.WeakKeyDictionary()
+
+# Configuración de texto de PostgreSQL: sin stemming ni stopwords, los
+# números de parte y marcas se indexan tal cual
+TS_CONFIG = 'simple'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenizar(termino):
+    """Palabras del término de búsqueda en minúsculas (sin operadores ni signos)"""
+    return [token.lower() for token in _TOKEN.findall(termino or '')]
+
+
+def _nombre_fts(tabla):
+    return f'{tabla}_fts'
+
+
+def _nombre_indice(tabla):
+    return f'ix_{tabla}_busqueda'
+
+
+def _documento_pg(tabla, campos, calificar=True):
+    """Expresión tsvector de PostgreSQL; debe coincidir textualmente con la del índice"""
+    prefijo = f'{tabla}.' if calificar else ''
+    concatenado = " || ' ' || ".join(f"coalesce({prefijo}{campo}, '')" for campo in campos)
+    return f"to_tsvector('{TS_CONFIG}', {concatenado})"
+
+
+def _ddl_sqlite(tabla, campos):
+    fts = _nombre_fts(tabla)
+    columnas = ', '.join(campos)
+    nuevos = ', '.join(f'new.{campo}' for campo in campos)
+    viejos = ', '.join(f'old.{campo}' for campo in campos)
+    borrar = f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos});"
+    insertar = f"INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{columnas}, content='{tabla}', content_rowid='id')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {tabla} BEGIN {insertar} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {tabla} BEGIN {borrar} END",
+        # Solo cambios en los campos indexados (no en stock_actual, updated_at, ...)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columnas} ON {tabla} "
+        f"BEGIN {borrar} {insertar} END",
+    ]
+
+
+def _ddl_postgresql(tabla, campos):
+    return [
+        f"CREATE INDEX IF NOT EXISTS {_nombre_indice(tabla)} ON {tabla} "
+        f"USING gin ({_documento_pg(tabla, campos, calificar=False)})"
+    ]
+
+
+DDL_POR_DIALECTO = {
+    'postgresql': _ddl_postgresql,
+    'sqlite': _ddl_sqlite,
+}
+
+
+def _marcar(engine, tabla, disponible):
+    _indices_disponibles.setdefault(engine, {})[tabla] = disponible
+
+
+def crear_indice(model, connection):
+    """
+    Crear el índice de texto del modelo si el motor lo soporta
+    
+    Args:
+        model: Clase registrada con registrar_busqueda
+        connection: Conexión donde ejecutar el DDL
+    
+    Returns:
+        bool: True si el índice quedó disponible
+    """
+    ddl = DDL_POR_DIALECTO.get(connection.dialect.name)
+    tabla = model.__tablename__
+    if ddl is None:
+        return False
+    
+    try:
+        # SAVEPOINT: si el motor no tiene FTS5/GIN no se aborta el create_all
+        with connection.begin_nested():
+            for sentencia in ddl(tabla, list(MODELOS_BUSCABLES[model])):
+                connection.execute(text(sentencia))
+    except Exception:
+        _marcar(connection.engine, tabla, False)
+        return False
+    
+    _marcar(connection.engine, tabla, True)
+    return True
+
+
+def reconstruir_indice(model, connection):
+    """Recargar el contenido del índice desde la tabla (filas previas a su creación)"""
+    if connection.dialect.name == 'sqlite':
+        fts = _nombre_fts(model.__tablename__)
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    # En PostgreSQL el índice GIN sobre la expresión ya cubre las filas existentes
+
+
+def _borrar_indice(model, connection):
+    if connection.dialect.name == 'sqlite':
+        # Los triggers se borran junto con la tabla de contenido
+        connection.execute(text(f'DROP TABLE IF EXISTS {_nombre_fts(model.__tablename__)}'))
+    _marcar(connection.engine, model.__tablename__, False)
+
+
+def registrar_busqueda(model, campos):
+    """
+    Declarar los campos buscables de un modelo y crear su índice con la tabla
+    
+    Args:
+        model: Clase del modelo
+        campos: {campo: peso} en orden; el peso pondera el ranking en SQLite
+    """
+    MODELOS_BUSCABLES[model] = dict(campos)
+    tabla = model.__table__
+    event.listen(tabla, 'after_create', lambda target, connection, **kw: crear_indice(model, connection))
+    event.listen(tabla, 'before_drop', lambda target, connection, **kw: _borrar_indice(model, connection))
+
+
+def instalar_indices():
+    """
+    Crear y poblar los índices de todos los modelos buscables (bases existentes)
+    
+    Returns:
+        list: Tablas cuyo índice quedó disponible
+    """
+    connection = db.session.connection()
+    instaladas = []
+    for model in MODELOS_BUSCABLES:
+        if crear_indice(model, connection):
+            reconstruir_indice(model, connection)
+            instaladas.append(model.__tablename__)
+    return instaladas
+
+
+def indice_disponible(model):
+    """Si la base actual tiene el índice de texto del modelo"""
+    engine = db.session.get_bind()
+    tabla = model.__tablename__
+    cache = _indices_disponibles.setdefault(engine, {})
+    if tabla not in cache:
+        dialect = engine.dialect.name
+        if dialect == 'sqlite':
+            existe = db.session.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+                {'nombre': _nombre_fts(tabla)}
+            ).first()
+        elif dialect == 'postgresql':
+            existe = db.session.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :nombre"),
+                {'nombre': _nombre_indice(tabla)}
+            ).first()
+        else:
+            existe = None
+        cache[tabla] = existe is not None
+    return cache[tabla]
+
+
+def _buscar_ilike(model, query, termino):
+    patron = f'%{termino}%'
+    return query.filter(db.or_(*[getattr(model, campo).ilike(patron) for campo in MODELOS_BUSCABLES[model]]))
+
+
+def buscar_texto(model, termino, query=None):
+    """
+    Filtrar una query por término de búsqueda, ordenada por relevancia
+    
+    Cada palabra del término se busca como prefijo ("fil" encuentra
+    "filtro", "FA-12" encuentra "FA-1234"); todas deben aparecer en
+    alguno de los campos.
+    
+    Args:
+        model: Clase registrada con registrar_busqueda
+        termino: Texto ingresado por el usuario
+        query: Query base (default: model.query)
+    
+    Returns:
+        Query filtrada; con índice disponible, ordenada por relevancia
+    """
+    if query is None:
+        query = model.query
+    
+    tokens = tokenizar(termino)
+    if not tokens or not indice_disponible(model):
+        return _buscar_ilike(model, query, termino)
+    
+    campos = MODELOS_BUSCABLES[model]
+    tabla = model.__tablename__
+    
+    if db.session.get_bind().dialect.name == 'postgresql':
+        documento = literal_column(_documento_pg(tabla, campos))
+        consulta = db.func.to_tsquery(
+            literal_column(f"'{TS_CONFIG}'"),
+            ' & '.join(f'{token}:*' for token in tokens)
+        )
+        return query.filter(documento.op('@@')(consulta)).order_by(
+            db.func.ts_rank(documento, consulta).desc()
+        )
+    
+    # SQLite FTS5: bm25 devuelve valores menores para los resultados más relevantes
+    fts = _nombre_fts(tabla)
+    pesos = ', '.join(str(float(peso)) for peso in campos.values())
+    coincidencias = text(
+        f'SELECT rowid AS id, bm25({fts}, {pesos}) AS rango FROM {fts} WHERE {fts} MATCH :consulta'
+    ).bindparams(
+        consulta=' '.join(f'"{token}"*' for token in tokens)
+    ).columns(id=Integer, rango=Float).subquery()
+    
+    return query.join(coincidencias, coincidencias.c.id == model.id).order_by(coincidencias.c.rango)
@@ -0,0 +1,104 @@
+"""
+Agrupación de fechas en períodos (día, semana, mes) para estadísticas
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, literal_column, Date, cast
+
+GRANULARIDADES = ('dia', 'semana', 'mes')
+
+
+def hoy_utc():
+    """Día actual en UTC: el día de las estadísticas (las fechas se guardan en UTC)"""
+    return datetime.utcnow().date()
+
+
+def bucket_expression(column, granularidad, dialect):
+    """
+    Expresión SQL que trunca una columna de fecha al inicio de su período
+    
+    Args:
+        column: Columna DateTime/Date
+        granularidad: 'dia', 'semana' (lunes) o 'mes'
+        dialect: Nombre del dialecto ('postgresql', 'sqlite', ...)
+    
+    Returns:
+        Expresión SQLAlchemy agrupable
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"Granularidad debe ser una de: {', '.join(GRANULARIDADES)}")
+    
+    if dialect == 'postgresql':
+        unidad = {'dia': 'day', 'semana': 'week', 'mes': 'month'}[granularidad]
+        # Unidad como literal SQL: la misma expresión se repite en GROUP BY
+        # y PostgreSQL no la reconoce si cada aparición es un parámetro distinto
+        return cast(func.date_trunc(literal_column(f"'{unidad}'"), column), Date)
+    
+    # SQLite (y fallback genérico con funciones de fecha de SQLite)
+    if granularidad == 'dia':
+        return func.date(column)
+    if granularidad == 'semana':
+        return func.date(column, '-6 days', 'weekday 1')
+    return func.strftime('%Y-%m-01', column)
+
+
+def bucket_start(valor, granularidad):
+    """Inicio del período que contiene la fecha dada"""
+    if isinstance(valor, datetime):
+        valor = valor.date()
+    if granularidad == 'semana':
+        return valor - timedelta(days=valor.weekday())
+    if granularidad == 'mes':
+        return valor.replace(day=1)
+    return valor
+
+
+def to_date(valor):
+    """Normalizar el valor devuelto por la base (date o texto ISO) a date"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def iter_buckets(desde, hasta, granularidad):
+    """Inicios de todos los períodos entre desde y hasta (inclusive)"""
+    actual = bucket_start(desde, granularidad)
+    hasta = bucket_start(hasta, granularidad)
+    while actual <= hasta:
+        yield actual
+        if granularidad == 'dia':
+            actual += timedelta(days=1)
+        elif granularidad == 'semana':
+            actual += timedelta(days=7)
+        elif actual.month == 12:
+            actual = actual.replace(year=actual.year + 1, month=1)
+        else:
+            actual = actual.replace(month=actual.month + 1)
+
+
+def rellenar_periodos(totales, desde, hasta, granularidad, medidas):
+    """
+    Completar una serie agrupada con los períodos sin datos
+    
+    Args:
+        totales: Filas (inicio_periodo, medida1, medida2, ...) devueltas por la base
+        desde: Fecha inicial (inclusive)
+        hasta: Fecha final (inclusive)
+        granularidad: 'dia', 'semana' o 'mes'
+        medidas: Nombres de las medidas en el orden de las filas
+    
+    Returns:
+        list: [{'fecha', medida1, ...}] en orden ascendente, con ceros donde no hay filas
+    """
+    por_periodo = {to_date(fila[0]): fila[1:] for fila in totales}
+    vacio = (0,) * len(medidas)
+    
+    return [
+        dict(
+            {'fecha': inicio.isoformat()},
+            **{medida: int(valor or 0) for medida, valor in zip(medidas, por_periodo.get(inicio, vacio))}
+        )
+        for inicio in iter_buckets(desde, hasta, granularidad)
+    ]
@@ -0,0 +1,42 @@
+"""
+Formato único de los DateTime guardados en SQLite
+
+SQLite guarda los DateTime como texto. Los modelos los completan desde
+Python (datetime.utcnow), que SQLAlchemy escribe con microsegundos
+('2024-01-01 10:00:00.000000'); las filas creadas antes con el default del
+servidor (CURRENT_TIMESTAMP) quedaron sin fracción ('2024-01-01 10:00:00').
+Como texto esos dos formatos no se ordenan bien entre sí, y la paginación
+por cursor compara y ordena por la columna tal cual para usar sus índices.
+"""
+from sqlalchemy import DateTime, text
+
+from extensions import db
+
+# Largo de 'YYYY-MM-DD HH:MM:SS' (formato de CURRENT_TIMESTAMP)
+LARGO_SIN_FRACCION = 19
+
+
+def normalizar_timestamps():
+    """
+    Reescribir con microsegundos los DateTime guardados sin fracción
+    
+    Solo actúa sobre SQLite (PostgreSQL guarda timestamps nativos). No
+    confirma la transacción.
+    
+    Returns:
+        int: Cantidad de valores reescritos
+    """
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return 0
+    
+    total = 0
+    for tabla in db.metadata.sorted_tables:
+        for columna in tabla.columns:
+            if not isinstance(columna.type, DateTime):
+                continue
+            resultado = db.session.execute(text(
+                f'UPDATE "{tabla.name}" SET "{columna.name}" = "{columna.name}" || \'.000000\' '
+                f'WHERE length("{columna.name}") = {LARGO_SIN_FRACCION}'
+            ))
+            total += resultado.rowcount
+    return total
@@ -68,40 +68,18 @@ def create_app():
         else:
             print(f"⚠️ Error registrando manejadores de errores: {e}")
     
-    # REGISTRAR MIDDLEWARE PARA MANEJAR TRANSACCIONES
-    @app.before_request
-    def check_database_state():
-        """Verificar el estado de la base de datos antes de cada request"""
-        from .utils.db import check_transaction_state, reset_transaction
-        
-        # Solo verificar en endpoints API, no en archivos estáticos
-        if request.path.startswith('/api/'):
-            try:
-                if not check_transaction_state():
-                    reset_transaction()
-            except Exception as e:
-                print(f"⚠️ Error verificando estado de transacción: {e}")
-                reset_transaction()
+    # SALUD DE CONEXIONES: solo se descartan las sesiones que fallaron
+    from .utils.db_health import init_db_health
+    init_db_health(app)
+    
+    # PERFIL DE CONSULTAS: Server-Timing, log de consultas lentas y N+1
+    from .utils.query_profiler import init_query_profiler
+    init_query_profiler(app)
+    
+    # LÍMITE DE UPLOAD: MAX_IMPORT_FILE_SIZE solo en las rutas de importación
+    from .utils.upload_limits import init_upload_limits
+    init_upload_limits(app)
     
-    @app.after_request
-    def cleanup_database_session(response):
-        """Limpiar sesión de base de datos después de cada request"""
-        from .utils.db import db
-        
-        try:
-            # Solo hacer commit si la respuesta es exitosa
-            if response.status_code < 400:
-                db.session.commit()
-            else:
-                db.session.rollback()
-        except Exception as e:
-            print(f"⚠️ Error en cleanup de sesión: {e}")
-            db.session.rollback()
-        finally:
-            db.session.remove()
-        
-        return response
-
     # CORREGIR IMPORTACIONES DE COMANDOS Y RUTAS
     try:
         from .commands import init_app as init_commands
@@ -128,6 +106,16 @@ def create_app():
         else:
             print("⚠️ No se encontraron rutas API")
     
+    # TAREAS EN SEGUNDO PLANO
+    try:
+        from .services.job_service import init_jobs
+        init_jobs(app)
+    except Exception as e:
+        if hasattr(app, 'logger'):
+            app.logger.warning(f"Tareas en segundo plano no disponibles: {e}")
+        else:
+            print(f"⚠️ Tareas en segundo plano no disponibles: {e}")
+    
     # Configuración híbrida de base de datos
     with app.app_context():
         setup_hybrid_database(app)
@@ -148,16 +136,26 @@ def create_app():
     # ENDPOINT DE HEALTH CHECK
     @app.route('/health')
     def health_check():
-        """Endpoint de health check con información del sistema"""
+        """Endpoint de health check con información del sistema (?deep=true consulta la base)"""
+        from .utils.db_health import health, pool_status, check_connection
+        
+        database = {'pool': pool_status(), 'errors': health.to_dict()}
+        status = 'healthy'
+        if request.args.get('deep', '').lower() == 'true':
+            database['connection'] = check_connection()
+            if not database['connection']['ok']:
+                status = 'unhealthy'
+        
         return jsonify({
-            'status': 'healthy',
+            'status': status,
             'environment': env,
+            'database': database,
             'features': {
                 'cors': True,
                 'rate_limiting': hasattr(app, 'limiter') and app.limiter is not None,
                 'structured_logging': True
             }
-        })
+        }), 200 if status == 'healthy' else 503
     
     # Configurar rutas adicionales
     setup_debug_routes(app)
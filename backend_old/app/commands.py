@@ -363,6 +363,44 @@ def insert_test_data():
         import traceback
         traceback.print_exc()
 
+@click.command('benchmark-import')
+@click.option('--rows', default=10000, help='Filas del CSV generado')
+@click.option('--batch-size', default=None, type=int, help='Filas por lote (IMPORT_BATCH_SIZE por defecto)')
+@with_appcontext
+def benchmark_import(rows, batch_size):
+    """Medir filas/segundo de la importación de máquinas (inserción y actualización)"""
+    import csv
+    import os
+    import tempfile
+    import time
+    from .services.import_service import ImportService
+    
+    prefijo = f'BENCH-{int(time.time())}-'
+    fd, path = tempfile.mkstemp(suffix='.csv')
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['nombre', 'marca', 'modelo', 'numero_serie', 'año', 'tipo', 'horas_trabajo'])
+            for i in range(rows):
+                writer.writerow([f'Máquina {i}', 'Marca', 'M1', f'{prefijo}{i}', 2020, 'tractor', i])
+        
+        for modo in ('reject', 'update'):
+            inicio = time.perf_counter()
+            result = ImportService.import_maquinas_from_csv(path, chunk_size=batch_size, on_duplicate=modo)
+            segundos = time.perf_counter() - inicio
+            if result['errors']:
+                click.echo(f'❌ {modo}: {result["errors"][:3]}')
+                break
+            escritas = result['imported'] + result['updated']
+            click.echo(
+                f'⏱️ {modo}: {escritas} filas en {segundos:.2f}s '
+                f'({escritas / segundos:.0f} filas/s, {result["updated"]} actualizadas)'
+            )
+    finally:
+        os.remove(path)
+        Maquina.query.filter(Maquina.codigo.like(f'{prefijo}%')).delete(synchronize_session=False)
+        db.session.commit()
+
 def init_app(app):
     """Registrar comandos en la app"""
     app.cli.add_command(init_db)
@@ -376,4 +414,5 @@ def init_app(app):
     app.cli.add_command(show_data)
     app.cli.add_command(export_schema)
     app.cli.add_command(show_full_schema)
-    app.cli.add_command(insert_test_data)
\ No newline at end of file
+    app.cli.add_command(insert_test_data)
+    app.cli.add_command(benchmark_import)
\ No newline at end of file
@@ -3,6 +3,7 @@ from .maquina import Maquina
 from .compra import Compra
 from .proveedor import Proveedor
 from .stock import Stock
+from .job import Job
 
 # IMPORTAR DESPUÉS para evitar circulares
 from .asociaciones import Frecuencia, PagoProveedor, componentes_proveedores, maquinas_componentes
@@ -13,6 +14,7 @@ __all__ = [
     'Compra', 
     'Proveedor', 
     'Stock',
+    'Job',
     'Frecuencia',
     'PagoProveedor',
     'componentes_proveedores',
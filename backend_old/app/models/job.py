@@ -0,0 +1,59 @@
+import json
+from datetime import datetime
+from ..utils.db import db
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    # Estados posibles
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    ERROR = 'error'
+    CANCELADO = 'cancelado'
+    FINALIZADOS = (COMPLETADO, ERROR, CANCELADO)
+    
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False, index=True)
+    estado = db.Column(db.String(20), nullable=False, default=PENDIENTE, index=True)
+    fase = db.Column(db.String(50))
+    progreso = db.Column(db.Float, nullable=False, default=0)
+    filas = db.Column(db.Integer, nullable=False, default=0)
+    cancelar = db.Column(db.Boolean, nullable=False, default=False)
+    
+    # JSON serializado en texto (compatible con SQLite y PostgreSQL)
+    parametros = db.Column(db.Text)
+    resultado = db.Column(db.Text)
+    error = db.Column(db.Text)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @property
+    def finalizado(self):
+        return self.estado in self.FINALIZADOS
+    
+    def to_dict(self):
+        def fecha(value):
+            return value.isoformat() if value else None
+        
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'fase': self.fase,
+            'progreso': self.progreso or 0,
+            'filas': self.filas or 0,
+            'cancelacion_solicitada': bool(self.cancelar),
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'error': self.error,
+            'created_at': fecha(self.created_at),
+            'started_at': fecha(self.started_at),
+            'finished_at': fecha(self.finished_at),
+            'updated_at': fecha(self.updated_at)
+        }
+    
+    def __repr__(self):
+        return f'<Job {self.id}:{self.tipo} {self.estado}>'
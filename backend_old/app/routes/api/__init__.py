@@ -6,6 +6,7 @@ api_bp = Blueprint('api', __name__)
 from . import admin
 from . import componentes
 from . import compras
+from . import jobs
 from . import maquinas
 from . import maquinas_componentes
 from . import proveedores
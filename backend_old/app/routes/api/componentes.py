@@ -4,6 +4,7 @@ import os
 from . import api_bp
 from ...models.componente import Componente
 from ...utils.db import db
+from ...utils.upload_limits import limite_importacion
 
 
 @api_bp.route('/componentes', methods=['GET'])
@@ -425,3 +426,55 @@ def get_categorias():
             'error': str(e),
             'message': 'Error interno del servidor'
         }), 500
+
+
+@api_bp.route('/componentes/import', methods=['POST'])
+@limite_importacion
+def import_componentes():
+    """Importar componentes desde CSV (?async=true para procesar en segundo plano)"""
+    from werkzeug.exceptions import BadRequest
+    from ...services.file_service import FileService
+    from ...services.import_service import ImportService
+    from ...services.bulk_import_service import ON_DUPLICATE_POLICIES
+    from ...services.job_service import enqueue
+    from .jobs import job_accepted
+    
+    try:
+        file = request.files.get('csvFile')
+        if not file or file.filename == '':
+            raise BadRequest('No se proporcionó archivo CSV')
+        
+        on_duplicate = request.form.get('on_duplicate', 'reject')
+        if on_duplicate not in ON_DUPLICATE_POLICIES:
+            raise BadRequest(f"on_duplicate debe ser uno de: {', '.join(ON_DUPLICATE_POLICIES)}")
+        
+        try:
+            filepath = FileService.save_import_file(file, 'imports/componentes')
+            if not filepath:
+                raise BadRequest('Tipo de archivo no permitido. Solo CSV, XLS, XLSX')
+        except ValueError as e:
+            raise BadRequest(str(e))
+        
+        if request.args.get('async', request.form.get('async', '')).lower() == 'true':
+            return job_accepted(enqueue('import_componentes', file_path=filepath, on_duplicate=on_duplicate))
+        
+        try:
+            result = ImportService.import_componentes_from_csv(filepath, on_duplicate=on_duplicate)
+        finally:
+            FileService.cleanup_temp_file(filepath)
+        
+        return jsonify({
+            'success': True,
+            'imported': result['imported'],
+            'updated': result['updated'],
+            'errors': result['errors'],
+            'total': result['total'],
+            # Un lote falló después de guardar los anteriores (filas hasta committed_through_row)
+            'partial': result['partial'],
+            'committed_through_row': result['committed_through_row']
+        })
+    
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': e.description}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': f'Error en la importación: {str(e)}'}), 500
@@ -0,0 +1,83 @@
+from flask import request, jsonify, url_for
+from werkzeug.exceptions import BadRequest
+from . import api_bp
+from ...models.job import Job
+from ...utils.db import db
+from ...services.job_service import enqueue, cancel, is_public
+
+def job_accepted(job):
+    """Respuesta 202 para una tarea encolada"""
+    response = jsonify({
+        'success': True,
+        'job_id': job.id,
+        'data': job.to_dict(),
+        'status_url': url_for('api.get_job', job_id=job.id)
+    })
+    response.status_code = 202
+    response.headers['Location'] = url_for('api.get_job', job_id=job.id)
+    return response
+
+@api_bp.route('/jobs', methods=['POST'])
+def create_job():
+    """Encolar una tarea ({"tipo": ..., "parametros": {...}})"""
+    try:
+        data = request.get_json(silent=True) or {}
+        tipo = data.get('tipo')
+        if not is_public(tipo):
+            raise BadRequest(f"Tipo de tarea no disponible: {tipo}")
+        
+        parametros = data.get('parametros') or {}
+        if not isinstance(parametros, dict):
+            raise BadRequest('parametros debe ser un objeto')
+        
+        return job_accepted(enqueue(tipo, **parametros))
+    
+    except BadRequest as e:
+        return jsonify({'success': False, 'error': e.description}), 400
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """Últimas tareas (?estado=, ?tipo=, ?limit=)"""
+    try:
+        query = Job.query
+        if request.args.get('estado'):
+            query = query.filter(Job.estado == request.args['estado'])
+        if request.args.get('tipo'):
+            query = query.filter(Job.tipo == request.args['tipo'])
+        
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        jobs = query.order_by(Job.created_at.desc()).limit(limit).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [job.to_dict() for job in jobs]
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Estado, progreso, resultado y errores de una tarea"""
+    try:
+        job = db.session.get(Job, job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Tarea no encontrada'}), 404
+        
+        return jsonify({'success': True, 'data': job.to_dict()})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@api_bp.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """Cancelar una tarea pendiente o en proceso"""
+    try:
+        job = cancel(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Tarea no encontrada'}), 404
+        
+        return jsonify({'success': True, 'data': job.to_dict()})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 500
@@ -4,6 +4,9 @@ from . import api_bp
 from ...models.maquina import Maquina
 from ...utils.db import db, commit_or_rollback
 from ...services.file_service import FileService
+from ...services.job_service import register_job, enqueue
+from .jobs import job_accepted
+from ...utils.upload_limits import limite_importacion
 
 @api_bp.route('/maquinas', methods=['GET'])
 def get_maquinas():
@@ -318,6 +321,7 @@ def upload_maquina_photo(id):
 
 # NUEVAS RUTAS PARA IMPORTACIÓN
 @api_bp.route('/maquinas/import', methods=['POST'])
+@limite_importacion
 def import_maquinas():
     """Importar máquinas desde CSV"""
     try:
@@ -336,9 +340,19 @@ def import_maquinas():
         except ValueError as e:
             raise BadRequest(str(e))
         
-        # Importar datos
+        # Importar datos ('update' actualiza las máquinas ya existentes)
         from ...services.import_service import ImportService
-        result = ImportService.import_maquinas_from_csv(filepath)
+        from ...services.bulk_import_service import ON_DUPLICATE_POLICIES
+        on_duplicate = request.form.get('on_duplicate', 'reject')
+        if on_duplicate not in ON_DUPLICATE_POLICIES:
+            FileService.cleanup_temp_file(filepath)
+            raise BadRequest(f"on_duplicate debe ser uno de: {', '.join(ON_DUPLICATE_POLICIES)}")
+        
+        # Archivos grandes: ?async=true procesa en segundo plano (ver /jobs/<id>)
+        if request.args.get('async', request.form.get('async', '')).lower() == 'true':
+            return job_accepted(enqueue('import_maquinas', file_path=filepath, on_duplicate=on_duplicate))
+        
+        result = ImportService.import_maquinas_from_csv(filepath, on_duplicate=on_duplicate)
         
         # Limpiar archivo temporal
         FileService.cleanup_temp_file(filepath)
@@ -346,8 +360,12 @@ def import_maquinas():
         return jsonify({
             'success': True,
             'imported': result['imported'],
+            'updated': result['updated'],
             'errors': result['errors'],
-            'total': result['total']
+            'total': result['total'],
+            # Un lote falló después de guardar los anteriores (filas hasta committed_through_row)
+            'partial': result['partial'],
+            'committed_through_row': result['committed_through_row']
         })
         
     except BadRequest as e:
@@ -383,39 +401,47 @@ def get_maquinas_metadata():
             'error': str(e)
         }), 500
 
+@register_job('estadisticas_maquinas', publico=True)
+def calcular_estadisticas_maquinas(job=None):
+    """Totales de máquinas por estado y por tipo"""
+    total = Maquina.query.count()
+    activas = Maquina.query.filter(Maquina.activo == True).count()
+    inactivas = total - activas
+    
+    # Estadísticas por estado
+    operativo = Maquina.query.filter(Maquina.estado == 'operativo').count()
+    operativa = Maquina.query.filter(Maquina.estado == 'Operativa').count()
+    mantenimiento = Maquina.query.filter(Maquina.estado == 'mantenimiento').count()
+    fuera_servicio = Maquina.query.filter(Maquina.estado == 'fuera_servicio').count()
+    
+    # Estadísticas por tipo
+    tipos_query = db.session.query(
+        Maquina.tipo, 
+        db.func.count(Maquina.id)
+    ).filter(Maquina.tipo.isnot(None)).group_by(Maquina.tipo)
+    
+    tipos = tipos_query.all()
+    
+    return {
+        'total': total,
+        'activas': activas,
+        'inactivas': inactivas,
+        'operativo': operativo + operativa,  # Combinar variaciones
+        'mantenimiento': mantenimiento,
+        'fuera_servicio': fuera_servicio,
+        'por_tipo': [{'tipo': tipo[0] or 'Sin tipo', 'cantidad': tipo[1]} for tipo in tipos]
+    }
+
 @api_bp.route('/maquinas/stats', methods=['GET'])
 def get_maquinas_stats():
-    """Estadísticas de máquinas"""
+    """Estadísticas de máquinas (?async=true para calcularlas como tarea)"""
     try:
-        total = Maquina.query.count()
-        activas = Maquina.query.filter(Maquina.activo == True).count()
-        inactivas = total - activas
-        
-        # Estadísticas por estado
-        operativo = Maquina.query.filter(Maquina.estado == 'operativo').count()
-        operativa = Maquina.query.filter(Maquina.estado == 'Operativa').count()
-        mantenimiento = Maquina.query.filter(Maquina.estado == 'mantenimiento').count()
-        fuera_servicio = Maquina.query.filter(Maquina.estado == 'fuera_servicio').count()
-        
-        # Estadísticas por tipo
-        tipos_query = db.session.query(
-            Maquina.tipo, 
-            db.func.count(Maquina.id)
-        ).filter(Maquina.tipo.isnot(None)).group_by(Maquina.tipo)
-        
-        tipos = tipos_query.all()
+        if request.args.get('async', '').lower() == 'true':
+            return job_accepted(enqueue('estadisticas_maquinas'))
         
         return jsonify({
             'success': True,
-            'data': {
-                'total': total,
-                'activas': activas,
-                'inactivas': inactivas,
-                'operativo': operativo + operativa,  # Combinar variaciones
-                'mantenimiento': mantenimiento,
-                'fuera_servicio': fuera_servicio,
-                'por_tipo': [{'tipo': tipo[0] or 'Sin tipo', 'cantidad': tipo[1]} for tipo in tipos]
-            }
+            'data': calcular_estadisticas_maquinas()
         })
     except Exception as e:
         # En caso de error, hacer rollback para limpiar la transacción
@@ -1,65 +1,181 @@
+"""
+Escritura masiva de importaciones
+
+Cada lote se escribe con una sola sentencia ejecutada como executemany:
+INSERT simple o, con la política de actualizar existentes, INSERT ... ON
+CONFLICT (clave) DO UPDATE en PostgreSQL y SQLite.
+"""
+from flask import current_app, has_app_context
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import postgresql, sqlite
 from ..models.maquina import Maquina
 from ..utils.db import db
+from .data_validator import existing_keys
+from .job_service import register_job
+
+# Política ante claves que ya existen en la base
+ON_DUPLICATE_REJECT = 'reject'
+ON_DUPLICATE_UPDATE = 'update'
+ON_DUPLICATE_POLICIES = (ON_DUPLICATE_REJECT, ON_DUPLICATE_UPDATE)
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Dialectos con INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def get_batch_size(batch_size=None):
+    """Filas por lote (y por commit): argumento, IMPORT_BATCH_SIZE o el valor por defecto"""
+    if batch_size:
+        return batch_size
+    if has_app_context():
+        return current_app.config.get('IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    return DEFAULT_BATCH_SIZE
+
+
+def _to_columns(model, values):
+    """Pasar claves de atributo ('nombre') a nombres de columna ('Nombre')"""
+    attrs = model.__mapper__.attrs
+    return [{attrs[key].columns[0].name: value for key, value in row.items()} for row in values]
+
+
+def write_batch(model, key_attribute, values, update_existing=False, existing=None):
+    """
+    Escribir un lote de filas
+    
+    Args:
+        model: Modelo destino
+        key_attribute: Atributo único usado para detectar existentes ('codigo')
+        values: Lista de diccionarios con claves de atributo
+        update_existing: Actualizar las filas cuya clave ya existe
+        existing: Claves existentes ya consultadas (None para consultarlas)
+    
+    Returns:
+        dict: {'inserted': n, 'updated': n}
+    """
+    if not values:
+        return {'inserted': 0, 'updated': 0}
+    
+    key_column = getattr(model, key_attribute)
+    keys = [row[key_attribute] for row in values if row.get(key_attribute)]
+    existentes = existing_keys(key_column, keys) if existing is None else existing & set(keys)
+    if existentes and not update_existing:
+        raise ValueError(f"Claves ya existentes: {', '.join(sorted(map(str, existentes))[:10])}")
+    
+    table = model.__table__
+    upsert = UPSERT_DIALECTS.get(db.session.get_bind().dialect.name)
+    
+    if not existentes:
+        db.session.bulk_insert_mappings(model, values)
+    elif upsert is not None:
+        key_name = key_column.property.columns[0].name
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[key_name],
+            set_={name: stmt.excluded[name] for name in _to_columns(model, values[:1])[0] if name != key_name}
+        )
+        db.session.execute(stmt, _to_columns(model, values))
+    else:
+        # Otros motores: INSERT de las nuevas y UPDATE por clave de las existentes
+        nuevas = [row for row in values if row.get(key_attribute) not in existentes]
+        db.session.bulk_insert_mappings(model, nuevas)
+        
+        filas = _to_columns(model, [row for row in values if row.get(key_attribute) in existentes])
+        key_name = key_column.property.columns[0].name
+        columnas = [name for name in filas[0] if name != key_name]
+        db.session.execute(
+            table.update()
+            .where(table.c[key_name] == bindparam('b_key'))
+            .values({name: bindparam(f'b_{name}') for name in columnas}),
+            [dict({f'b_{name}': row[name] for name in columnas}, b_key=row[key_name]) for row in filas]
+        )
+    
+    updated = sum(1 for row in values if row.get(key_attribute) in existentes)
+    return {'inserted': len(values) - updated, 'updated': updated}
+
 
-def bulk_import_machines(data):
-    """Importa máquinas de forma masiva"""
-    imported = []
+def bulk_import_machines(data, on_duplicate=ON_DUPLICATE_REJECT, batch_size=None, progress=None):
+    """
+    Importa máquinas de forma masiva
+    
+    Args:
+        data: Lista de filas (diccionarios con las columnas del CSV)
+        on_duplicate: 'reject' (las existentes se informan como error) o
+            'update' (se actualizan con los datos de la fila)
+        batch_size: Filas por lote; cada lote se confirma por separado
+        progress: Función opcional (fase, filas, porcentaje) llamada por lote
+    
+    Si falla un lote se detiene; los anteriores ya están confirmados y el
+    resultado lo indica con `partial` y `committed_through_row`.
+    """
+    from .import_service import maquina_values, import_result
+    
+    if on_duplicate not in ON_DUPLICATE_POLICIES:
+        raise ValueError(f"Política inválida: {on_duplicate}")
+    
+    batch_size = get_batch_size(batch_size)
+    imported = 0
+    updated = 0
     errors = []
+    seen = set()
+    committed_through_row = None
     
-    for index, row in enumerate(data):
-        try:
-            # Verificar si ya existe por número de serie
-            if row.get('numero_serie'):
-                existing = Maquina.query.filter_by(numero_serie=row['numero_serie']).first()
-                if existing:
-                    errors.append(f"Fila {index + 2}: Máquina con número de serie '{row['numero_serie']}' ya existe")
-                    continue
+    for inicio in range(0, len(data), batch_size):
+        lote = []
+        filas = list(enumerate(data[inicio:inicio + batch_size], start=inicio))
+        
+        keys = [row.get('numero_serie') for _, row in filas if row.get('numero_serie')]
+        existentes = existing_keys(Maquina.codigo, keys)
+        rechazar = on_duplicate == ON_DUPLICATE_REJECT
+        
+        for index, row in filas:
+            numero_serie = row.get('numero_serie')
+            if not numero_serie:
+                # Se guarda en Maquina.codigo, que es obligatorio
+                errors.append(f"Fila {index + 2}: Campo 'numero_serie' es requerido")
+                continue
+            if rechazar and numero_serie in existentes:
+                errors.append(f"Fila {index + 2}: Máquina con número de serie '{numero_serie}' ya existe")
+                continue
+            if numero_serie in seen:
+                errors.append(f"Fila {index + 2}: Máquina con número de serie '{numero_serie}' repetida en los datos")
+                continue
+            seen.add(numero_serie)
             
-            # Convertir valores
-            año = None
             if row.get('año') and str(row['año']).strip():
                 try:
-                    año = int(row['año'])
+                    int(row['año'])
                 except ValueError:
                     errors.append(f"Fila {index + 2}: Año inválido '{row['año']}'")
                     continue
             
-            horas_trabajo = 0
-            if row.get('horas_trabajo') and str(row['horas_trabajo']).strip():
-                try:
-                    horas_trabajo = float(row['horas_trabajo'])
-                except ValueError:
-                    horas_trabajo = 0
-            
-            activo = True
-            if row.get('activo'):
-                activo_str = str(row['activo']).lower().strip()
-                activo = activo_str in ['true', '1', 'si', 'yes', 'verdadero']
-            
-            maquina = Maquina(
-                nombre=row['nombre'],
-                marca=row.get('marca', ''),
-                modelo=row.get('modelo', ''),
-                numero_serie=row.get('numero_serie'),
-                año=año,
-                tipo=row.get('tipo', ''),
-                estado=row.get('estado', 'operativo'),
-                horas_trabajo=horas_trabajo,
-                ubicacion=row.get('ubicacion', ''),
-                observaciones=row.get('observaciones', ''),
-                activo=activo
-            )
-            
-            db.session.add(maquina)
-            imported.append(maquina.to_dict())
-            
+            try:
+                lote.append(maquina_values(row))
+            except Exception as e:
+                errors.append(f"Fila {index + 2}: {str(e)}")
+        
+        try:
+            resultado = write_batch(Maquina, 'codigo', lote, not rechazar, existentes)
+            db.session.commit()
         except Exception as e:
-            errors.append(f"Fila {index + 2}: {str(e)}")
-    
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        return {'imported': [], 'errors': [f"Error al guardar en base de datos: {str(e)}"]}
+            db.session.rollback()
+            errors.append(f"Error al guardar en base de datos (filas {inicio + 2}-{inicio + len(filas) + 1}): {str(e)}")
+            return import_result(imported, updated, errors, committed_through_row=committed_through_row, stopped=True)
+        
+        imported += resultado['inserted']
+        updated += resultado['updated']
+        committed_through_row = inicio + len(filas) + 1
+        if progress:
+            procesadas = inicio + len(filas)
+            progress('importacion', procesadas, round(procesadas / len(data) * 100, 1))
     
-    return {'imported': imported, 'errors': errors}
\ No newline at end of file
+    return import_result(imported, updated, errors, committed_through_row=committed_through_row)
+
+
+@register_job('bulk_import_maquinas', publico=True)
+def bulk_import_machines_job(job, data, on_duplicate=ON_DUPLICATE_REJECT, batch_size=None):
+    """bulk_import_machines en segundo plano (POST /jobs con las filas en JSON)"""
+    return bulk_import_machines(data, on_duplicate, batch_size, progress=job)
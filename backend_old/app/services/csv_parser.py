@@ -0,0 +1,154 @@
+"""
+Lectura de archivos CSV de importación en streaming
+
+El encoding se determina leyendo el archivo por bloques (UTF-8, cp1252 o lo
+que detecte chardet sobre un prefijo acotado) y las filas se entregan en
+bloques de tamaño fijo, sin cargar el archivo completo en memoria.
+"""
+import codecs
+import csv
+import io
+import os
+
+from chardet.universaldetector import UniversalDetector
+
+# Bytes del inicio del archivo usados para detectar el encoding
+SNIFF_BYTES = 64 * 1024
+# Filas por bloque al validar e importar
+DEFAULT_CHUNK_SIZE = 1000
+# Encoding de los CSV exportados por Excel en Windows cuando no son UTF-8
+FALLBACK_ENCODING = 'cp1252'
+
+
+class CsvEncodingError(ValueError):
+    """El archivo tiene bytes inválidos para el encoding con que se lee"""
+
+
+def _decodes_completely(file_path, encoding, block_size=SNIFF_BYTES):
+    """Si el archivo completo se decodifica con `encoding` (por bloques)"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        with open(file_path, 'rb') as f:
+            for bloque in iter(lambda: f.read(block_size), b''):
+                decoder.decode(bloque)
+        decoder.decode(b'', final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _first_invalid_line(file_path, encoding):
+    """Número de línea (1 = encabezado) del primer byte inválido para `encoding`"""
+    with open(file_path, 'rb') as f:
+        for numero, linea in enumerate(f, 1):
+            try:
+                linea.decode(encoding)
+            except UnicodeDecodeError:
+                return numero
+    return None
+
+
+def detect_encoding(file_path, sniff_bytes=SNIFF_BYTES):
+    """
+    Detecta el encoding del archivo
+    
+    Primero se verifica el archivo completo como UTF-8 (por bloques, sin
+    cargarlo en memoria): un byte latin-1 después del prefijo analizado no
+    queda oculto y los archivos cortos no dependen de la estadística de
+    chardet. Si no es UTF-8 pero los primeros `sniff_bytes` sí lo son, el
+    archivo se lee como cp1252; si no, se usa lo que detecte chardet sobre
+    ese prefijo.
+    """
+    with open(file_path, 'rb') as f:
+        prefijo = f.read(sniff_bytes)
+    if _decodes_completely(file_path, 'utf-8'):
+        return 'utf-8-sig' if prefijo.startswith(codecs.BOM_UTF8) else 'utf-8'
+    
+    try:
+        # Sin final=True: el prefijo puede cortar un carácter a la mitad
+        codecs.getincrementaldecoder('utf-8')().decode(prefijo)
+        return FALLBACK_ENCODING
+    except UnicodeDecodeError:
+        pass
+    
+    detector = UniversalDetector()
+    detector.feed(prefijo)
+    detector.close()
+    return detector.result.get('encoding') or FALLBACK_ENCODING
+
+
+def clean_row(row):
+    """Quita espacios y convierte celdas faltantes en '' (columnas extra se descartan)"""
+    return {
+        key.strip(): value.strip() if isinstance(value, str) else ''
+        for key, value in row.items()
+        if key is not None
+    }
+
+
+class CsvStream:
+    """
+    Recorre un CSV por bloques de filas limpias
+    
+    Cada bloque es una lista de (fila, datos), donde `fila` es el número de
+    fila del archivo contando el encabezado (la primera fila de datos es la 2),
+    el mismo que usan los mensajes de error de la importación.
+    
+    Los bytes inválidos para el encoding no se reemplazan: se lanza
+    CsvEncodingError con el número de fila.
+    """
+    
+    def __init__(self, file_path, chunk_size=DEFAULT_CHUNK_SIZE, encoding=None):
+        self.file_path = file_path
+        self.chunk_size = chunk_size
+        self.encoding = encoding or detect_encoding(file_path)
+        self.total_bytes = os.path.getsize(file_path)
+        self.bytes_read = 0
+        self.rows_read = 0
+    
+    @property
+    def progress(self):
+        """Porcentaje del archivo leído (aproximado por bytes)"""
+        if not self.total_bytes:
+            return 100.0
+        return round(min(self.bytes_read / self.total_bytes, 1.0) * 100, 1)
+    
+    def __iter__(self):
+        self.bytes_read = 0
+        self.rows_read = 0
+        
+        with open(self.file_path, 'rb') as raw:
+            text = io.TextIOWrapper(raw, encoding=self.encoding, errors='strict', newline='')
+            reader = csv.DictReader(text)
+            
+            chunk = []
+            try:
+                for row in reader:
+                    self.rows_read += 1
+                    chunk.append((self.rows_read + 1, clean_row(row)))
+                    if len(chunk) >= self.chunk_size:
+                        self.bytes_read = raw.tell()
+                        yield chunk
+                        chunk = []
+            except UnicodeDecodeError:
+                # El texto se decodifica por bloques: la fila se busca aparte
+                fila = _first_invalid_line(self.file_path, self.encoding)
+                raise CsvEncodingError(
+                    f"Fila {fila}: el archivo contiene caracteres inválidos para el encoding {self.encoding}"
+                )
+            
+            self.bytes_read = self.total_bytes
+            if chunk:
+                yield chunk
+    
+    def rows(self):
+        """Filas sueltas (fila, datos) en orden"""
+        for chunk in self:
+            yield from chunk
+    
+    @property
+    def columns(self):
+        """Encabezados del archivo (sin espacios)"""
+        with open(self.file_path, 'r', encoding=self.encoding, errors='replace', newline='') as f:
+            header = next(csv.reader(f), [])
+        return [column.strip() for column in header]
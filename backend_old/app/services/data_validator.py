@@ -0,0 +1,169 @@
+"""
+Validación de filas de importación en una sola pasada
+
+Los duplicados dentro del archivo se detectan con un mapa de claves vistas
+y las claves ya existentes se consultan con un IN por bloque de filas, en
+lugar de una consulta por fila.
+"""
+from ..models import Maquina, Componente
+from ..utils.db import db
+
+# Claves por consulta IN (por debajo del límite de parámetros de SQLite y PostgreSQL)
+IN_BATCH_SIZE = 500
+
+# Orden de los mensajes dentro de una misma fila
+ORDEN_REQUERIDO = 0
+ORDEN_DUPLICADO = 1
+ORDEN_EXISTENTE = 2
+ORDEN_VALOR = 3
+
+
+def is_blank(value):
+    return not value or str(value).strip() == ''
+
+
+def existing_keys(column, keys, batch_size=IN_BATCH_SIZE):
+    """
+    Claves que ya existen en la base para una columna
+    
+    Args:
+        column: Columna única (p. ej. Maquina.codigo)
+        keys: Claves a buscar
+        batch_size: Claves por consulta IN
+    
+    Returns:
+        set con las claves encontradas
+    """
+    keys = list(keys)
+    found = set()
+    for inicio in range(0, len(keys), batch_size):
+        lote = keys[inicio:inicio + batch_size]
+        found.update(value for (value,) in db.session.query(column).filter(column.in_(lote)))
+    return found
+
+
+class RowValidator:
+    """
+    Validación por bloques de filas con estado entre bloques
+    
+    Los errores se guardan por fila y se devuelven ordenados por fila, así
+    una fila puede recibir un mensaje al encontrarse un duplicado más abajo.
+    """
+    # Columna del CSV que debe ser única, modelo y atributo donde se guarda,
+    # y su etiqueta en los mensajes
+    key_field = None
+    model = None
+    key_attribute = None
+    key_label = None
+    required_fields = []
+    
+    def __init__(self, allow_existing=False):
+        # Con la política de actualizar existentes no son un error
+        self.allow_existing = allow_existing
+        self._errors = {}
+        self._seen = {}
+        self._reported = set()
+        self._existing = set()
+    
+    def add_error(self, fila, orden, mensaje):
+        self._errors.setdefault(fila, []).append((orden, f"Fila {fila}: {mensaje}"))
+    
+    def validate_chunk(self, chunk):
+        """Valida un bloque de (fila, datos) con una consulta IN por lote de claves"""
+        chunk = list(chunk)
+        if self.allow_existing:
+            self._existing = set()
+        else:
+            keys = {row.get(self.key_field) for _, row in chunk if not is_blank(row.get(self.key_field))}
+            self._existing = existing_keys(getattr(self.model, self.key_attribute), keys)
+        
+        for fila, row in chunk:
+            self.validate_row(fila, row)
+    
+    def validate_row(self, fila, row):
+        for field in self.required_fields:
+            if is_blank(row.get(field)):
+                self.add_error(fila, ORDEN_REQUERIDO, f"Campo '{field}' es requerido")
+        
+        key = row.get(self.key_field)
+        if key and str(key).strip():
+            self.check_duplicate(fila, key)
+            if not self.allow_existing and self.exists_in_db(key):
+                self.add_error(fila, ORDEN_EXISTENTE, f"{self.key_label} '{key}' ya existe en la base de datos")
+        
+        self.validate_values(fila, row)
+    
+    def check_duplicate(self, fila, key):
+        """Marca la fila (y la primera aparición de la clave) si la clave se repite"""
+        primera = self._seen.setdefault(key, fila)
+        if primera == fila:
+            return
+        mensaje = f"{self.key_label} '{key}' duplicado en el CSV"
+        if key not in self._reported:
+            self._reported.add(key)
+            self.add_error(primera, ORDEN_DUPLICADO, mensaje)
+        self.add_error(fila, ORDEN_DUPLICADO, mensaje)
+    
+    def exists_in_db(self, key):
+        return key in self._existing
+    
+    def validate_values(self, fila, row):
+        pass
+    
+    def result(self):
+        errors = [
+            mensaje
+            for fila in sorted(self._errors)
+            for _, mensaje in sorted(self._errors[fila], key=lambda e: e[0])
+        ]
+        return {
+            'is_valid': len(errors) == 0,
+            'errors': errors
+        }
+
+
+class MaquinasValidator(RowValidator):
+    # El número de serie del CSV se guarda en Maquina.codigo (único y obligatorio)
+    required_fields = ['nombre', 'numero_serie']
+    key_field = 'numero_serie'
+    model = Maquina
+    key_attribute = 'codigo'
+    key_label = 'Número de serie'
+    
+    def validate_values(self, fila, row):
+        año = row.get('año')
+        if año and str(año).strip():
+            try:
+                año_int = int(año)
+                if año_int < 1900 or año_int > 2030:
+                    self.add_error(fila, ORDEN_VALOR, f"Año '{año}' fuera del rango válido (1900-2030)")
+            except ValueError:
+                self.add_error(fila, ORDEN_VALOR, f"Año '{año}' no es un número válido")
+
+
+class ComponentesValidator(RowValidator):
+    required_fields = ['nombre']
+    key_field = 'numero_parte'
+    model = Componente
+    key_attribute = 'id_componente'
+    key_label = 'Número de parte'
+    
+    def validate_values(self, fila, row):
+        precio = row.get('precio_unitario')
+        if precio and str(precio).strip():
+            try:
+                if float(precio) < 0:
+                    self.add_error(fila, ORDEN_VALOR, "Precio unitario no puede ser negativo")
+            except ValueError:
+                self.add_error(fila, ORDEN_VALOR, f"Precio unitario '{precio}' no es un número válido")
+        
+        for field, label in (('stock_minimo', 'Stock mínimo'), ('stock_actual', 'Stock actual')):
+            value = row.get(field)
+            if value and str(value).strip():
+                try:
+                    if int(value) < 0:
+                        self.add_error(fila, ORDEN_VALOR, f"{label} no puede ser negativo")
+                except ValueError:
+                    self.add_error(fila, ORDEN_VALOR, f"{label} '{value}' no es un número válido")
+
+
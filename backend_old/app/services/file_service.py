@@ -11,7 +11,9 @@ class FileService:
     ALLOWED_IMPORT_EXTENSIONS = {'csv', 'xlsx', 'xls'}
     
     MAX_IMAGE_SIZE = (800, 600)
-    MAX_CSV_SIZE = 5 * 1024 * 1024  # 5MB para CSV
+    # Tamaño máximo por defecto de archivos de importación (configurable con
+    # MAX_IMPORT_FILE_SIZE); el CSV se procesa en streaming, no se carga entero
+    MAX_CSV_SIZE = 64 * 1024 * 1024
     
     @staticmethod
     def allowed_file(filename, file_type='image'):
@@ -74,8 +76,9 @@ class FileService:
             file_size = file.tell()
             file.seek(0)
             
-            if file_size > FileService.MAX_CSV_SIZE:
-                raise ValueError(f"Archivo muy grande. Máximo permitido: {FileService.MAX_CSV_SIZE / 1024 / 1024}MB")
+            max_size = current_app.config.get('MAX_IMPORT_FILE_SIZE', FileService.MAX_CSV_SIZE)
+            if file_size > max_size:
+                raise ValueError(f"Archivo muy grande. Máximo permitido: {max_size / 1024 / 1024}MB")
             
             # Generar nombre único
             filename = secure_filename(file.filename)
@@ -132,12 +135,12 @@ class FileService:
         """
         Valida que el CSV tenga las columnas requeridas
         """
-        import pandas as pd
+        from .csv_parser import CsvStream
         
         try:
-            # Leer solo la primera fila para verificar columnas
-            df = pd.read_csv(file_path, nrows=0)
-            csv_columns = set(df.columns.str.strip().str.lower())
+            # Leer solo el encabezado para verificar columnas
+            columns = CsvStream(file_path).columns
+            csv_columns = set(column.lower() for column in columns)
             required_columns_lower = set(col.lower() for col in required_columns)
             
             missing_columns = required_columns_lower - csv_columns
@@ -148,7 +151,7 @@ class FileService:
                     'error': f"Columnas faltantes: {', '.join(missing_columns)}"
                 }
             
-            return {'valid': True, 'columns': list(df.columns)}
+            return {'valid': True, 'columns': columns}
             
         except Exception as e:
             return {
@@ -1,151 +1,213 @@
-import pandas as pd
-import chardet
-from flask import make_response
+import csv
 import io
+from flask import make_response
 from ..models import Maquina, Componente
 from ..utils.db import db
+from .csv_parser import CsvStream, CsvEncodingError
+from .bulk_import_service import write_batch, get_batch_size, ON_DUPLICATE_REJECT, ON_DUPLICATE_UPDATE, ON_DUPLICATE_POLICIES
+from .data_validator import MaquinasValidator, ComponentesValidator, is_blank
+from .file_service import FileService
+from .job_service import register_job
 
-class ImportService:
+TRUE_VALUES = ['true', '1', 'si', 'yes', 'verdadero']
+
+def _to_int(value, default=None):
+    if is_blank(value):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def _to_float(value, default=0):
+    if is_blank(value):
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def _to_bool(value):
+    if not value:
+        return True
+    return str(value).lower().strip() in TRUE_VALUES
+
+
+def maquina_values(row):
+    """Columnas de Maquina a partir de una fila del CSV"""
+    return {
+        'codigo': row.get('numero_serie') or None,
+        'nombre': row['nombre'],
+        'marca': row.get('marca', ''),
+        'modelo': row.get('modelo', ''),
+        'año': _to_int(row.get('año')),
+        'tipo': row.get('tipo', ''),
+        'estado': row.get('estado', 'operativo'),
+        'horas': int(_to_float(row.get('horas_trabajo'))),
+        'ubicacion': row.get('ubicacion', ''),
+        'observaciones': row.get('observaciones', ''),
+        'activo': _to_bool(row.get('activo'))
+    }
+
+
+def componente_values(row):
+    """Columnas de Componente a partir de una fila del CSV"""
+    # stock_minimo y stock_actual se validan pero no tienen columna en la tabla actual
+    return {
+        'id_componente': row.get('numero_parte') or None,
+        'nombre': row['nombre'],
+        'descripcion': row.get('descripcion', ''),
+        'tipo': row.get('categoria', ''),
+        'precio': _to_float(row.get('precio_unitario'))
+    }
+
+
+def _report(progress, fase, stream):
+    if progress:
+        progress(fase, stream.rows_read, stream.progress)
+
+
+def import_result(imported=0, updated=0, errors=(), total=None, committed_through_row=None, stopped=False):
+    """
+    Resultado de una importación
+    
+    partial: la escritura se detuvo por un error después de confirmar
+    algunos bloques; las filas hasta committed_through_row quedaron guardadas.
+    """
+    result = {
+        'imported': imported,
+        'updated': updated,
+        'errors': list(errors),
+        'partial': stopped and committed_through_row is not None,
+        'committed_through_row': committed_through_row
+    }
+    if total is not None:
+        result['total'] = total
+    return result
+
+
+def import_csv(file_path, model, validator, to_values, chunk_size=None, progress=None,
+               on_duplicate=ON_DUPLICATE_REJECT):
+    """
+    Valida e importa un CSV por bloques con memoria constante
+    
+    El archivo se recorre dos veces: primero se valida completo (si hay
+    errores no se importa nada) y después se escribe bloque a bloque, con
+    una sentencia masiva y un commit por bloque (IMPORT_BATCH_SIZE filas).
+    
+    progress: función opcional (fase, filas_procesadas, porcentaje) llamada
+    después de cada bloque, con fase 'validacion' o 'importacion'.
+    on_duplicate: 'reject' informa como error las claves ya existentes;
+    'update' las actualiza con los datos del archivo.
+    
+    Si falla la escritura de un bloque se detiene, pero los bloques ya
+    confirmados quedan guardados: el resultado lo informa con `partial` y
+    `committed_through_row` (última fila del archivo guardada).
+    """
+    if on_duplicate not in ON_DUPLICATE_POLICIES:
+        raise ValueError(f"Política inválida: {on_duplicate}")
+    
+    update_existing = on_duplicate == ON_DUPLICATE_UPDATE
+    stream = CsvStream(file_path, get_batch_size(chunk_size))
+    
+    validator.allow_existing = update_existing
+    try:
+        for chunk in stream:
+            validator.validate_chunk(chunk)
+            _report(progress, 'validacion', stream)
+    except CsvEncodingError as e:
+        return import_result(errors=[str(e)], total=stream.rows_read)
+    total = stream.rows_read
+    
+    validation = validator.result()
+    if not validation['is_valid']:
+        return import_result(errors=validation['errors'], total=total)
+    
+    imported = 0
+    updated = 0
+    errors = []
+    committed_through_row = None
+    for chunk in stream:
+        values = []
+        for fila, row in chunk:
+            try:
+                values.append(to_values(row))
+            except Exception as e:
+                errors.append(f"Fila {fila}: {str(e)}")
+        
+        try:
+            # Sentencia masiva sin crear objetos ORM ni llenar la sesión
+            resultado = write_batch(model, validator.key_attribute, values, update_existing)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors.append(
+                f"Error al guardar en base de datos (filas {chunk[0][0]}-{chunk[-1][0]}): {str(e)}"
+            )
+            return import_result(imported, updated, errors, total, committed_through_row, stopped=True)
+        
+        imported += resultado['inserted']
+        updated += resultado['updated']
+        committed_through_row = chunk[-1][0]
+        _report(progress, 'importacion', stream)
+    
+    return import_result(imported, updated, errors, total, committed_through_row)
+
+
+@register_job('import_maquinas')
+def import_maquinas_job(job, file_path, on_duplicate=ON_DUPLICATE_REJECT):
+    """Importación de máquinas en segundo plano; borra el archivo al terminar"""
+    try:
+        return ImportService.import_maquinas_from_csv(file_path, progress=job, on_duplicate=on_duplicate)
+    finally:
+        FileService.cleanup_temp_file(file_path)
+
+
+@register_job('import_componentes')
+def import_componentes_job(job, file_path, on_duplicate=ON_DUPLICATE_REJECT):
+    """Importación de componentes en segundo plano; borra el archivo al terminar"""
+    try:
+        return ImportService.import_componentes_from_csv(file_path, progress=job, on_duplicate=on_duplicate)
+    finally:
+        FileService.cleanup_temp_file(file_path)
+
+
+def _csv_response(template_data, filename):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(template_data.keys())
+    writer.writerows(zip(*template_data.values()))
     
+    response = make_response(output.getvalue())
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    
+    return response
+
+
+class ImportService:
+
     @staticmethod
     def parse_csv(file_path):
         """Parsea un archivo CSV y retorna una lista de diccionarios"""
         try:
-            # Detectar encoding
-            with open(file_path, 'rb') as f:
-                raw_data = f.read()
-                result = chardet.detect(raw_data)
-                encoding = result['encoding']
-            
-            # Leer CSV con pandas
-            df = pd.read_csv(file_path, encoding=encoding)
-            
-            # Limpiar datos
-            df = df.fillna('')
-            df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-            
-            return df.to_dict('records')
-            
+            return [row for _, row in CsvStream(file_path).rows()]
         except Exception as e:
             raise Exception(f"Error al parsear CSV: {str(e)}")
     
     @staticmethod
     def validate_maquinas_data(data):
         """Valida los datos de máquinas"""
-        errors = []
-        required_fields = ['nombre']
-        
-        for index, row in enumerate(data):
-            # Validar campos requeridos
-            for field in required_fields:
-                if not row.get(field) or str(row[field]).strip() == '':
-                    errors.append(f"Fila {index + 2}: Campo '{field}' es requerido")
-            
-            # Validar número de serie único si existe
-            numero_serie = row.get('numero_serie')
-            if numero_serie and str(numero_serie).strip():
-                # Verificar duplicados en el mismo CSV
-                duplicates = [i for i, other in enumerate(data) 
-                             if i != index and other.get('numero_serie') == numero_serie]
-                if duplicates:
-                    errors.append(f"Fila {index + 2}: Número de serie '{numero_serie}' duplicado en el CSV")
-                
-                # Verificar si ya existe en la base de datos
-                existing = Maquina.query.filter_by(numero_serie=numero_serie).first()
-                if existing:
-                    errors.append(f"Fila {index + 2}: Número de serie '{numero_serie}' ya existe en la base de datos")
-            
-            # Validar año si existe
-            año = row.get('año')
-            if año and str(año).strip():
-                try:
-                    año_int = int(año)
-                    if año_int < 1900 or año_int > 2030:
-                        errors.append(f"Fila {index + 2}: Año '{año}' fuera del rango válido (1900-2030)")
-                except ValueError:
-                    errors.append(f"Fila {index + 2}: Año '{año}' no es un número válido")
-        
-        return {
-            'is_valid': len(errors) == 0,
-            'errors': errors
-        }
+        validator = MaquinasValidator()
+        validator.validate_chunk((index + 2, row) for index, row in enumerate(data))
+        return validator.result()
     
     @staticmethod
-    def import_maquinas_from_csv(file_path):
+    def import_maquinas_from_csv(file_path, chunk_size=None, progress=None, on_duplicate=ON_DUPLICATE_REJECT):
         """Importa máquinas desde CSV"""
-        # Parsear CSV
-        csv_data = ImportService.parse_csv(file_path)
-        
-        # Validar datos
-        validation = ImportService.validate_maquinas_data(csv_data)
-        if not validation['is_valid']:
-            return {
-                'imported': [],
-                'errors': validation['errors'],
-                'total': len(csv_data)
-            }
-        
-        # Importar datos
-        imported = []
-        errors = []
-        
-        for index, row in enumerate(csv_data):
-            try:
-                # Convertir valores
-                año = None
-                if row.get('año') and str(row['año']).strip():
-                    try:
-                        año = int(row['año'])
-                    except ValueError:
-                        pass
-                
-                horas_trabajo = 0
-                if row.get('horas_trabajo') and str(row['horas_trabajo']).strip():
-                    try:
-                        horas_trabajo = float(row['horas_trabajo'])
-                    except ValueError:
-                        horas_trabajo = 0
-                
-                activo = True
-                if row.get('activo'):
-                    activo_str = str(row['activo']).lower().strip()
-                    activo = activo_str in ['true', '1', 'si', 'yes', 'verdadero']
-                
-                maquina = Maquina(
-                    nombre=row['nombre'],
-                    marca=row.get('marca', ''),
-                    modelo=row.get('modelo', ''),
-                    numero_serie=row.get('numero_serie') if row.get('numero_serie') else None,
-                    año=año,
-                    tipo=row.get('tipo', ''),
-                    estado=row.get('estado', 'operativo'),
-                    horas_trabajo=horas_trabajo,
-                    ubicacion=row.get('ubicacion', ''),
-                    observaciones=row.get('observaciones', ''),
-                    activo=activo
-                )
-                
-                db.session.add(maquina)
-                imported.append(maquina.to_dict())
-                
-            except Exception as e:
-                errors.append(f"Fila {index + 2}: {str(e)}")
-        
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return {
-                'imported': [],
-                'errors': [f"Error al guardar en base de datos: {str(e)}"],
-                'total': len(csv_data)
-            }
-        
-        return {
-            'imported': imported,
-            'errors': errors,
-            'total': len(csv_data)
-        }
+        return import_csv(file_path, Maquina, MaquinasValidator(), maquina_values, chunk_size, progress, on_duplicate)
     
     @staticmethod
     def get_maquinas_template():
@@ -164,160 +226,19 @@ class ImportService:
             'activo': ['True', 'True']
         }
         
-        df = pd.DataFrame(template_data)
-        
-        # Crear CSV en memoria
-        output = io.StringIO()
-        df.to_csv(output, index=False, encoding='utf-8')
-        output.seek(0)
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        response.headers['Content-Disposition'] = 'attachment; filename=plantilla_maquinas.csv'
-        
-        return response
+        return _csv_response(template_data, 'plantilla_maquinas.csv')
     
     @staticmethod
     def validate_componentes_data(data):
         """Valida los datos de componentes"""
-        errors = []
-        required_fields = ['nombre']
-        
-        for index, row in enumerate(data):
-            # Validar campos requeridos
-            for field in required_fields:
-                if not row.get(field) or str(row[field]).strip() == '':
-                    errors.append(f"Fila {index + 2}: Campo '{field}' es requerido")
-            
-            # Validar número de parte único si existe
-            numero_parte = row.get('numero_parte')
-            if numero_parte and str(numero_parte).strip():
-                # Verificar duplicados en el mismo CSV
-                duplicates = [i for i, other in enumerate(data) 
-                             if i != index and other.get('numero_parte') == numero_parte]
-                if duplicates:
-                    errors.append(f"Fila {index + 2}: Número de parte '{numero_parte}' duplicado en el CSV")
-                
-                # Verificar si ya existe en la base de datos
-                existing = Componente.query.filter_by(numero_parte=numero_parte).first()
-                if existing:
-                    errors.append(f"Fila {index + 2}: Número de parte '{numero_parte}' ya existe en la base de datos")
-            
-            # Validar precio unitario si existe
-            precio = row.get('precio_unitario')
-            if precio and str(precio).strip():
-                try:
-                    precio_float = float(precio)
-                    if precio_float < 0:
-                        errors.append(f"Fila {index + 2}: Precio unitario no puede ser negativo")
-                except ValueError:
-                    errors.append(f"Fila {index + 2}: Precio unitario '{precio}' no es un número válido")
-            
-            # Validar stock mínimo si existe
-            stock_minimo = row.get('stock_minimo')
-            if stock_minimo and str(stock_minimo).strip():
-                try:
-                    stock_int = int(stock_minimo)
-                    if stock_int < 0:
-                        errors.append(f"Fila {index + 2}: Stock mínimo no puede ser negativo")
-                except ValueError:
-                    errors.append(f"Fila {index + 2}: Stock mínimo '{stock_minimo}' no es un número válido")
-            
-            # Validar stock actual si existe
-            stock_actual = row.get('stock_actual')
-            if stock_actual and str(stock_actual).strip():
-                try:
-                    stock_int = int(stock_actual)
-                    if stock_int < 0:
-                        errors.append(f"Fila {index + 2}: Stock actual no puede ser negativo")
-                except ValueError:
-                    errors.append(f"Fila {index + 2}: Stock actual '{stock_actual}' no es un número válido")
-        
-        return {
-            'is_valid': len(errors) == 0,
-            'errors': errors
-        }
+        validator = ComponentesValidator()
+        validator.validate_chunk((index + 2, row) for index, row in enumerate(data))
+        return validator.result()
     
     @staticmethod
-    def import_componentes_from_csv(file_path):
+    def import_componentes_from_csv(file_path, chunk_size=None, progress=None, on_duplicate=ON_DUPLICATE_REJECT):
         """Importa componentes desde CSV"""
-        # Parsear CSV
-        csv_data = ImportService.parse_csv(file_path)
-        
-        # Validar datos
-        validation = ImportService.validate_componentes_data(csv_data)
-        if not validation['is_valid']:
-            return {
-                'imported': [],
-                'errors': validation['errors'],
-                'total': len(csv_data)
-            }
-        
-        # Importar datos
-        imported = []
-        errors = []
-        
-        for index, row in enumerate(csv_data):
-            try:
-                # Convertir valores
-                precio_unitario = 0
-                if row.get('precio_unitario') and str(row['precio_unitario']).strip():
-                    try:
-                        precio_unitario = float(row['precio_unitario'])
-                    except ValueError:
-                        precio_unitario = 0
-                
-                stock_minimo = 0
-                if row.get('stock_minimo') and str(row['stock_minimo']).strip():
-                    try:
-                        stock_minimo = int(row['stock_minimo'])
-                    except ValueError:
-                        stock_minimo = 0
-                
-                stock_actual = 0
-                if row.get('stock_actual') and str(row['stock_actual']).strip():
-                    try:
-                        stock_actual = int(row['stock_actual'])
-                    except ValueError:
-                        stock_actual = 0
-                
-                activo = True
-                if row.get('activo'):
-                    activo_str = str(row['activo']).lower().strip()
-                    activo = activo_str in ['true', '1', 'si', 'yes', 'verdadero']
-                
-                componente = Componente(
-                    nombre=row['nombre'],
-                    descripcion=row.get('descripcion', ''),
-                    numero_parte=row.get('numero_parte') if row.get('numero_parte') else None,
-                    categoria=row.get('categoria', ''),
-                    precio_unitario=precio_unitario,
-                    stock_minimo=stock_minimo,
-                    stock_actual=stock_actual,
-                    activo=activo
-                )
-                
-                db.session.add(componente)
-                imported.append(componente.to_dict())
-                
-            except Exception as e:
-                errors.append(f"Fila {index + 2}: {str(e)}")
-        
-        try:
-            db.session.commit()
-        except Exception as e:
-            db.session.rollback()
-            return {
-                'imported': [],
-                'errors': [f"Error al guardar en base de datos: {str(e)}"],
-                'total': len(csv_data)
-            }
-        
-        return {
-            'imported': imported,
-            'errors': errors,
-            'total': len(csv_data)
-        }
+        return import_csv(file_path, Componente, ComponentesValidator(), componente_values, chunk_size, progress, on_duplicate)
     
     @staticmethod
     def get_componentes_template():
@@ -333,15 +254,4 @@ class ImportService:
             'activo': ['True', 'True', 'True']
         }
         
-        df = pd.DataFrame(template_data)
-        
-        # Crear CSV en memoria
-        output = io.StringIO()
-        df.to_csv(output, index=False, encoding='utf-8')
-        output.seek(0)
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-        response.headers['Content-Disposition'] = 'attachment; filename=plantilla_componentes.csv'
-        
-        return response
\ No newline at end of file
+        return _csv_response(template_data, 'plantilla_componentes.csv')
@@ -0,0 +1,242 @@
+"""
+Ejecución de tareas pesadas fuera del request
+
+Las tareas (importaciones, estadísticas) se registran por tipo con
+@register_job y se encolan con enqueue(): se guarda una fila en la tabla
+`jobs` y un pool de threads la ejecuta dentro de un app context propio.
+El estado, el progreso y la cancelación viven en la base, por lo que
+cualquier worker de gunicorn puede consultarlos o cancelar la tarea.
+"""
+import json
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import update
+from ..models.job import Job
+from ..utils.db import db
+
+DEFAULT_WORKERS = 2
+# Segundos mínimos entre escrituras de progreso en la tabla
+PROGRESS_INTERVAL = 1.0
+# Intervalos de progreso sin actividad tras los que una tarea se da por abandonada
+STALE_INTERVALS = 60
+WORKER_TERMINADO = 'worker terminado'
+# Errores guardados en el resultado (se informa el total)
+MAX_ERRORES_GUARDADOS = 1000
+
+# tipo -> (función, publico); solo los públicos se encolan con POST /jobs
+JOB_HANDLERS = {}
+
+
+class JobCancelled(Exception):
+    """Se solicitó la cancelación de la tarea"""
+
+
+def register_job(tipo, publico=False):
+    """
+    Registrar una función como tipo de tarea
+    
+    La función recibe (job, **parametros), donde job es un JobContext
+    para informar progreso. `publico` permite encolarla desde POST /jobs;
+    las que reciben rutas de archivo se encolan solo desde su endpoint.
+    """
+    def decorator(func):
+        JOB_HANDLERS[tipo] = (func, publico)
+        return func
+    return decorator
+
+
+def is_public(tipo):
+    return tipo in JOB_HANDLERS and JOB_HANDLERS[tipo][1]
+
+
+class JobContext:
+    """Progreso y cancelación de una tarea en ejecución"""
+    
+    def __init__(self, job_id, interval=PROGRESS_INTERVAL):
+        self.job_id = job_id
+        self.interval = interval
+        self._ultimo = 0
+    
+    def progress(self, fase, filas=0, porcentaje=0):
+        """
+        Guardar el progreso (como mucho una vez por intervalo)
+        
+        Usa una conexión propia para no confirmar el trabajo pendiente de la
+        sesión de la tarea. Lanza JobCancelled si se pidió cancelar.
+        """
+        ahora = time.monotonic()
+        if ahora - self._ultimo < self.interval and porcentaje < 100:
+            return
+        self._ultimo = ahora
+        
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(Job.__table__)
+                .where(Job.__table__.c.id == self.job_id)
+                .values(fase=fase, filas=filas, progreso=porcentaje, updated_at=datetime.utcnow())
+            )
+            cancelar = conn.execute(
+                db.select(Job.__table__.c.cancelar).where(Job.__table__.c.id == self.job_id)
+            ).scalar()
+        
+        if cancelar:
+            raise JobCancelled()
+    
+    # Compatible con el callback progress(fase, filas, porcentaje) de ImportService
+    __call__ = progress
+
+
+def _executor(app):
+    executor = app.extensions.get('job_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=app.config.get('JOB_WORKERS', DEFAULT_WORKERS),
+            thread_name_prefix='job'
+        )
+        app.extensions['job_executor'] = executor
+    return executor
+
+
+def _truncar_errores(resultado):
+    if isinstance(resultado, dict) and len(resultado.get('errors') or []) > MAX_ERRORES_GUARDADOS:
+        resultado = dict(resultado)
+        resultado['errors_total'] = len(resultado['errors'])
+        resultado['errors'] = resultado['errors'][:MAX_ERRORES_GUARDADOS]
+    return resultado
+
+
+def _finalizar(job_id, estado, **values):
+    db.session.rollback()
+    job = db.session.get(Job, job_id)
+    job.estado = estado
+    job.finished_at = datetime.utcnow()
+    for key, value in values.items():
+        setattr(job, key, value)
+    db.session.commit()
+
+
+def _descartar_archivo(job):
+    """Borrar el archivo subido de una tarea que no llega a ejecutarse"""
+    file_path = json.loads(job.parametros or '{}').get('file_path')
+    if file_path:
+        # Requiere Pillow; solo se importa si hay un archivo que borrar
+        from .file_service import FileService
+        FileService.cleanup_temp_file(file_path)
+
+
+def _run(app, job_id):
+    with app.app_context():
+        try:
+            job = db.session.get(Job, job_id)
+            if job is None:
+                return
+            if job.estado != Job.PENDIENTE:
+                # Cancelada antes de empezar: el handler no borrará el archivo
+                if job.finalizado:
+                    _descartar_archivo(job)
+                return
+            if job.cancelar:
+                _descartar_archivo(job)
+                _finalizar(job_id, Job.CANCELADO)
+                return
+            
+            handler, _ = JOB_HANDLERS[job.tipo]
+            parametros = json.loads(job.parametros or '{}')
+            job.estado = Job.EN_PROCESO
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+            
+            try:
+                resultado = handler(JobContext(job_id, app.config.get('JOB_PROGRESS_INTERVAL', PROGRESS_INTERVAL)), **parametros)
+            except JobCancelled:
+                _finalizar(job_id, Job.CANCELADO)
+            except Exception as e:
+                app.logger.exception(f"Error en tarea {job_id} ({job.tipo})")
+                _finalizar(job_id, Job.ERROR, error=str(e))
+            else:
+                _finalizar(
+                    job_id, Job.COMPLETADO,
+                    progreso=100,
+                    resultado=json.dumps(_truncar_errores(resultado), default=str)
+                )
+        except Exception:
+            app.logger.exception(f"Error ejecutando la tarea {job_id}")
+        finally:
+            db.session.remove()
+
+
+def enqueue(tipo, **parametros):
+    """Crear la tarea y enviarla al pool; devuelve el Job pendiente"""
+    if tipo not in JOB_HANDLERS:
+        raise ValueError(f"Tipo de tarea desconocido: {tipo}")
+    
+    job = Job(id=uuid.uuid4().hex, tipo=tipo, estado=Job.PENDIENTE, parametros=json.dumps(parametros))
+    db.session.add(job)
+    db.session.commit()
+    
+    app = current_app._get_current_object()
+    _executor(app).submit(_run, app, job.id)
+    return job
+
+
+def cancel(job_id):
+    """
+    Solicitar la cancelación
+    
+    Una tarea pendiente se cancela en el momento; una en proceso se detiene
+    en su próximo informe de progreso (los lotes ya confirmados se mantienen).
+    """
+    job = db.session.get(Job, job_id)
+    if job is None or job.finalizado:
+        return job
+    
+    job.cancelar = True
+    if job.estado == Job.PENDIENTE:
+        job.estado = Job.CANCELADO
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def mark_abandoned(app):
+    """
+    Marcar como error las tareas en proceso sin actividad reciente
+    
+    El pool de threads vive en el proceso que encoló la tarea: si ese worker
+    terminó (reinicio, deploy, OOM), la tarea quedaría en proceso para siempre.
+    Una tarea en proceso actualiza updated_at en cada informe de progreso, así
+    que se da por abandonada tras JOB_STALE_INTERVALS intervalos sin cambios.
+    Las pendientes no se tocan: una que solo espera turno detrás de otras
+    tareas largas en un worker vivo tampoco cambia updated_at. Una pendiente
+    huérfana puede cancelarse con POST /jobs/<id>/cancel.
+    Devuelve la cantidad de tareas marcadas.
+    """
+    intervalo = app.config.get('JOB_PROGRESS_INTERVAL', PROGRESS_INTERVAL)
+    limite = app.config.get('JOB_STALE_INTERVALS', STALE_INTERVALS) * intervalo
+    ahora = datetime.utcnow()
+    
+    resultado = db.session.execute(
+        update(Job)
+        .where(Job.estado == Job.EN_PROCESO)
+        .where(Job.updated_at < ahora - timedelta(seconds=limite))
+        .values(estado=Job.ERROR, error=WORKER_TERMINADO, finished_at=ahora, updated_at=ahora)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return resultado.rowcount
+
+
+def init_jobs(app):
+    """Crear la tabla de tareas si falta, cerrar las abandonadas y registrar los tipos de tarea"""
+    # Los módulos registran sus tareas al importarse
+    from . import import_service, bulk_import_service  # noqa: F401
+    
+    with app.app_context():
+        Job.__table__.create(db.engine, checkfirst=True)
+        abandonadas = mark_abandoned(app)
+        if abandonadas:
+            app.logger.warning(f"{abandonadas} tareas sin worker marcadas como error")
@@ -0,0 +1,129 @@
+"""
+Salud de las conexiones a la base de datos
+
+En lugar de verificar la conexión con un SELECT 1 antes de cada request,
+se escuchan los errores del engine (evento handle_error): el request donde
+falló una sentencia queda marcado y solo esa sesión se descarta al final.
+Las conexiones caídas las detecta pool_pre_ping al sacarlas del pool, así
+que el camino normal no agrega consultas. /health informa el estado del
+pool y los contadores de errores sin tocar la base.
+"""
+import threading
+import time
+from flask import g, has_app_context
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from .db import db
+
+# Mensajes de PostgreSQL que dejan la transacción inutilizable
+ABORTED_MARKERS = ('current transaction is aborted', 'in failed sql transaction')
+
+
+class ConnectionHealth:
+    """Contadores de errores de base de datos del proceso"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.errors = 0
+        self.disconnects = 0
+        self.aborted_transactions = 0
+        self.session_resets = 0
+        self.last_error = None
+        self.last_error_at = None
+    
+    def record_error(self, exception, is_disconnect):
+        mensaje = str(getattr(exception, 'orig', None) or exception)
+        with self._lock:
+            self.errors += 1
+            if is_disconnect:
+                self.disconnects += 1
+            if any(marker in mensaje.lower() for marker in ABORTED_MARKERS):
+                self.aborted_transactions += 1
+            self.last_error = mensaje.splitlines()[0][:200] if mensaje else type(exception).__name__
+            self.last_error_at = time.time()
+    
+    def record_reset(self):
+        with self._lock:
+            self.session_resets += 1
+    
+    def to_dict(self):
+        with self._lock:
+            return {
+                'errors': self.errors,
+                'disconnects': self.disconnects,
+                'aborted_transactions': self.aborted_transactions,
+                'session_resets': self.session_resets,
+                'last_error': self.last_error,
+                'seconds_since_last_error': round(time.time() - self.last_error_at, 1) if self.last_error_at else None
+            }
+
+
+health = ConnectionHealth()
+
+
+def _on_engine_error(context):
+    """Evento handle_error: contar el error y marcar la sesión del request"""
+    health.record_error(context.original_exception, context.is_disconnect)
+    if has_app_context():
+        g.db_session_failed = True
+
+
+def session_failed():
+    return has_app_context() and g.get('db_session_failed', False)
+
+
+def reset_session():
+    """Descartar la sesión actual (rollback y devolver la conexión al pool), sin consultas extra"""
+    try:
+        db.session.rollback()
+    finally:
+        db.session.remove()
+        health.record_reset()
+        if has_app_context():
+            g.db_session_failed = False
+
+
+def pool_status():
+    """Estado del pool del engine (no ejecuta consultas)"""
+    pool = db.engine.pool
+    status = {'class': type(pool).__name__}
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        method = getattr(pool, name, None)
+        if callable(method):
+            status[name] = method()
+    return status
+
+
+def check_connection():
+    """Consulta real a la base; solo para /health?deep=true"""
+    inicio = time.perf_counter()
+    try:
+        with db.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        return {'ok': True, 'latency_ms': round((time.perf_counter() - inicio) * 1000, 1)}
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+
+
+def init_db_health(app):
+    """Registrar el listener de errores y la limpieza de sesiones fallidas"""
+    if not event.contains(Engine, 'handle_error', _on_engine_error):
+        event.listen(Engine, 'handle_error', _on_engine_error)
+    
+    @app.after_request
+    def cleanup_database_session(response):
+        """Confirmar o descartar la sesión del request"""
+        try:
+            if session_failed():
+                reset_session()
+            elif db.session().in_transaction():
+                # Sin transacción abierta no hay nada que confirmar ni revertir
+                if response.status_code < 400:
+                    db.session.commit()
+                else:
+                    db.session.rollback()
+        except Exception as e:
+            app.logger.warning(f"Error en cleanup de sesión: {e}")
+            reset_session()
+        
+        return response
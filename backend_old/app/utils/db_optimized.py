@@ -241,16 +241,12 @@ def optimize_query_performance():
 
 # Función para logs de rendimiento
 def log_slow_queries(app):
-    """Configurar logging para queries lentas"""
+    """
+    Configurar logging para queries lentas
     
-    @app.before_request
-    def start_timer():
-        app.start_time = time.time()
-    
-    @app.after_request
-    def log_request(response):
-        if hasattr(app, 'start_time'):
-            duration = time.time() - app.start_time
-            if duration > 1.0:  # Log requests que tomen más de 1 segundo
-                print(f"🐌 Query lenta detectada: {duration:.2f}s en {request.endpoint}")
-        return response
+    Se mantiene por compatibilidad: el tiempo se mide por request y por
+    consulta en utils/query_profiler (antes se guardaba en app.start_time,
+    compartido entre threads).
+    """
+    from .query_profiler import init_query_profiler
+    init_query_profiler(app)
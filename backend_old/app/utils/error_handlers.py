@@ -7,7 +7,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError, InternalError, Opera
 from werkzeug.exceptions import HTTPException
 from .exceptions import BaseAPIException
 from .logging_config import get_logger, log_error
-from .db import reset_transaction
+from .db_health import reset_session
 from typing import Tuple, Dict, Any
 import psycopg2
 
@@ -46,8 +46,8 @@ def register_error_handlers(app):
             'endpoint': request.endpoint
         })
         
-        # Resetear la transacción
-        reset_transaction()
+        # Descartar la sesión fallida (vuelve limpia al pool)
+        reset_session()
         
         # Determinar el tipo específico de error
         error_str = str(error.orig) if hasattr(error, 'orig') else str(error)
@@ -79,8 +79,8 @@ def register_error_handlers(app):
             'endpoint': request.endpoint
         })
         
-        # Resetear la transacción por si acaso
-        reset_transaction()
+        # Descartar la sesión; pool_pre_ping repone la conexión si se cayó
+        reset_session()
         
         response_data = {
             'error': True,
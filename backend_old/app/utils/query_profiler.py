@@ -0,0 +1,239 @@
+"""
+Perfil de consultas SQL por request
+
+Los eventos before/after_cursor_execute del engine miden cada sentencia y
+la acumulan en el perfil del request actual (flask.g), así que los threads
+de un mismo worker no se pisan entre sí. Al terminar el request:
+
+- Se agrega el header Server-Timing (db y app) para verlo en el navegador.
+- Si el request o alguna consulta supera el umbral, o una misma sentencia
+  se repite muchas veces (patrón N+1), se escribe un log estructurado con
+  las consultas más lentas y sus parámetros.
+- Se acumulan totales por endpoint; /debug/queries lista los endpoints con
+  más tiempo de base de datos del proceso.
+"""
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from flask import g, has_app_context, request, jsonify, abort
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('elorza_backend.queries')
+
+SLOW_QUERY_MS = 200
+SLOW_REQUEST_MS = 1000
+N_PLUS_ONE_THRESHOLD = 10
+# Consultas lentas conservadas por request
+TOP_QUERIES = 5
+MAX_PARAMS_LENGTH = 300
+
+_PARAMETRO = r'(?:\?|%\(\w+\)s|%s|:\w+)'
+_LISTAS_PARAMETROS = re.compile(rf'\(\s*{_PARAMETRO}(?:\s*,\s*{_PARAMETRO})*\s*\)')
+_LITERALES = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_ESPACIOS = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Forma de la sentencia: sin literales, listas IN colapsadas y espacios normalizados"""
+    forma = _LITERALES.sub('?', statement)
+    forma = _LISTAS_PARAMETROS.sub('(?)', forma)
+    return _ESPACIOS.sub(' ', forma).strip()
+
+
+def _format_params(parameters):
+    texto = repr(parameters)
+    return texto if len(texto) <= MAX_PARAMS_LENGTH else texto[:MAX_PARAMS_LENGTH] + '...'
+
+
+class QueryProfile:
+    """Consultas ejecutadas durante un request"""
+    
+    def __init__(self, top=TOP_QUERIES):
+        self.inicio = time.perf_counter()
+        self.top = top
+        self.count = 0
+        self.db_time = 0.0
+        self.shapes = {}
+        self._slowest = []
+    
+    def record(self, statement, parameters, duration):
+        self.count += 1
+        self.db_time += duration
+        
+        forma = statement_shape(statement)
+        self.shapes[forma] = self.shapes.get(forma, 0) + 1
+        
+        # Heap mínimo con las `top` consultas más lentas; los parámetros
+        # se formatean solo si la consulta entra en el heap
+        if len(self._slowest) < self.top:
+            heapq.heappush(self._slowest, (duration, self.count, statement, _format_params(parameters)))
+        elif duration > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (duration, self.count, statement, _format_params(parameters)))
+    
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.inicio
+    
+    def slowest(self):
+        return [
+            {'ms': round(duration * 1000, 2), 'orden': orden, 'sql': statement, 'params': params}
+            for duration, orden, statement, params in sorted(self._slowest, reverse=True)
+        ]
+    
+    def repeated(self, threshold=N_PLUS_ONE_THRESHOLD):
+        """Sentencias que se repitieron al menos `threshold` veces (posible N+1)"""
+        return sorted(
+            ({'sql': forma, 'veces': veces} for forma, veces in self.shapes.items() if veces >= threshold),
+            key=lambda item: item['veces'], reverse=True
+        )
+
+
+class EndpointStats:
+    """Totales de base de datos por endpoint en este proceso"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def add(self, endpoint, profile, elapsed):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'queries': 0, 'db_time': 0.0, 'total_time': 0.0, 'max_db_time': 0.0, 'n_plus_one': 0
+            })
+            stats['requests'] += 1
+            stats['queries'] += profile.count
+            stats['db_time'] += profile.db_time
+            stats['total_time'] += elapsed
+            stats['max_db_time'] = max(stats['max_db_time'], profile.db_time)
+    
+    def flag_n_plus_one(self, endpoint):
+        with self._lock:
+            if endpoint in self._stats:
+                self._stats[endpoint]['n_plus_one'] += 1
+    
+    def top(self, limit=20):
+        with self._lock:
+            items = [(endpoint, dict(stats)) for endpoint, stats in self._stats.items()]
+        
+        items.sort(key=lambda item: item[1]['db_time'], reverse=True)
+        return [
+            {
+                'endpoint': endpoint,
+                'requests': stats['requests'],
+                'db_ms_total': round(stats['db_time'] * 1000, 1),
+                'db_ms_promedio': round(stats['db_time'] / stats['requests'] * 1000, 2),
+                'db_ms_max': round(stats['max_db_time'] * 1000, 2),
+                'queries_promedio': round(stats['queries'] / stats['requests'], 1),
+                'ms_promedio': round(stats['total_time'] / stats['requests'] * 1000, 2),
+                'requests_n_plus_one': stats['n_plus_one']
+            }
+            for endpoint, stats in items[:limit]
+        ]
+    
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+endpoint_stats = EndpointStats()
+
+
+def current_profile():
+    return g.get('query_profile') if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de ejecución: si la sentencia falla no queda nada pendiente
+    context._query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_query_start', None)
+    profile = current_profile()
+    if inicio is None or profile is None:
+        return
+    
+    profile.record(statement, parameters, time.perf_counter() - inicio)
+
+
+def _server_timing(profile, elapsed):
+    return (
+        f'db;dur={profile.db_time * 1000:.1f};desc="{profile.count} queries", '
+        f'app;dur={elapsed * 1000:.1f}'
+    )
+
+
+def _log_request(app, profile, elapsed, repeated):
+    slow_query_ms = app.config.get('SLOW_QUERY_MS', SLOW_QUERY_MS)
+    slowest = profile.slowest()
+    lentas = [query for query in slowest if query['ms'] >= slow_query_ms]
+    
+    if not (elapsed * 1000 >= app.config.get('SLOW_REQUEST_MS', SLOW_REQUEST_MS) or lentas or repeated):
+        return
+    
+    logger.warning(json.dumps({
+        'event': 'db_profile',
+        'method': request.method,
+        'path': request.path,
+        'endpoint': request.endpoint,
+        'ms': round(elapsed * 1000, 1),
+        'db_ms': round(profile.db_time * 1000, 1),
+        'queries': profile.count,
+        'slowest': slowest,
+        'n_plus_one': repeated
+    }, default=str, ensure_ascii=False))
+
+
+def init_query_profiler(app):
+    """Registrar los eventos del engine, los hooks del request y /debug/queries"""
+    if not app.config.get('QUERY_PROFILER_ENABLED', True):
+        return
+    
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    
+    @app.before_request
+    def start_query_profile():
+        g.query_profile = QueryProfile()
+    
+    @app.after_request
+    def finish_query_profile(response):
+        profile = g.pop('query_profile', None)
+        if profile is None:
+            return response
+        
+        elapsed = profile.elapsed
+        endpoint = request.endpoint or 'sin_endpoint'
+        repeated = profile.repeated(app.config.get('N_PLUS_ONE_THRESHOLD', N_PLUS_ONE_THRESHOLD))
+        
+        endpoint_stats.add(endpoint, profile, elapsed)
+        if repeated:
+            endpoint_stats.flag_n_plus_one(endpoint)
+        
+        if app.config.get('SERVER_TIMING_ENABLED', True):
+            response.headers.add('Server-Timing', _server_timing(profile, elapsed))
+        
+        try:
+            _log_request(app, profile, elapsed, repeated)
+        except Exception as e:
+            app.logger.warning(f"Error registrando el perfil de consultas: {e}")
+        
+        return response
+    
+    @app.route('/debug/queries', methods=['GET', 'DELETE'])
+    def debug_queries():
+        """Endpoints con más tiempo de base de datos (?limit=); DELETE reinicia los totales"""
+        if not app.config.get('QUERY_PROFILER_DEBUG_ENDPOINT', app.debug):
+            abort(404)
+        
+        if request.method == 'DELETE':
+            endpoint_stats.reset()
+            return jsonify({'success': True})
+        
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        return jsonify({'success': True, 'data': endpoint_stats.top(limit)})
@@ -0,0 +1,51 @@
+"""
+Límite de tamaño de request por ruta
+
+MAX_CONTENT_LENGTH (16MB) vale para toda la aplicación; las rutas de
+importación aceptan archivos de hasta MAX_IMPORT_FILE_SIZE porque el CSV se
+procesa en streaming. Flask 2.3 expone request.max_content_length como una
+vista de solo lectura de la configuración: ImportRequest le agrega el setter
+(como Flask 3.1) y @limite_importacion lo sube solo en esas rutas.
+"""
+from functools import wraps
+from flask import Request, current_app, request
+from werkzeug.exceptions import RequestEntityTooLarge
+
+# Por defecto igual a FileService.MAX_CSV_SIZE (ese módulo requiere Pillow)
+DEFAULT_MAX_IMPORT_FILE_SIZE = 64 * 1024 * 1024
+
+
+class ImportRequest(Request):
+    """Request cuyo max_content_length puede cambiarse antes de leer el cuerpo"""
+    
+    _max_content_length = None
+    
+    @property
+    def max_content_length(self):
+        if self._max_content_length is not None:
+            return self._max_content_length
+        return super().max_content_length
+    
+    @max_content_length.setter
+    def max_content_length(self, value):
+        self._max_content_length = value
+
+
+def limite_importacion(view):
+    """Aceptar en la ruta cuerpos de hasta MAX_IMPORT_FILE_SIZE en lugar de MAX_CONTENT_LENGTH"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        limite = current_app.config.get('MAX_IMPORT_FILE_SIZE', DEFAULT_MAX_IMPORT_FILE_SIZE)
+        # Rechazar antes de leer el cuerpo (la vista trata cualquier error como 500)
+        if request.content_length is not None and request.content_length > limite:
+            raise RequestEntityTooLarge()
+        # Sin init_upload_limits() rige MAX_CONTENT_LENGTH para toda la aplicación
+        if isinstance(request._get_current_object(), ImportRequest):
+            request.max_content_length = limite
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_upload_limits(app):
+    """Usar ImportRequest para que @limite_importacion pueda ajustar el límite"""
+    app.request_class = ImportRequest
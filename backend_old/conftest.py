@@ -0,0 +1,85 @@
+"""
+Fixtures de pytest para backend_old
+
+Las pruebas arman una aplicación mínima (SQLite en un archivo temporal) en
+lugar de create_app(), que toma la configuración de PostgreSQL del entorno.
+Los módulos se importan como backend_old.app...: el nombre `app` lo usa
+backend_new en la misma sesión de pytest.
+"""
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from backend_old.app.utils.db import db as _db
+from backend_old.app import models  # noqa: F401
+
+
+@pytest.fixture
+def app(tmp_path):
+    """Aplicación con base SQLite en archivo (los threads de las tareas comparten la base)"""
+    app = Flask(__name__)
+    app.config.update(
+        TESTING=True,
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'backend_old.db'}",
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        JOB_PROGRESS_INTERVAL=0,
+        UPLOAD_FOLDER=str(tmp_path / 'uploads'),
+    )
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+        yield app
+        executor = app.extensions.get('job_executor')
+        if executor is not None:
+            executor.shutdown(wait=True)
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def api_app(app):
+    """La aplicación con el blueprint /api/v1 (requiere las dependencias de las rutas)"""
+    pytest.importorskip('PIL')
+    from backend_old.app.routes.api import api_bp
+    from backend_old.app.utils.upload_limits import init_upload_limits
+    app.register_blueprint(api_bp, url_prefix='/api/v1')
+    init_upload_limits(app)
+    return app
+
+
+@pytest.fixture
+def client(api_app):
+    return api_app.test_client()
+
+
+@contextmanager
+def _contar_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries(db):
+    """Context manager que registra las sentencias SQL ejecutadas"""
+    return lambda: _contar_queries(db.engine)
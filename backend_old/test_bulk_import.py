@@ -0,0 +1,164 @@
+"""
+Pruebas de la escritura masiva de importaciones (altas, actualizaciones, rechazos y lotes fallidos)
+"""
+import io
+
+import pytest
+from flask import request
+
+pytest.importorskip('chardet')
+pytest.importorskip('PIL')
+
+from backend_old.app.models import Maquina
+from backend_old.app.services import import_service
+from backend_old.app.services.bulk_import_service import write_batch, bulk_import_machines
+from backend_old.app.services.import_service import ImportService
+
+ENCABEZADO = 'numero_serie,nombre,marca,horas_trabajo\n'
+
+
+def _valores(*codigos, marca='Deere'):
+    return [{'codigo': codigo, 'nombre': f'Tractor {codigo}', 'marca': marca, 'activo': True} for codigo in codigos]
+
+
+def _csv(tmp_path, *filas):
+    ruta = tmp_path / 'maquinas.csv'
+    ruta.write_text(ENCABEZADO + ''.join(f'{fila}\n' for fila in filas), encoding='utf-8')
+    return str(ruta)
+
+
+def _marcas():
+    return {m.codigo: m.marca for m in Maquina.query.all()}
+
+
+def _fallar_en_el_lote(monkeypatch, numero):
+    original = import_service.write_batch
+    llamadas = []
+
+    def write_batch_que_falla(*args, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) == numero:
+            raise RuntimeError('disco lleno')
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(import_service, 'write_batch', write_batch_que_falla)
+
+
+def test_write_batch_inserta_actualiza_y_rechaza(db):
+    assert write_batch(Maquina, 'codigo', _valores('A', 'B')) == {'inserted': 2, 'updated': 0}
+    db.session.commit()
+
+    with pytest.raises(ValueError, match='Claves ya existentes: B'):
+        write_batch(Maquina, 'codigo', _valores('B', 'C'))
+    db.session.rollback()
+
+    resultado = write_batch(Maquina, 'codigo', _valores('B', 'C', marca='Fiat'), update_existing=True)
+    db.session.commit()
+    assert resultado == {'inserted': 1, 'updated': 1}
+    assert _marcas() == {'A': 'Deere', 'B': 'Fiat', 'C': 'Fiat'}
+    assert write_batch(Maquina, 'codigo', []) == {'inserted': 0, 'updated': 0}
+
+
+def test_importar_csv_con_existentes(db, tmp_path):
+    db.session.bulk_insert_mappings(Maquina, _valores('MS-2'))
+    db.session.commit()
+    ruta = _csv(tmp_path, 'MS-1,Tractor 1,Fiat,10', 'MS-2,Tractor 2,Fiat,20', 'MS-3,Tractor 3,Fiat,30')
+
+    rechazo = ImportService.import_maquinas_from_csv(ruta, chunk_size=2)
+    assert (rechazo['imported'], rechazo['updated']) == (0, 0)
+    assert rechazo['errors'] == ["Fila 3: Número de serie 'MS-2' ya existe en la base de datos"]
+
+    actualizacion = ImportService.import_maquinas_from_csv(ruta, chunk_size=2, on_duplicate='update')
+    assert (actualizacion['imported'], actualizacion['updated'], actualizacion['errors']) == (2, 1, [])
+    assert actualizacion['partial'] is False
+    assert actualizacion['committed_through_row'] == 4
+    assert _marcas() == {'MS-1': 'Fiat', 'MS-2': 'Fiat', 'MS-3': 'Fiat'}
+
+
+def test_lote_fallido_a_mitad_de_archivo(db, tmp_path, monkeypatch):
+    _fallar_en_el_lote(monkeypatch, 2)
+    ruta = _csv(tmp_path, *(f'MS-{i},Tractor {i},Deere,{i}' for i in range(1, 6)))
+
+    resultado = ImportService.import_maquinas_from_csv(ruta, chunk_size=2)
+
+    assert resultado['imported'] == 2
+    assert resultado['partial'] is True
+    assert resultado['committed_through_row'] == 3
+    assert resultado['errors'] == ['Error al guardar en base de datos (filas 4-5): disco lleno']
+    assert sorted(_marcas()) == ['MS-1', 'MS-2']
+
+
+def test_falla_el_primer_lote_no_es_parcial(db, tmp_path, monkeypatch):
+    _fallar_en_el_lote(monkeypatch, 1)
+    ruta = _csv(tmp_path, 'MS-1,Tractor 1,Deere,1')
+
+    resultado = ImportService.import_maquinas_from_csv(ruta)
+
+    assert resultado['imported'] == 0
+    assert resultado['partial'] is False
+    assert resultado['committed_through_row'] is None
+    assert Maquina.query.count() == 0
+
+
+def test_respuesta_informa_lo_ya_guardado(client, db, monkeypatch):
+    _fallar_en_el_lote(monkeypatch, 2)
+    client.application.config['IMPORT_BATCH_SIZE'] = 2
+    contenido = ENCABEZADO + ''.join(f'MS-{i},Tractor {i},Deere,{i}\n' for i in range(1, 4))
+
+    response = client.post(
+        '/api/v1/maquinas/import',
+        data={'csvFile': (io.BytesIO(contenido.encode('utf-8')), 'maquinas.csv')},
+        content_type='multipart/form-data'
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert (body['imported'], body['partial'], body['committed_through_row']) == (2, True, 3)
+
+
+def test_limite_de_importacion_solo_en_las_rutas_de_importacion(client, db):
+    client.application.config.update(MAX_CONTENT_LENGTH=1000, MAX_IMPORT_FILE_SIZE=5000)
+    contenido = ENCABEZADO + ''.join(f'MS-{i},Tractor {i},Deere,{i}\n' for i in range(1, 101))
+    assert 1000 < len(contenido) < 5000
+
+    def importar(texto):
+        return client.post(
+            '/api/v1/maquinas/import',
+            data={'csvFile': (io.BytesIO(texto.encode('utf-8')), 'maquinas.csv')},
+            content_type='multipart/form-data'
+        )
+
+    assert importar(contenido).get_json()['imported'] == 100
+    assert importar(contenido * 2).status_code == 413
+    # El resto de las rutas mantiene MAX_CONTENT_LENGTH
+    with client.application.test_request_context('/api/v1/maquinas', method='POST'):
+        assert request.max_content_length == 1000
+
+
+def test_bulk_import_machines_cuenta_y_rechaza(db):
+    db.session.bulk_insert_mappings(Maquina, _valores('EX-1'))
+    db.session.commit()
+    filas = [
+        {'numero_serie': 'N-1', 'nombre': 'Tractor'},
+        {'numero_serie': 'EX-1', 'nombre': 'Existente'},
+        {'numero_serie': '', 'nombre': 'Sin serie'},
+        {'numero_serie': 'N-1', 'nombre': 'Repetida'},
+        {'numero_serie': 'N-2', 'nombre': 'Año malo', 'año': 'dos mil'},
+        {'numero_serie': 'N-3', 'nombre': 'Cosechadora'},
+    ]
+
+    resultado = bulk_import_machines(filas, batch_size=2)
+
+    assert (resultado['imported'], resultado['updated']) == (2, 0)
+    assert resultado['errors'] == [
+        "Fila 3: Máquina con número de serie 'EX-1' ya existe",
+        "Fila 4: Campo 'numero_serie' es requerido",
+        # N-1 ya se guardó con el primer lote
+        "Fila 5: Máquina con número de serie 'N-1' ya existe",
+        "Fila 6: Año inválido 'dos mil'",
+    ]
+    assert resultado['committed_through_row'] == 7
+
+    actualizado = bulk_import_machines([{'numero_serie': 'EX-1', 'nombre': 'Renombrada'}], on_duplicate='update')
+    assert (actualizado['imported'], actualizado['updated']) == (0, 1)
+    assert Maquina.query.filter_by(codigo='EX-1').one().nombre == 'Renombrada'
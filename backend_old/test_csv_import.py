@@ -0,0 +1,111 @@
+"""
+Pruebas de la lectura de CSV por bloques y de la importación
+"""
+import pytest
+
+pytest.importorskip('chardet')
+pytest.importorskip('PIL')
+
+from backend_old.app.models import Maquina
+from backend_old.app.services.csv_parser import CsvStream, CsvEncodingError, SNIFF_BYTES, detect_encoding
+from backend_old.app.services.import_service import ImportService
+
+ENCABEZADO = 'numero_serie,nombre,marca,año,tipo,horas_trabajo,activo\n'
+
+
+def _escribir(tmp_path, contenido, nombre='datos.csv'):
+    ruta = tmp_path / nombre
+    ruta.write_bytes(contenido if isinstance(contenido, bytes) else contenido.encode('utf-8'))
+    return str(ruta)
+
+
+def _maquinas(n, desde=1):
+    return ''.join(f'MS-{i},Tractor {i},Deere,2020,Tractor,{i * 10},si\n' for i in range(desde, desde + n))
+
+
+def test_bloques_y_numeracion_de_filas(tmp_path):
+    stream = CsvStream(_escribir(tmp_path, ENCABEZADO + _maquinas(7)), chunk_size=3)
+
+    bloques = list(stream)
+
+    assert [len(bloque) for bloque in bloques] == [3, 3, 1]
+    assert [fila for bloque in bloques for fila, _ in bloque] == list(range(2, 9))
+    assert bloques[1][0][1]['numero_serie'] == 'MS-4'
+    assert stream.rows_read == 7 and stream.progress == 100.0
+    # Se puede recorrer de nuevo (la importación lee el archivo dos veces)
+    assert sum(len(bloque) for bloque in stream) == 7
+
+
+def test_bloque_exacto_no_deja_bloque_vacio(tmp_path):
+    stream = CsvStream(_escribir(tmp_path, ENCABEZADO + _maquinas(6)), chunk_size=3)
+    assert [len(bloque) for bloque in stream] == [3, 3]
+
+
+def test_celdas_con_espacios_y_columnas_faltantes(tmp_path):
+    ruta = _escribir(tmp_path, ' numero_serie , nombre ,marca\n MS-1 ,  Tractor  \n')
+    (fila, datos), = CsvStream(ruta).rows()
+    assert fila == 2
+    assert datos == {'numero_serie': 'MS-1', 'nombre': 'Tractor', 'marca': ''}
+
+
+def test_latin1_despues_del_prefijo_se_lee_como_cp1252(tmp_path):
+    relleno = _maquinas(SNIFF_BYTES // 40 + 100)
+    assert len(relleno) > SNIFF_BYTES
+    ruta = _escribir(tmp_path, (ENCABEZADO + relleno).encode('utf-8') + 'MS-X,Cosechadora Año,Agrícola\n'.encode('cp1252'))
+
+    assert detect_encoding(ruta) == 'cp1252'
+    ultima = list(CsvStream(ruta).rows())[-1][1]
+    assert ultima['nombre'] == 'Cosechadora Año'
+    assert ultima['marca'] == 'Agrícola'
+
+
+def test_utf8_con_acentos_sigue_siendo_utf8(tmp_path):
+    ruta = _escribir(tmp_path, ENCABEZADO + _maquinas(3) + 'MS-Ñ,Pulverizadora Ñandú,Metalfor\n')
+    assert detect_encoding(ruta) == 'utf-8'
+    assert list(CsvStream(ruta).rows())[-1][1]['nombre'] == 'Pulverizadora Ñandú'
+
+
+def test_bytes_invalidos_informan_la_fila(tmp_path):
+    ruta = _escribir(tmp_path, (ENCABEZADO + _maquinas(4)).encode('utf-8') + b'MS-9,Tractor \xff\n')
+
+    with pytest.raises(CsvEncodingError, match='Fila 6'):
+        list(CsvStream(ruta, encoding='utf-8'))
+
+
+def test_importa_por_bloques_con_columnas_remapeadas(db, tmp_path):
+    ruta = _escribir(tmp_path, ENCABEZADO + _maquinas(5))
+    avances = []
+
+    resultado = ImportService.import_maquinas_from_csv(ruta, chunk_size=2, progress=lambda *a: avances.append(a))
+
+    assert resultado == {'imported': 5, 'updated': 0, 'errors': [], 'total': 5, 'partial': False, 'committed_through_row': 6}
+    maquina = Maquina.query.filter_by(codigo='MS-3').one()
+    assert (maquina.nombre, maquina.marca, maquina.año, maquina.tipo, maquina.horas) == ('Tractor 3', 'Deere', 2020, 'Tractor', 30)
+    assert maquina.activo is True
+    assert [fase for fase, _, _ in avances] == ['validacion'] * 3 + ['importacion'] * 3
+    assert avances[-1][1:] == (5, 100.0)
+
+
+def test_numero_serie_es_obligatorio(db, tmp_path):
+    ruta = _escribir(tmp_path, ENCABEZADO + _maquinas(2) + ',Sin serie,Deere,2020,Tractor,0,si\n' + _maquinas(1, desde=3))
+
+    resultado = ImportService.import_maquinas_from_csv(ruta, chunk_size=2)
+
+    assert resultado['imported'] == 0
+    assert resultado['total'] == 4
+    assert resultado['errors'] == ["Fila 4: Campo 'numero_serie' es requerido"]
+    assert Maquina.query.count() == 0
+
+
+def test_encoding_invalido_no_importa_nada(db, tmp_path):
+    # Prefijo UTF-8 y después 0x81, que tampoco está definido en cp1252
+    relleno = _maquinas(SNIFF_BYTES // 40 + 100)
+    ruta = _escribir(tmp_path, (ENCABEZADO + relleno).encode('utf-8') + b'MS-X,Tractor \x81\n')
+
+    resultado = ImportService.import_maquinas_from_csv(ruta)
+
+    assert resultado['imported'] == 0
+    assert resultado['errors'] == [
+        f"Fila {relleno.count(chr(10)) + 2}: el archivo contiene caracteres inválidos para el encoding cp1252"
+    ]
+    assert Maquina.query.count() == 0
@@ -0,0 +1,94 @@
+"""
+Pruebas de la validación de importaciones (consultas IN por bloque y mensajes)
+"""
+from backend_old.app.models import Maquina, Componente
+from backend_old.app.services.data_validator import MaquinasValidator, ComponentesValidator, existing_keys
+
+
+def _validar(validator, filas, chunk_size):
+    numeradas = list(enumerate(filas, start=2))
+    for inicio in range(0, len(numeradas), chunk_size):
+        validator.validate_chunk(numeradas[inicio:inicio + chunk_size])
+    return validator.result()
+
+
+def _selects(statements):
+    return [sql for sql in statements if sql.lstrip().upper().startswith('SELECT')]
+
+
+def test_una_consulta_in_por_bloque(db, count_queries):
+    db.session.add(Maquina(nombre='Tractor', codigo='MS-3'))
+    db.session.commit()
+    filas = [{'nombre': f'Tractor {i}', 'numero_serie': f'MS-{i}'} for i in range(10)]
+
+    with count_queries() as statements:
+        resultado = _validar(MaquinasValidator(), filas, chunk_size=4)
+
+    selects = _selects(statements)
+    assert len(selects) == 3
+    assert all(' IN ' in sql.upper() for sql in selects)
+    assert resultado['errors'] == ["Fila 5: Número de serie 'MS-3' ya existe en la base de datos"]
+
+
+def test_bloque_sin_claves_y_claves_por_lotes(db, count_queries):
+    with count_queries() as statements:
+        _validar(MaquinasValidator(), [{'nombre': 'Sin serie'}], chunk_size=10)
+        existing_keys(Maquina.codigo, [f'K-{i}' for i in range(1200)])
+
+    # Un bloque sin claves no consulta; 1200 claves son 3 IN de hasta 500
+    assert len(_selects(statements)) == 3
+
+
+def test_con_update_no_consulta_existentes(db, count_queries):
+    with count_queries() as statements:
+        resultado = _validar(MaquinasValidator(allow_existing=True), [{'nombre': 'T', 'numero_serie': 'MS-1'}], 10)
+    assert _selects(statements) == []
+    assert resultado['is_valid']
+
+
+def test_mensajes_de_maquinas_como_antes(db):
+    db.session.add(Maquina(nombre='Tractor', codigo='EX-1'))
+    db.session.commit()
+    filas = [
+        {'nombre': 'A', 'numero_serie': 'DUP', 'año': '1850'},
+        {'nombre': '', 'numero_serie': 'EX-1', 'año': 'dos mil'},
+        {'nombre': 'C', 'numero_serie': 'OK-1', 'año': '2020'},
+        {'nombre': 'D', 'numero_serie': 'DUP'},
+        {'nombre': 'E', 'numero_serie': 'DUP'},
+    ]
+
+    # Duplicados a través de bloques de 2 filas
+    resultado = _validar(MaquinasValidator(), filas, chunk_size=2)
+
+    # Mismos textos, filas y orden que la validación fila por fila anterior
+    assert resultado == {'is_valid': False, 'errors': [
+        "Fila 2: Número de serie 'DUP' duplicado en el CSV",
+        "Fila 2: Año '1850' fuera del rango válido (1900-2030)",
+        "Fila 3: Campo 'nombre' es requerido",
+        "Fila 3: Número de serie 'EX-1' ya existe en la base de datos",
+        "Fila 3: Año 'dos mil' no es un número válido",
+        "Fila 5: Número de serie 'DUP' duplicado en el CSV",
+        "Fila 6: Número de serie 'DUP' duplicado en el CSV",
+    ]}
+
+
+def test_mensajes_de_componentes_como_antes(db):
+    db.session.add(Componente(nombre='Filtro', id_componente='P-EX'))
+    db.session.commit()
+    filas = [
+        {'nombre': 'Filtro', 'numero_parte': 'P-EX', 'precio_unitario': '-1'},
+        {'nombre': 'Correa', 'numero_parte': 'P-1', 'precio_unitario': 'caro', 'stock_minimo': '-2'},
+        {'nombre': 'Correa', 'numero_parte': 'P-1', 'stock_actual': 'x'},
+    ]
+
+    resultado = _validar(ComponentesValidator(), filas, chunk_size=2)
+
+    assert resultado['errors'] == [
+        "Fila 2: Número de parte 'P-EX' ya existe en la base de datos",
+        "Fila 2: Precio unitario no puede ser negativo",
+        "Fila 3: Número de parte 'P-1' duplicado en el CSV",
+        "Fila 3: Precio unitario 'caro' no es un número válido",
+        "Fila 3: Stock mínimo no puede ser negativo",
+        "Fila 4: Número de parte 'P-1' duplicado en el CSV",
+        "Fila 4: Stock actual 'x' no es un número válido",
+    ]
@@ -0,0 +1,63 @@
+"""
+Pruebas de la limpieza de sesiones por request (errores del engine)
+"""
+import pytest
+from sqlalchemy import text
+
+from backend_old.app.utils import db_health
+from backend_old.app.utils.db_health import init_db_health, health
+
+
+@pytest.fixture
+def health_app(app, db):
+    init_db_health(app)
+
+    @app.route('/ok')
+    def ok():
+        return {'valor': db.session.execute(text('SELECT 1')).scalar()}
+
+    @app.route('/falla')
+    def falla():
+        try:
+            db.session.execute(text('SELECT * FROM tabla_inexistente'))
+        except Exception:
+            pass
+        return {'fallo': db_health.session_failed()}
+
+    return app
+
+
+def test_sentencia_fallida_marca_y_descarta_solo_esa_sesion(health_app):
+    client = health_app.test_client()
+    errores = health.errors
+    resets = health.session_resets
+
+    assert client.get('/falla').get_json() == {'fallo': True}
+    assert health.errors == errores + 1
+    assert health.session_resets == resets + 1
+    assert 'tabla_inexistente' in health.last_error
+
+    # El request siguiente no hereda la marca ni descarta su sesión
+    assert client.get('/ok').get_json() == {'valor': 1}
+    assert not db_health.session_failed()
+    assert health.session_resets == resets + 1
+
+
+def test_camino_normal_sin_consultas_extra(health_app, count_queries):
+    client = health_app.test_client()
+
+    with count_queries() as statements:
+        assert client.get('/ok').status_code == 200
+
+    assert statements == ['SELECT 1']
+
+
+def test_sin_transaccion_abierta_no_hay_nada_que_confirmar(health_app, count_queries):
+    @health_app.route('/sin_base')
+    def sin_base():
+        return {'ok': True}
+
+    with count_queries() as statements:
+        assert health_app.test_client().get('/sin_base').status_code == 200
+
+    assert statements == []
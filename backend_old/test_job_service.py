@@ -0,0 +1,167 @@
+"""
+Pruebas de las tareas en segundo plano (encolado, progreso, cancelación)
+"""
+import io
+import threading
+import time
+from datetime import datetime, timedelta
+
+from backend_old.app.models import Job
+from backend_old.app.services import job_service
+from backend_old.app.services.job_service import register_job, enqueue, cancel, mark_abandoned
+
+_liberar = threading.Event()
+
+
+@register_job('prueba_suma')
+def _sumar(job, valores):
+    job.progress('sumando', len(valores), 50)
+    return {'total': sum(valores)}
+
+
+@register_job('prueba_bloqueada')
+def _esperar(job):
+    job.progress('primera', 5, 10)
+    _liberar.wait(5)
+    job.progress('segunda', 10, 20)
+    return {'terminada': True}
+
+
+@register_job('prueba_error')
+def _fallar(job):
+    raise RuntimeError('archivo ilegible')
+
+
+def _esperar_estado(db, job_id, estados, limite=5):
+    fin = time.monotonic() + limite
+    while True:
+        db.session.rollback()
+        job = db.session.get(Job, job_id)
+        if job.estado in estados or time.monotonic() > fin:
+            return job
+        time.sleep(0.01)
+
+
+def test_enqueue_ejecuta_y_guarda_el_resultado(db):
+    job = enqueue('prueba_suma', valores=[1, 2, 3])
+    assert job.estado == Job.PENDIENTE
+
+    job = _esperar_estado(db, job.id, Job.FINALIZADOS)
+    datos = job.to_dict()
+    assert datos['estado'] == Job.COMPLETADO
+    assert datos['resultado'] == {'total': 6}
+    assert datos['progreso'] == 100
+    assert datos['fase'] == 'sumando' and datos['filas'] == 3
+
+
+def test_error_del_handler_queda_en_la_tarea(db):
+    job = _esperar_estado(db, enqueue('prueba_error').id, Job.FINALIZADOS)
+    assert job.estado == Job.ERROR
+    assert job.error == 'archivo ilegible'
+
+
+def test_progreso_y_cancelacion_en_proceso(db):
+    _liberar.clear()
+    job_id = enqueue('prueba_bloqueada').id
+
+    job = _esperar_estado(db, job_id, ('en_proceso',))
+    fin = time.monotonic() + 5
+    while job.fase != 'primera' and time.monotonic() < fin:
+        job = _esperar_estado(db, job_id, ('en_proceso',))
+    assert (job.fase, job.filas, job.progreso) == ('primera', 5, 10)
+
+    cancel(job_id)
+    _liberar.set()
+    job = _esperar_estado(db, job_id, Job.FINALIZADOS)
+    assert job.estado == Job.CANCELADO
+    assert job.resultado is None
+
+
+def test_cancelar_pendiente_no_la_ejecuta(app, db):
+    db.session.add(Job(id='pendiente1', tipo='prueba_suma', estado=Job.PENDIENTE, parametros='{"valores": [1]}'))
+    db.session.commit()
+
+    assert cancel('pendiente1').estado == Job.CANCELADO
+    job_service._run(app, 'pendiente1')
+
+    db.session.rollback()
+    job = db.session.get(Job, 'pendiente1')
+    assert job.estado == Job.CANCELADO
+    assert job.resultado is None
+    assert cancel('no-existe') is None
+
+
+def test_cancelar_pendiente_borra_el_archivo_subido(app, db, tmp_path):
+    archivo = tmp_path / 'subido.csv'
+    archivo.write_text('nombre\n')
+    parametros = '{"file_path": "%s"}' % archivo
+    db.session.add(Job(id='import1', tipo='prueba_suma', estado=Job.PENDIENTE, parametros=parametros))
+    db.session.commit()
+
+    cancel('import1')
+    job_service._run(app, 'import1')
+
+    assert not archivo.exists()
+
+
+def test_al_arrancar_marca_las_tareas_abandonadas(app, db):
+    viejo = datetime.utcnow() - timedelta(minutes=10)
+    app.config.update(JOB_PROGRESS_INTERVAL=1, JOB_STALE_INTERVALS=60)
+    db.session.add_all([
+        Job(id='colgada', tipo='prueba_suma', estado=Job.EN_PROCESO, created_at=viejo, updated_at=viejo),
+        Job(id='huerfana', tipo='prueba_suma', estado=Job.PENDIENTE, created_at=viejo, updated_at=viejo),
+        Job(id='activa', tipo='prueba_suma', estado=Job.EN_PROCESO, created_at=viejo),
+        Job(id='recien', tipo='prueba_suma', estado=Job.PENDIENTE),
+        Job(id='terminada', tipo='prueba_suma', estado=Job.COMPLETADO, created_at=viejo, updated_at=viejo),
+    ])
+    db.session.commit()
+
+    assert mark_abandoned(app) == 1
+
+    estados = {job.id: (job.estado, job.error) for job in Job.query.all()}
+    assert estados['colgada'] == (Job.ERROR, 'worker terminado')
+    # Una pendiente puede estar esperando turno en un worker vivo
+    assert estados['huerfana'] == (Job.PENDIENTE, None)
+    assert estados['activa'] == (Job.EN_PROCESO, None)
+    assert estados['recien'] == (Job.PENDIENTE, None)
+    assert estados['terminada'] == (Job.COMPLETADO, None)
+
+
+def test_post_jobs_responde_202_con_location(client, db):
+    response = client.post('/api/v1/jobs', json={'tipo': 'estadisticas_maquinas'})
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert response.headers['Location'].endswith(f"/api/v1/jobs/{body['job_id']}")
+    assert body['status_url'] == f"/api/v1/jobs/{body['job_id']}"
+
+    _esperar_estado(db, body['job_id'], Job.FINALIZADOS)
+    job = client.get(body['status_url']).get_json()['data']
+    assert job['estado'] == Job.COMPLETADO
+    assert job['resultado']['total'] == 0
+
+
+def test_post_jobs_rechaza_tipos_no_publicos(client):
+    # Las tareas que reciben rutas de archivo solo se encolan desde su endpoint
+    response = client.post('/api/v1/jobs', json={'tipo': 'import_maquinas', 'parametros': {'file_path': '/etc/passwd'}})
+    assert response.status_code == 400
+    assert client.post('/api/v1/jobs/no-existe/cancel').status_code == 404
+    assert client.get('/api/v1/jobs/no-existe').status_code == 404
+
+
+def test_endpoints_async_responden_202(client, db):
+    stats = client.get('/api/v1/maquinas/stats?async=true')
+    assert stats.status_code == 202
+
+    csv = io.BytesIO(b'numero_parte,nombre,categoria,precio_unitario\nP-1,Filtro,Filtros,10\n')
+    importacion = client.post(
+        '/api/v1/componentes/import?async=true',
+        data={'csvFile': (csv, 'componentes.csv')},
+        content_type='multipart/form-data'
+    )
+    assert importacion.status_code == 202
+
+    job = _esperar_estado(db, importacion.get_json()['job_id'], Job.FINALIZADOS)
+    assert job.estado == Job.COMPLETADO
+    assert job.to_dict()['resultado']['imported'] == 1
+    assert _esperar_estado(db, stats.get_json()['job_id'], Job.FINALIZADOS).estado == Job.COMPLETADO
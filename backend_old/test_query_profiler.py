@@ -0,0 +1,81 @@
+"""
+Pruebas del perfil de consultas por request
+"""
+import pytest
+from sqlalchemy import text
+
+from backend_old.app.utils.query_profiler import (
+    QueryProfile, endpoint_stats, init_query_profiler, statement_shape
+)
+
+
+@pytest.fixture
+def profiler_app(app, db):
+    app.config['N_PLUS_ONE_THRESHOLD'] = 5
+    init_query_profiler(app)
+    endpoint_stats.reset()
+
+    @app.route('/uno')
+    def uno():
+        return {'valor': db.session.execute(text('SELECT 1')).scalar()}
+
+    @app.route('/n_mas_uno')
+    def n_mas_uno():
+        valores = [db.session.execute(text(f'SELECT {i} + 1')).scalar() for i in range(8)]
+        return {'valores': valores}
+
+    yield app
+    endpoint_stats.reset()
+
+
+def test_server_timing(profiler_app):
+    response = profiler_app.test_client().get('/uno')
+
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('db;dur=')
+    assert 'desc="1 queries"' in timing
+    assert 'app;dur=' in timing
+
+
+def test_detecta_sentencias_repetidas(profiler_app, caplog):
+    client = profiler_app.test_client()
+
+    with caplog.at_level('WARNING', logger='elorza_backend.queries'):
+        client.get('/n_mas_uno')
+        client.get('/uno')
+
+    stats = {item['endpoint']: item for item in endpoint_stats.top()}
+    assert stats['n_mas_uno']['requests_n_plus_one'] == 1
+    assert stats['n_mas_uno']['queries_promedio'] == 8
+    assert stats['uno']['requests_n_plus_one'] == 0
+    assert '"n_plus_one": [{"sql": "SELECT ? + ?", "veces": 8}]' in caplog.text
+
+
+def test_forma_de_la_sentencia():
+    assert statement_shape("SELECT * FROM t WHERE id IN (?, ?, ?) AND nombre = 'x'") == (
+        'SELECT * FROM t WHERE id IN (?) AND nombre = ?'
+    )
+    assert statement_shape('SELECT *\n  FROM t WHERE id = %(id_1)s') == 'SELECT * FROM t WHERE id = %(id_1)s'
+
+    profile = QueryProfile(top=2)
+    for i, duracion in enumerate([0.01, 0.03, 0.02]):
+        profile.record(f'SELECT {i}', (i,), duracion)
+    assert [query['sql'] for query in profile.slowest()] == ['SELECT 1', 'SELECT 2']
+    assert profile.repeated(threshold=3) == [{'sql': 'SELECT ?', 'veces': 3}]
+
+
+def test_debug_queries_solo_en_modo_debug(profiler_app):
+    client = profiler_app.test_client()
+    client.get('/uno')
+
+    assert client.get('/debug/queries').status_code == 404
+
+    profiler_app.config['QUERY_PROFILER_DEBUG_ENDPOINT'] = True
+    response = client.get('/debug/queries')
+    assert response.status_code == 200
+    assert 'uno' in [item['endpoint'] for item in response.get_json()['data']]
+
+    # Solo queda el propio DELETE, registrado al terminar el request
+    assert client.delete('/debug/queries').status_code == 200
+    assert [item['endpoint'] for item in endpoint_stats.top()] == ['debug_queries']
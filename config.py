@@ -12,6 +12,23 @@ class Config:
     UPLOAD_FOLDER_GENERAL = os.path.join(STATIC_DIR, 'uploads')
     
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+    # Archivos de importación (CSV): se leen en streaming por bloques; el límite
+    # solo se aplica en las rutas de importación (ver utils/upload_limits.py)
+    MAX_IMPORT_FILE_SIZE = int(os.getenv('MAX_IMPORT_FILE_SIZE', 64 * 1024 * 1024))
+    # Filas por sentencia masiva y por commit al importar
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+    
+    # Tareas en segundo plano (importaciones, estadísticas): threads por proceso
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+    # Al arrancar, las tareas sin progreso durante tantos intervalos se marcan como error
+    JOB_STALE_INTERVALS = int(os.getenv('JOB_STALE_INTERVALS', 60))
+    
+    # Perfil de consultas por request (header Server-Timing y log de lentas)
+    QUERY_PROFILER_ENABLED = os.getenv('QUERY_PROFILER_ENABLED', 'true').lower() == 'true'
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 200))
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 1000))
+    # Repeticiones de una misma sentencia en un request para marcarlo como N+1
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 10))
     UPLOAD_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif'}
     
     # 🐘 POSTGRESQL ÚNICO
@@ -60,10 +77,12 @@ class Config:
 class DevelopmentConfig(Config):
     DEBUG = True
     FLASK_ENV = 'development'
+    QUERY_PROFILER_DEBUG_ENDPOINT = True
 
 class ProductionConfig(Config):
     DEBUG = False
     FLASK_ENV = 'production'
+    QUERY_PROFILER_DEBUG_ENDPOINT = os.getenv('QUERY_PROFILER_DEBUG_ENDPOINT', 'false').lower() == 'true'
 
 config = {
     'development': DevelopmentConfig,
@@ -8,14 +8,82 @@ import os
 import sys
 import json
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import sqlite3
 from urllib.parse import urlparse
 from pathlib import Path
 import subprocess
+import hashlib
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
+from decimal import Decimal
+
+# Filas leídas de SQLite por fetchmany y enviadas por cada COPY
+BATCH_SIZE = int(os.getenv('MIGRATION_BATCH_SIZE', 5000))
+# Conexiones (y tablas) en paralelo al migrar
+WORKERS = int(os.getenv('MIGRATION_WORKERS', min(4, os.cpu_count() or 1)))
+# Segundos entre líneas de progreso de una tabla
+PROGRESS_INTERVAL = 2.0
+# Tabla de PostgreSQL con la posición de la sincronización incremental
+SYNC_STATE_TABLE = '_sync_estado'
+# Columna usada para detectar filas modificadas (si la tabla la tiene)
+UPDATED_COLUMN = 'updated_at'
+
+def copy_value(value):
+    """Valor en formato texto de COPY (NULL como \\N, escapes de tab/saltos)"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, bytes):
+        return '\\\\x' + value.hex()
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
+
+def normalize_value(value):
+    """
+    Representación común de un valor en SQLite y PostgreSQL para el checksum
+    
+    SQLite guarda fechas como texto y montos como REAL; PostgreSQL los
+    devuelve como datetime y Decimal.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return str(int(value))
+    if isinstance(value, (int, float, Decimal)):
+        return format(Decimal(str(value)).normalize(), 'f')
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    if isinstance(value, str) and len(value) >= 10 and value[4] == '-' and value[7] == '-':
+        try:
+            return datetime.fromisoformat(value).isoformat(sep=' ')
+        except ValueError:
+            pass
+    return str(value)
+
+def rows_checksum(rows):
+    """
+    Checksum independiente del orden: suma de los hashes de cada fila
+    
+    Permite comparar tablas sin ORDER BY (y sin depender de la collation).
+    """
+    total = 0
+    for row in rows:
+        digest = hashlib.md5('\x1f'.join(normalize_value(v) for v in row).encode('utf-8')).digest()
+        total = (total + int.from_bytes(digest[:8], 'big')) % (1 << 64)
+    return f'{total:016x}'
 
 class PostgreSQLMigrator:
+    # Tablas a migrar; el orden de carga sale de sus foreign keys
+    table_order = ['proveedores', 'componentes', 'maquinas', 'stock', 'compras', 
+                   'componentes_proveedores', 'maquinas_componentes', 'pagos_proveedores']
+    
     def __init__(self):
         self.base_dir = Path(__file__).parent
         self.sqlite_db = self.base_dir / "sistema_gestion_agricola.db"
@@ -96,34 +164,140 @@ class PostgreSQLMigrator:
             print(f"❌ Error creando base de datos local: {e}")
             return False
     
-    def get_sqlite_data(self):
-        """Extraer datos de SQLite"""
+    def connect(self, pg_url):
+        """Conexión psycopg2 a partir de una URL"""
+        parsed = urlparse(pg_url)
+        return psycopg2.connect(
+            host=parsed.hostname,
+            port=parsed.port or 5432,
+            database=parsed.path[1:],
+            user=parsed.username,
+            password=parsed.password,
+            sslmode='require' if 'render.com' in pg_url else 'prefer'
+        )
+    
+    def get_sqlite_tables(self):
+        """Tablas de SQLite con su cantidad de registros (los datos se leen al migrar)"""
         if not self.sqlite_db.exists():
             print(f"⚠️ No se encontró {self.sqlite_db}")
             return {}
         
-        print("📖 Leyendo datos de SQLite...")
+        print("📖 Leyendo tablas de SQLite...")
         conn = sqlite3.connect(self.sqlite_db)
-        conn.row_factory = sqlite3.Row
         cursor = conn.cursor()
         
-        data = {}
-        
-        # Obtener todas las tablas
+        tables = {}
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-        tables = [row[0] for row in cursor.fetchall()]
-        
-        for table in tables:
+        for table in [row[0] for row in cursor.fetchall()]:
             try:
-                cursor.execute(f"SELECT * FROM {table}")
-                rows = cursor.fetchall()
-                data[table] = [dict(row) for row in rows]
-                print(f"  📋 {table}: {len(rows)} registros")
+                cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+                tables[table] = cursor.fetchone()[0]
+                print(f"  📋 {table}: {tables[table]} registros")
             except Exception as e:
                 print(f"  ❌ Error leyendo {table}: {e}")
         
         conn.close()
-        return data
+        return tables
+    
+    def sqlite_columns(self, sqlite_conn, table):
+        return [row[1] for row in sqlite_conn.execute(f'PRAGMA table_info("{table}")')]
+    
+    def pg_columns(self, pg_cursor, table):
+        pg_cursor.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = %s",
+            (table,)
+        )
+        return {row[0] for row in pg_cursor.fetchall()}
+    
+    def shared_columns(self, sqlite_conn, pg_cursor, table):
+        """Columnas de SQLite que existen en la tabla de PostgreSQL"""
+        destino = self.pg_columns(pg_cursor, table)
+        columns = self.sqlite_columns(sqlite_conn, table)
+        omitidas = [col for col in columns if col not in destino]
+        if omitidas:
+            print(f"    ⚠️ {table}: columnas sin equivalente en PostgreSQL omitidas: {', '.join(omitidas)}")
+        return [col for col in columns if col in destino]
+    
+    def copy_table(self, sqlite_conn, pg_cursor, table, columns, total, batch_size=BATCH_SIZE):
+        """
+        Copiar una tabla en bloques: fetchmany de SQLite y COPY FROM STDIN
+        
+        Nunca hay más de `batch_size` filas en memoria.
+        """
+        columns_sql = ', '.join(f'"{col}"' for col in columns)
+        copy_sql = f'COPY "{table}" ({columns_sql}) FROM STDIN'
+        source = sqlite_conn.execute(f'SELECT {columns_sql} FROM "{table}"')
+        
+        copiadas = 0
+        inicio = ultimo = time.perf_counter()
+        while True:
+            rows = source.fetchmany(batch_size)
+            if not rows:
+                break
+            
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(copy_value(value) for value in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            pg_cursor.copy_expert(copy_sql, buffer)
+            
+            copiadas += len(rows)
+            # Una línea por aviso: varias tablas pueden estar copiándose a la vez
+            ahora = time.perf_counter()
+            if ahora - ultimo >= PROGRESS_INTERVAL:
+                ultimo = ahora
+                porcentaje = copiadas / total * 100 if total else 100
+                print(f"    ⏳ {table}: {copiadas}/{total} ({porcentaje:.0f}%) "
+                      f"{copiadas / (ahora - inicio):.0f} filas/s", flush=True)
+        
+        segundos = time.perf_counter() - inicio
+        print(f"    ✅ {table}: {copiadas} registros en {segundos:.1f}s "
+              f"({copiadas / segundos if segundos else 0:.0f} filas/s)")
+        return copiadas
+    
+    def reset_sequences(self, pg_cursor, tables):
+        """Llevar las secuencias SERIAL al máximo id cargado"""
+        for table in tables:
+            pg_cursor.execute(
+                "SELECT column_name FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = %s "
+                "AND column_default LIKE 'nextval%%'",
+                (table,)
+            )
+            for (column,) in pg_cursor.fetchall():
+                pg_cursor.execute(
+                    f'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                    f'COALESCE(MAX("{column}"), 1), MAX("{column}") IS NOT NULL) FROM "{table}"',
+                    (f'"{table}"', column)
+                )
+    
+    def verify_table(self, sqlite_conn, pg_conn, table, columns, batch_size=BATCH_SIZE):
+        """Comparar cantidad de filas y checksum de una tabla en ambas bases"""
+        columns_sql = ', '.join(f'"{col}"' for col in columns)
+        contador = {'sqlite': 0, 'postgresql': 0}
+        
+        def contar(rows, clave):
+            for row in rows:
+                contador[clave] += 1
+                yield row
+        
+        # Ambos cursores se recorren sin cargar la tabla completa
+        source = sqlite_conn.execute(f'SELECT {columns_sql} FROM "{table}"')
+        checksum_sqlite = rows_checksum(contar(source, 'sqlite'))
+        
+        # Cursor con nombre: PostgreSQL entrega las filas por partes
+        with pg_conn.cursor(name=f'verify_{table}') as pg_cursor:
+            pg_cursor.itersize = batch_size
+            pg_cursor.execute(f'SELECT {columns_sql} FROM "{table}"')
+            checksum_pg = rows_checksum(contar(pg_cursor, 'postgresql'))
+        
+        ok = contador['sqlite'] == contador['postgresql'] and checksum_sqlite == checksum_pg
+        estado = '✅' if ok else '❌'
+        print(f"    {estado} {table}: {contador['sqlite']} / {contador['postgresql']} filas, "
+              f"checksum {checksum_sqlite} / {checksum_pg}")
+        return ok
     
     def create_postgresql_schema(self, pg_url):
         """Crear esquema en PostgreSQL basado en los modelos"""
@@ -253,57 +427,327 @@ class PostgreSQLMigrator:
             print(f"❌ Error creando esquema: {e}")
             return False
     
-    def migrate_data_to_postgresql(self, pg_url, data):
-        """Migrar datos a PostgreSQL"""
+    def table_dependencies(self, pg_cursor):
+        """Tabla -> tablas a las que referencia por foreign key (según PostgreSQL)"""
+        pg_cursor.execute(
+            "SELECT DISTINCT hijo.relname, padre.relname FROM pg_constraint c "
+            "JOIN pg_class hijo ON hijo.oid = c.conrelid "
+            "JOIN pg_class padre ON padre.oid = c.confrelid "
+            "WHERE c.contype = 'f' AND hijo.relnamespace = current_schema()::regnamespace"
+        )
+        dependencias = {}
+        for hijo, padre in pg_cursor.fetchall():
+            if hijo != padre:
+                dependencias.setdefault(hijo, set()).add(padre)
+        return dependencias
+    
+    def schedule(self, tables, dependencies, run, workers=WORKERS):
+        """
+        Ejecutar run(tabla) en paralelo respetando las foreign keys
+        
+        Una tabla se lanza cuando terminaron todas las tablas que referencia;
+        si una falla, las que dependen de ella se omiten.
+        
+        Returns:
+            dict: tabla -> True/False (False también para las omitidas)
+        """
+        pendientes = {table: set(dependencies.get(table, ())) & set(tables) for table in tables}
+        resultados = {}
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            en_curso = {}
+            while pendientes or en_curso:
+                for table in [t for t, deps in pendientes.items() if not deps]:
+                    del pendientes[table]
+                    en_curso[pool.submit(run, table)] = table
+                
+                if not en_curso:
+                    print(f"❌ Dependencias circulares entre: {', '.join(pendientes)}")
+                    resultados.update({table: False for table in pendientes})
+                    break
+                
+                terminadas, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminadas:
+                    table = en_curso.pop(futuro)
+                    resultados[table] = futuro.result()
+                    if resultados[table]:
+                        for deps in pendientes.values():
+                            deps.discard(table)
+                    else:
+                        # Omitir todo lo que depende (directa o indirectamente) de la fallida
+                        fallidas = [table]
+                        while fallidas:
+                            fallida = fallidas.pop()
+                            for hija in [t for t, deps in pendientes.items() if fallida in deps]:
+                                print(f"  ⏭️ {hija} omitida: depende de {fallida}")
+                                del pendientes[hija]
+                                resultados[hija] = False
+                                fallidas.append(hija)
+        
+        return resultados
+    
+    def migrate_table(self, pg_url, table, total, diferencias):
+        """
+        Migrar y verificar una tabla con conexiones propias (se usa desde threads)
+        
+        La tabla se confirma en su propia transacción, así las que dependen
+        de ella ven sus filas al validar las foreign keys.
+        
+        Returns:
+            bool: False solo si la carga falló. Una diferencia de conteo o
+            checksum se agrega a `diferencias` pero no omite las dependientes:
+            las filas ya están confirmadas.
+        """
+        sqlite_conn = sqlite3.connect(self.sqlite_db)
+        conn = self.connect(pg_url)
+        try:
+            try:
+                with conn.cursor() as cursor:
+                    columns = self.shared_columns(sqlite_conn, cursor, table)
+                    self.copy_table(sqlite_conn, cursor, table, columns, total)
+                    self.reset_sequences(cursor, [table])
+                    
+                    # Punto de partida para la próxima sincronización incremental
+                    orden, incremental = self.sync_key(sqlite_conn, table)
+                    if incremental:
+                        self.save_sync_state(cursor, table, orden, self.last_key(sqlite_conn, table, orden))
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"    ❌ {table}: {e}")
+                return False
+            
+            try:
+                if not self.verify_table(sqlite_conn, conn, table, columns):
+                    diferencias.append(table)
+            except Exception as e:
+                print(f"    ❌ {table}: error verificando: {e}")
+                diferencias.append(table)
+            return True
+        finally:
+            conn.close()
+            sqlite_conn.close()
+    
+    def migrate_data_to_postgresql(self, pg_url, tables):
+        """
+        Migrar datos a PostgreSQL
+        
+        Cada tabla se lee de SQLite por bloques y se carga con COPY, en
+        paralelo (MIGRATION_WORKERS conexiones) siguiendo las foreign keys:
+        las tablas independientes se cargan a la vez. Luego se ajustan las
+        secuencias y se verifican conteos y checksums de cada tabla; solo un
+        error de carga omite las tablas dependientes, las diferencias de la
+        verificación se informan al final.
+        """
         print("📦 Migrando datos a PostgreSQL...")
         
         try:
-            parsed = urlparse(pg_url)
-            conn = psycopg2.connect(
-                host=parsed.hostname,
-                port=parsed.port or 5432,
-                database=parsed.path[1:],
-                user=parsed.username,
-                password=parsed.password,
-                sslmode='require' if 'render.com' in pg_url else 'prefer'
+            migrar = [table for table in self.table_order if tables.get(table)]
+            if not migrar:
+                return True
+            
+            conn = self.connect(pg_url)
+            with conn.cursor() as cursor:
+                dependencias = self.table_dependencies(cursor)
+                # Limpiar todas juntas antes de cargar: un TRUNCATE ... CASCADE
+                # durante la carga vaciaría tablas que otro thread está llenando
+                tablas_sql = ', '.join(f'"{table}"' for table in migrar)
+                cursor.execute(f'TRUNCATE TABLE {tablas_sql} RESTART IDENTITY CASCADE')
+                
+                self.ensure_sync_state(cursor)
+                cursor.execute(f'DELETE FROM "{SYNC_STATE_TABLE}" WHERE tabla = ANY(%s)', (migrar,))
+            conn.commit()
+            conn.close()
+            
+            print(f"  🧵 {len(migrar)} tablas con {min(WORKERS, len(migrar))} conexiones")
+            inicio = time.perf_counter()
+            diferencias = []
+            resultados = self.schedule(
+                migrar, dependencias,
+                lambda table: self.migrate_table(pg_url, table, tables[table], diferencias)
             )
-            cursor = conn.cursor()
             
-            # Orden de inserción para respetar foreign keys
-            table_order = ['proveedores', 'componentes', 'maquinas', 'stock', 'compras', 
-                          'componentes_proveedores', 'maquinas_componentes', 'pagos_proveedores']
+            total = sum(tables[table] for table, ok in resultados.items() if ok)
+            segundos = time.perf_counter() - inicio
+            print(f"✅ Migración de datos completada: {total} registros en {segundos:.1f}s")
             
-            for table in table_order:
-                if table in data and data[table]:
-                    print(f"  📋 Migrando {table}...")
-                    
-                    # Limpiar tabla existente
-                    cursor.execute(f'TRUNCATE TABLE "{table}" RESTART IDENTITY CASCADE')
-                    
-                    # Insertar datos
-                    rows = data[table]
-                    if rows:
-                        # Obtener columnas de la primera fila
-                        columns = list(rows[0].keys())
-                        placeholders = ', '.join(['%s'] * len(columns))
-                        columns_str = ', '.join([f'"{col}"' for col in columns])
-                        
-                        insert_sql = f'INSERT INTO "{table}" ({columns_str}) VALUES ({placeholders})'
-                        
-                        for row in rows:
-                            values = [row[col] for col in columns]
-                            cursor.execute(insert_sql, values)
+            fallidas = [table for table, ok in resultados.items() if not ok]
+            if fallidas:
+                print(f"❌ Tablas no cargadas (con error u omitidas): {', '.join(fallidas)}")
+            if diferencias:
+                print(f"❌ Tablas con diferencias de conteo o checksum: {', '.join(sorted(diferencias))}")
+            return not fallidas and not diferencias
+            
+        except Exception as e:
+            print(f"❌ Error migrando datos: {e}")
+            return False
+    
+    def ensure_sync_state(self, pg_cursor):
+        pg_cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS "{SYNC_STATE_TABLE}" (
+                tabla VARCHAR(255) PRIMARY KEY,
+                columnas TEXT NOT NULL,
+                ultimo TEXT,
+                actualizado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+    
+    def load_sync_state(self, pg_cursor, table, orden):
+        """Última clave sincronizada (None si no hay o cambió la clave de orden)"""
+        pg_cursor.execute(f'SELECT columnas, ultimo FROM "{SYNC_STATE_TABLE}" WHERE tabla = %s', (table,))
+        row = pg_cursor.fetchone()
+        if not row or row[1] is None or json.loads(row[0]) != orden:
+            return None
+        return json.loads(row[1])
+    
+    def save_sync_state(self, pg_cursor, table, orden, ultimo):
+        pg_cursor.execute(
+            f"""INSERT INTO "{SYNC_STATE_TABLE}" (tabla, columnas, ultimo, actualizado)
+                VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+                ON CONFLICT (tabla) DO UPDATE
+                SET columnas = EXCLUDED.columnas, ultimo = EXCLUDED.ultimo, actualizado = EXCLUDED.actualizado""",
+            (table, json.dumps(orden), json.dumps(ultimo) if ultimo is not None else None)
+        )
+    
+    def sync_key(self, sqlite_conn, table):
+        """
+        Columnas que ordenan la sincronización y si permiten seguir desde la última
+        
+        Con `updated_at` se ordena por (updated_at, clave primaria) y se ven las
+        filas nuevas y modificadas; con una clave entera, solo las nuevas. Con
+        una clave compuesta sin `updated_at` cada ejecución recorre la tabla
+        entera (la posición sirve solo para reanudar dentro de la misma pasada).
+        """
+        info = list(sqlite_conn.execute(f'PRAGMA table_info("{table}")'))
+        columns = [row[1] for row in info]
+        pk = [row[1] for row in sorted((row for row in info if row[5]), key=lambda row: row[5])]
+        if not pk:
+            pk = ['rowid']
+        
+        entera = len(pk) == 1 and (pk == ['rowid'] or 'INT' in next(row[2] for row in info if row[1] == pk[0]).upper())
+        if UPDATED_COLUMN in columns:
+            return [UPDATED_COLUMN] + pk, True
+        return pk, entera
+    
+    def order_exprs(self, orden):
+        # Las fechas nulas se ordenan primero en vez de quedar fuera de la comparación
+        return [
+            f"COALESCE(\"{col}\", '')" if col == UPDATED_COLUMN else (col if col == 'rowid' else f'"{col}"')
+            for col in orden
+        ]
+    
+    def last_key(self, sqlite_conn, table, orden):
+        exprs = self.order_exprs(orden)
+        desc = ', '.join(f'{expr} DESC' for expr in exprs)
+        row = sqlite_conn.execute(f'SELECT {", ".join(exprs)} FROM "{table}" ORDER BY {desc} LIMIT 1').fetchone()
+        return list(row) if row else None
+    
+    def pg_primary_key(self, pg_cursor, table):
+        pg_cursor.execute(
+            "SELECT a.attname FROM pg_index i "
+            "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+            "WHERE i.indrelid = %s::regclass AND i.indisprimary",
+            (f'"{table}"',)
+        )
+        return [row[0] for row in pg_cursor.fetchall()]
+    
+    def sync_table(self, pg_url, table, batch_size=BATCH_SIZE):
+        """
+        Sincronizar una tabla con upserts desde la última posición guardada
+        
+        Cada bloque se escribe y se registra su última clave en la misma
+        transacción: si el proceso se interrumpe, la siguiente ejecución sigue
+        desde el último bloque confirmado.
+        """
+        sqlite_conn = sqlite3.connect(self.sqlite_db)
+        conn = self.connect(pg_url)
+        try:
+            with conn.cursor() as cursor:
+                columns = self.shared_columns(sqlite_conn, cursor, table)
+                orden, incremental = self.sync_key(sqlite_conn, table)
+                ultimo = self.load_sync_state(cursor, table, orden)
+                pk = self.pg_primary_key(cursor, table)
+                
+                columns_sql = ', '.join(f'"{col}"' for col in columns)
+                actualizables = [col for col in columns if col not in pk]
+                if pk and actualizables:
+                    pk_sql = ', '.join(f'"{col}"' for col in pk)
+                    set_sql = ', '.join(f'"{col}" = EXCLUDED."{col}"' for col in actualizables)
+                    conflicto = f'ON CONFLICT ({pk_sql}) DO UPDATE SET {set_sql}'
+                else:
+                    conflicto = 'ON CONFLICT DO NOTHING'
+                upsert_sql = f'INSERT INTO "{table}" ({columns_sql}) VALUES %s {conflicto}'
+                
+                orden_sql = ', '.join(self.order_exprs(orden))
+                where, params = '', []
+                if ultimo is not None:
+                    where = f'WHERE ({orden_sql}) > ({", ".join("?" * len(orden))})'
+                    params = ultimo
+                pendientes = sqlite_conn.execute(f'SELECT COUNT(*) FROM "{table}" {where}', params).fetchone()[0]
+                source = sqlite_conn.execute(
+                    f'SELECT {columns_sql}, {orden_sql} FROM "{table}" {where} ORDER BY {orden_sql}', params
+                )
+                
+                sincronizadas = 0
+                inicio = time.perf_counter()
+                while True:
+                    rows = source.fetchmany(batch_size)
+                    if not rows:
+                        break
                     
-                    print(f"    ✅ {len(rows)} registros migrados")
+                    execute_values(cursor, upsert_sql, [row[:len(columns)] for row in rows], page_size=len(rows))
+                    self.save_sync_state(cursor, table, orden, list(rows[-1][len(columns):]))
+                    conn.commit()
+                    sincronizadas += len(rows)
+                    print(f"    ⏳ {table}: {sincronizadas}/{pendientes}", flush=True)
+                
+                # Sin clave incremental la próxima ejecución vuelve a recorrer todo
+                if not incremental:
+                    self.save_sync_state(cursor, table, orden, None)
+                self.reset_sequences(cursor, [table])
+            conn.commit()
             
+            segundos = time.perf_counter() - inicio
+            print(f"    ✅ {table}: {sincronizadas} registros nuevos o modificados en {segundos:.1f}s")
+            return True
+        except Exception as e:
+            conn.rollback()
+            print(f"    ❌ {table}: {e}")
+            return False
+        finally:
+            conn.close()
+            sqlite_conn.close()
+    
+    def sync_data_to_postgresql(self, pg_url, tables):
+        """
+        Sincronización incremental: sin TRUNCATE, solo filas nuevas o modificadas
+        
+        Las tablas se procesan en paralelo con el mismo orden por foreign keys
+        que la migración completa. Las filas borradas en SQLite no se borran
+        en PostgreSQL.
+        """
+        print("🔄 Sincronizando datos con PostgreSQL...")
+        
+        try:
+            sincronizar = [table for table in self.table_order if table in tables]
+            conn = self.connect(pg_url)
+            with conn.cursor() as cursor:
+                dependencias = self.table_dependencies(cursor)
+                self.ensure_sync_state(cursor)
             conn.commit()
-            cursor.close()
             conn.close()
-            print("✅ Migración de datos completada")
+            
+            resultados = self.schedule(sincronizar, dependencias, lambda table: self.sync_table(pg_url, table))
+            
+            fallidas = [table for table, ok in resultados.items() if not ok]
+            if fallidas:
+                print(f"❌ Tablas con errores: {', '.join(fallidas)} (se reanudan desde el último bloque)")
+                return False
+            print("✅ Sincronización completada")
             return True
             
         except Exception as e:
-            print(f"❌ Error migrando datos: {e}")
+            print(f"❌ Error sincronizando datos: {e}")
             return False
     
     def setup_environment_file(self):
@@ -343,9 +787,14 @@ WEATHER_API_KEY=your_weather_api_key_here
             shutil.copy2(new_config, backend_config.parent / "config.py")
             print("✅ Configuración PostgreSQL aplicada al backend")
     
-    def run_migration(self):
-        """Ejecutar migración completa"""
-        print("🐘 === MIGRACIÓN A POSTGRESQL ===")
+    def run_migration(self, incremental=False):
+        """
+        Ejecutar migración completa
+        
+        Con incremental=True solo se sincronizan los datos (sin reescribir
+        .env ni la configuración del backend).
+        """
+        print("🐘 === MIGRACIÓN A POSTGRESQL ===" if not incremental else "🐘 === SINCRONIZACIÓN INCREMENTAL ===")
         print()
         
         # 1. Verificar dependencias
@@ -353,7 +802,8 @@ WEATHER_API_KEY=your_weather_api_key_here
             return False
         
         # 2. Configurar entorno
-        self.setup_environment_file()
+        if not incremental:
+            self.setup_environment_file()
         
         # 3. Probar conexiones
         connections_ok = True
@@ -380,8 +830,8 @@ WEATHER_API_KEY=your_weather_api_key_here
             print("   3. Variables de entorno DATABASE_URL y LOCAL_POSTGRES_URL")
             return False
         
-        # 5. Obtener datos de SQLite
-        sqlite_data = self.get_sqlite_data()
+        # 5. Obtener tablas de SQLite
+        sqlite_tables = self.get_sqlite_tables()
         
         # 6. Crear esquema en ambas bases de datos
         target_dbs = []
@@ -395,13 +845,22 @@ WEATHER_API_KEY=your_weather_api_key_here
                 print(f"❌ Error configurando {name}")
                 continue
             
-            if sqlite_data and any(sqlite_data.values()):
-                if not self.migrate_data_to_postgresql(url, sqlite_data):
+            if incremental:
+                if not self.sync_data_to_postgresql(url, sqlite_tables):
+                    print(f"❌ Error sincronizando datos con {name}")
+                    continue
+            elif any(sqlite_tables.values()):
+                if not self.migrate_data_to_postgresql(url, sqlite_tables):
                     print(f"❌ Error migrando datos a {name}")
                     continue
             
             print(f"✅ Base de datos {name} configurada correctamente")
         
+        if incremental:
+            print()
+            print("🎉 === SINCRONIZACIÓN COMPLETADA ===")
+            return True
+        
         # 7. Actualizar configuración del backend
         self.update_backend_config()
         
@@ -426,15 +885,20 @@ def main():
     if len(sys.argv) > 1 and sys.argv[1] == '--help':
         print("🐘 Script de migración a PostgreSQL")
         print()
-        print("Uso: python migrate_to_postgresql.py")
+        print("Uso: python migrate_to_postgresql.py [--incremental]")
+        print()
+        print("  --incremental        - Sincronizar solo filas nuevas o modificadas (sin TRUNCATE);")
+        print("                         reanuda desde el último bloque si se interrumpió")
         print()
         print("Variables de entorno:")
         print("  DATABASE_URL         - URL de PostgreSQL remoto (Render)")
         print("  LOCAL_POSTGRES_URL   - URL de PostgreSQL local")
+        print("  MIGRATION_BATCH_SIZE - Filas por bloque (5000)")
+        print("  MIGRATION_WORKERS    - Tablas en paralelo")
         print()
         return
     
-    success = migrator.run_migration()
+    success = migrator.run_migration(incremental='--incremental' in sys.argv[1:])
     sys.exit(0 if success else 1)
 
 if __name__ == "__main__":